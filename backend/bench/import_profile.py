@@ -0,0 +1,96 @@
+"""
+Per-module import-time profile of the API, from `python -X importtime` in a fresh interpreter.
+
+    python -m bench.import_profile                  # slowest 25 modules under src.main
+    python -m bench.import_profile --top 40 --self  # sorted by time spent in the module itself
+    python -m bench.import_profile --check          # exit 1 over IMPORT_BUDGET_MS (for CI)
+
+Wall-clock budgets depend on the machine, so the budget is checked here, on demand, not in
+the test suite. tests/test_import_time.py checks only that langchain, FAISS, numpy and the
+embedding models load on first use.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+_BACKEND_DIR = Path(__file__).resolve().parents[1]
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+# Loaded by the RAG pipeline on first use, never while the app module is imported.
+HEAVY_MODULES = ("langchain", "faiss", "numpy", "torch", "sentence_transformers", "src.services.rag_pipeline")
+IMPORT_BUDGET_MS = 1000.0
+
+
+def profile_imports(module: str = "src.main") -> List[Tuple[str, float, float]]:
+    """[(module, self ms, cumulative ms)] in import order, for a cold `import module`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(_BACKEND_DIR),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            rows.append((name, int(self_us) / 1000.0, int(cumulative_us) / 1000.0))
+    return rows
+
+
+def import_ms(module: str = "src.main", runs: int = 3) -> float:
+    """Best-of-`runs` cumulative import time of `module` (the minimum filters out scheduler noise)."""
+    best = float("inf")
+    for _ in range(runs):
+        rows = {name: cumulative for name, _, cumulative in profile_imports(module)}
+        best = min(best, rows.get(module, 0.0))
+    return best
+
+
+def loaded_modules(module: str = "src.main") -> List[str]:
+    """Which HEAVY_MODULES are in sys.modules right after `import module`."""
+    code = f"import sys, {module}; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    proc = subprocess.run(
+        [sys.executable, "-c", code], cwd=str(_BACKEND_DIR), capture_output=True, text=True, check=True
+    )
+    return proc.stdout.split()
+
+
+def budget_ms() -> float:
+    return float(os.getenv("IMPORT_BUDGET_MS", str(IMPORT_BUDGET_MS)))
+
+
+def format_profile(rows: List[Tuple[str, float, float]], top: int = 25, by_self: bool = False) -> str:
+    ordered = sorted(rows, key=lambda r: r[1] if by_self else r[2], reverse=True)[:top]
+    lines = [f"{'self ms':>9} {'cum ms':>9}  module"]
+    lines += [f"{self_ms:>9.1f} {cumulative:>9.1f}  {name}" for name, self_ms, cumulative in ordered]
+    return "\n".join(lines)
+
+
+def _main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Show per-module import time of the API.")
+    parser.add_argument("--module", default="src.main")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--self", dest="by_self", action="store_true", help="sort by self time")
+    parser.add_argument("--check", action="store_true", help="exit 1 if over budget or heavy modules load")
+    args = parser.parse_args(argv)
+
+    rows = profile_imports(args.module)
+    print(format_profile(rows, args.top, args.by_self))
+    total = import_ms(args.module) if args.check else next(
+        (cumulative for name, _, cumulative in rows if name == args.module), 0.0
+    )
+    print(f"\n{args.module}: {total:.0f} ms (budget {budget_ms():.0f} ms)")
+    heavy = loaded_modules(args.module)
+    if heavy:
+        print("loaded at import (should be deferred): " + ", ".join(heavy))
+    return 1 if args.check and (total > budget_ms() or heavy) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main())
@@ -0,0 +1,162 @@
+"""
+Open-loop load generator for the chat API.
+
+Requests are started on a fixed schedule (`rps` per second for `duration` seconds) whether
+or not earlier ones have finished, so a slow server shows up as growing latency rather
+than as a politely reduced request rate. A share of requests (`stream_ratio`) go to
+/chat/stream, where time to the first token is recorded as well.
+"""
+import asyncio
+import json
+import math
+import random
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+# Mix of shortcut paths (templates, FAQ) and questions that need retrieval + the LLM.
+QUESTIONS = [
+    "Hi!",
+    "What is your tech stack?",
+    "List your projects",
+    "Which model does the rust detector use and why?",
+    "How did you handle dataset labeling for rust detection?",
+    "What results did the forecasting project achieve?",
+    "How would you deploy a RAG system at scale?",
+    "Which projects use Python and what did you learn from them?",
+    "Compare your MLOps project with the chatbot architecture",
+    "What challenges did you face with data drift?",
+]
+
+
+class Result:
+    __slots__ = ("kind", "status", "latency_ms", "ttft_ms", "error")
+
+    def __init__(self, kind: str, status: int, latency_ms: float, ttft_ms: Optional[float] = None, error: str = ""):
+        self.kind = kind
+        self.status = status
+        self.latency_ms = latency_ms
+        self.ttft_ms = ttft_ms
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200 and not self.error
+
+
+async def _chat(client: httpx.AsyncClient, question: str) -> Result:
+    started = time.perf_counter()
+    try:
+        resp = await client.post("/chat", json={"message": question})
+    except httpx.HTTPError as e:
+        return Result("chat", 0, (time.perf_counter() - started) * 1000.0, error=type(e).__name__)
+    return Result("chat", resp.status_code, (time.perf_counter() - started) * 1000.0)
+
+
+async def _stream(client: httpx.AsyncClient, question: str) -> Result:
+    started = time.perf_counter()
+    ttft_ms = None
+    error = ""
+    try:
+        async with client.stream("POST", "/chat/stream", json={"message": question}) as resp:
+            status = resp.status_code
+            async for line in resp.aiter_lines():
+                if line == "event: token" and ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000.0
+                elif line == "event: error":
+                    error = "stream error event"
+    except httpx.HTTPError as e:
+        return Result("stream", 0, (time.perf_counter() - started) * 1000.0, error=type(e).__name__)
+    return Result("stream", status, (time.perf_counter() - started) * 1000.0, ttft_ms, error)
+
+
+async def run_load(
+    base_url: str,
+    rps: float,
+    duration: float,
+    *,
+    stream_ratio: float = 0.0,
+    questions: Sequence[str] = QUESTIONS,
+    unique: bool = True,
+    timeout: float = 60.0,
+    seed: Optional[int] = None,
+) -> Tuple[List[Result], float]:
+    """
+    Fire `rps * duration` requests on schedule and wait for all of them.
+    With `unique`, a request number is appended so the semantic cache cannot absorb the load.
+    Returns (results, wall-clock seconds).
+    """
+    rng = random.Random(seed)
+    total = max(1, int(rps * duration))
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        tasks = []
+        for i in range(total):
+            delay = started + i / rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            question = rng.choice(list(questions))
+            if unique:
+                question = f"{question} (request {i})"
+            send = _stream if rng.random() < stream_ratio else _chat
+            tasks.append(asyncio.ensure_future(send(client, question)))
+        results = await asyncio.gather(*tasks)
+        return list(results), time.perf_counter() - started
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (q in 0..1)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def _distribution(values: Sequence[float]) -> Dict[str, Optional[float]]:
+    return {
+        "p50": percentile(values, 0.50),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+        "max": max(values) if values else None,
+        "mean": sum(values) / len(values) if values else None,
+    }
+
+
+def summarize(results: Sequence[Result], wall_seconds: float) -> dict:
+    ok = [r for r in results if r.ok]
+    statuses: Dict[str, int] = {}
+    for r in results:
+        key = str(r.status) if not r.error else (r.error if r.status in (0, 200) else f"{r.status} {r.error}")
+        statuses[key] = statuses.get(key, 0) + 1
+    return {
+        "requests": len(results),
+        "ok": len(ok),
+        "error_rate": (len(results) - len(ok)) / len(results) if results else 0.0,
+        "throughput_rps": len(ok) / wall_seconds if wall_seconds > 0 else 0.0,
+        "wall_seconds": wall_seconds,
+        "latency_ms": _distribution([r.latency_ms for r in ok]),
+        "ttft_ms": _distribution([r.ttft_ms for r in ok if r.ttft_ms is not None]),
+        "statuses": statuses,
+    }
+
+
+def _ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.0f}"
+
+
+def format_report(summary: dict) -> str:
+    lines = [
+        f"requests     {summary['requests']}  ok {summary['ok']}  error rate {summary['error_rate']:.2%}",
+        f"throughput   {summary['throughput_rps']:.1f} req/s over {summary['wall_seconds']:.1f}s",
+        "               p50     p95     p99     max",
+    ]
+    for label, key in (("latency ms", "latency_ms"), ("ttft ms", "ttft_ms")):
+        d = summary[key]
+        lines.append(f"{label:<12} {_ms(d['p50']):>6}  {_ms(d['p95']):>6}  {_ms(d['p99']):>6}  {_ms(d['max']):>6}")
+    lines.append("statuses     " + json.dumps(summary["statuses"], sort_keys=True))
+    for title, key in (("answers", "answers"), ("provider err", "provider_errors")):
+        if summary.get(key):
+            lines.append(f"{title:<12} " + json.dumps(summary[key], sort_keys=True))
+    return "\n".join(lines)
@@ -0,0 +1,179 @@
+"""
+Local stand-in for the Groq chat-completions API and the Hugging Face inference API.
+
+- POST /openai/v1/chat/completions   Groq / OpenAI-style completion, or SSE when "stream": true;
+- POST /models/{model}               HF feature extraction: one vector per input (hashed
+                                     bag of words, so similar texts stay close).
+
+Latency is log-normal around a median with a configurable spread, streamed tokens are
+spaced by --token-ms, and a fraction of requests (--error-rate) fails with a status drawn
+from --error-status. Point the backend at it with GROQ_BASE_URL / HF_INFERENCE_URL:
+
+    python -m bench.mock_providers --port 9100 --llm-ms 400 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+from typing import List, Optional, Sequence
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+EMBED_DIM = 384
+_WORD = re.compile(r"[a-z0-9]+")
+_REPLY = (
+    "I built a computer vision pipeline for rust detection with YOLOv8, trained on labelled "
+    "inspection images, and deployed it behind a FastAPI service. Want more details? Just ask."
+)
+
+
+class MockConfig:
+    def __init__(
+        self,
+        llm_ms: float = 300.0,
+        token_ms: float = 10.0,
+        embed_ms: float = 20.0,
+        spread: float = 0.3,
+        error_rate: float = 0.0,
+        error_status: Sequence[int] = (429, 503),
+        seed: Optional[int] = None,
+    ):
+        self.llm_ms = llm_ms
+        self.token_ms = token_ms
+        self.embed_ms = embed_ms
+        self.spread = spread
+        self.error_rate = error_rate
+        self.error_status = tuple(error_status) or (503,)
+        self.random = random.Random(seed)
+
+    def delay(self, median_ms: float) -> float:
+        """Seconds to wait: log-normal around `median_ms` (sigma = spread)."""
+        if median_ms <= 0:
+            return 0.0
+        return median_ms * math.exp(self.random.gauss(0.0, self.spread)) / 1000.0
+
+    def failure(self) -> Optional[int]:
+        if self.error_rate > 0 and self.random.random() < self.error_rate:
+            return self.random.choice(self.error_status)
+        return None
+
+
+def embed_text(text: str, dim: int = EMBED_DIM) -> List[float]:
+    vector = [0.0] * dim
+    for word in _WORD.findall(text.lower()):
+        h = int.from_bytes(hashlib.md5(word.encode("utf-8")).digest()[:4], "little")
+        vector[h % dim] += 1.0 if h & 1 << 31 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def _error(status: int) -> JSONResponse:
+    return JSONResponse({"error": {"message": f"mock provider error {status}"}}, status_code=status)
+
+
+def create_mock_app(config: Optional[MockConfig] = None) -> FastAPI:
+    config = config or MockConfig()
+    app = FastAPI(title="mock providers")
+    app.state.config = config
+    app.state.requests = {"chat": 0, "embed": 0, "errors": 0}
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests["chat"] += 1
+        status = config.failure()
+        await asyncio.sleep(config.delay(config.llm_ms))
+        if status is not None:
+            app.state.requests["errors"] += 1
+            return _error(status)
+        words = _REPLY.split(" ")[: max(1, int(body.get("max_tokens") or 800))]
+        created = int(time.time())
+        if not body.get("stream"):
+            return {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": created,
+                "model": body.get("model", "mock"),
+                "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": " ".join(words)}, "finish_reason": "stop"}
+                ],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(words), "total_tokens": len(words)},
+            }
+
+        async def events():
+            for i, word in enumerate(words):
+                chunk = {
+                    "id": "chatcmpl-mock",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": body.get("model", "mock"),
+                    "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(config.delay(config.token_ms))
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/models/{model:path}")
+    async def feature_extraction(model: str, request: Request):
+        body = await request.json()
+        app.state.requests["embed"] += 1
+        status = config.failure()
+        await asyncio.sleep(config.delay(config.embed_ms))
+        if status is not None:
+            app.state.requests["errors"] += 1
+            return _error(status)
+        inputs = body.get("inputs")
+        if isinstance(inputs, str):
+            return embed_text(inputs)
+        return [embed_text(text) for text in inputs or []]
+
+    @app.get("/stats")
+    def stats():
+        return app.state.requests
+
+    return app
+
+
+def config_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--llm-ms", type=float, default=300.0, help="median completion latency (time to first token)")
+    parser.add_argument("--token-ms", type=float, default=10.0, help="median gap between streamed tokens")
+    parser.add_argument("--embed-ms", type=float, default=20.0, help="median embedding latency")
+    parser.add_argument("--spread", type=float, default=0.3, help="log-normal sigma of every latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of provider calls that fail")
+    parser.add_argument("--error-status", default="429,503", help="comma-separated statuses for failures")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        llm_ms=args.llm_ms,
+        token_ms=args.token_ms,
+        embed_ms=args.embed_ms,
+        spread=args.spread,
+        error_rate=args.error_rate,
+        error_status=[int(s) for s in args.error_status.split(",") if s.strip()],
+        seed=args.seed,
+    )
+
+
+def _main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve stand-in Groq and Hugging Face APIs locally.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    uvicorn.run(create_mock_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,193 @@
+"""
+End-to-end chat benchmark with no network access.
+
+Starts the stand-in Groq / Hugging Face server (bench.mock_providers) in-process, launches
+`uvicorn src.main:app` against it with scratch index directories, waits for /ready, drives
+it with the open-loop load generator and prints p50 / p95 / p99 latency, time to first
+token, throughput, error rate, answers by source and provider errors (from /metrics).
+
+    cd backend
+    python -m bench.run --rps 20 --duration 30 --stream-ratio 0.3 --llm-ms 400 --error-rate 0.02
+
+Other backend settings (RAG_MAX_CONCURRENCY, LLM_HEDGE, ...) are read from the environment
+as usual. --target URL load-tests an already running server instead. With --max-p95-ms /
+--max-error-rate the exit code is 1 when the run misses them, so CI can gate on it.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import httpx
+
+from .loadgen import format_report, run_load, summarize
+from .mock_providers import config_arguments, config_from_args, create_mock_app
+
+_BACKEND_DIR = Path(__file__).resolve().parents[1]
+_SAMPLE = re.compile(r'^(\w+)\{(.*)\} ([0-9.eE+-]+)$')
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_mock(config, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(create_mock_app(config), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def _backend_env(mock_url: str, scratch: Path) -> Dict[str, str]:
+    metrics_dir = scratch / "metrics"
+    metrics_dir.mkdir(exist_ok=True)
+    env = dict(os.environ)
+    env.update({
+        "GROQ_API_KEY": "gsk_mock",
+        "HUGGINGFACEHUB_API_TOKEN": "hf_mock",
+        "OPENAI_API_KEY": "",
+        "GROQ_BASE_URL": mock_url,
+        "HF_INFERENCE_URL": f"{mock_url}/models",
+        # Mock vectors must never land in the real index or embedding cache, and mock queries
+        # must not search the real vectors of a built retrieval artifact.
+        "RAG_INDEX_DIR": str(scratch / "index"),
+        "RAG_ARTIFACT": "0",
+        "FAQ_INDEX_DIR": str(scratch / "faq"),
+        "EMBEDDING_CACHE": "0",
+        "SESSION_STORE": "memory",
+        "CORPUS_WATCH": "0",
+        "RELOAD_GENERATION_FILE": str(scratch / "reload.generation"),
+        # Every worker writes its metrics here, so one scrape of /metrics covers all of them.
+        "PROMETHEUS_MULTIPROC_DIR": str(metrics_dir),
+    })
+    return env
+
+
+def _wait_ready(base_url: str, process: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"backend exited with code {process.returncode} before it was ready")
+        try:
+            if httpx.get(f"{base_url}/ready", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise SystemExit(f"backend not ready after {timeout:.0f}s")
+
+
+def _counters(base_url: str) -> Dict[str, Dict[str, float]]:
+    """
+    rag_answers_total by source and provider_errors_total by provider/status. A launched
+    backend shares PROMETHEUS_MULTIPROC_DIR across its workers, and a --target behind
+    serve.py does the same, so these totals cover every worker whichever one answers.
+    """
+    out: Dict[str, Dict[str, float]] = {"answers": {}, "provider_errors": {}}
+    try:
+        text = httpx.get(f"{base_url}/metrics", timeout=5).text
+    except httpx.HTTPError:
+        return out
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        labels = dict(re.findall(r'(\w+)="([^"]*)"', labels))
+        if name == "rag_answers_total":
+            out["answers"][labels["source"]] = float(value)
+        elif name == "provider_errors_total":
+            out["provider_errors"][f"{labels['provider']} {labels['status']}"] = float(value)
+    return out
+
+
+def _delta(before: Dict[str, float], after: Dict[str, float]) -> Dict[str, int]:
+    return {k: int(v - before.get(k, 0.0)) for k, v in after.items() if v - before.get(k, 0.0)}
+
+
+def _main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline load test of the chat API.")
+    parser.add_argument("--rps", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument("--stream-ratio", type=float, default=0.3, help="share of requests sent to /chat/stream")
+    parser.add_argument("--repeat-questions", action="store_true", help="let the response cache absorb repeats")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--target", default="", help="URL of a running backend (skips the mock and the launch)")
+    parser.add_argument("--ready-timeout", type=float, default=120.0)
+    parser.add_argument("--json", default="", help="also write the report to this file")
+    parser.add_argument("--max-p95-ms", type=float, default=0.0)
+    parser.add_argument("--max-error-rate", type=float, default=-1.0)
+    config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    process = None
+    mock = None
+    scratch = tempfile.TemporaryDirectory(prefix="chat-bench-")
+    try:
+        if args.target:
+            base_url = args.target.rstrip("/")
+        else:
+            config = config_from_args(args)
+            error_rate, config.error_rate = config.error_rate, 0.0  # clean startup, faults during load
+            mock_port = _free_port()
+            mock = _start_mock(config, mock_port)
+            port = _free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            process = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(port),
+                 "--workers", str(args.workers), "--log-level", "warning"],
+                cwd=str(_BACKEND_DIR),
+                env=_backend_env(f"http://127.0.0.1:{mock_port}", Path(scratch.name)),
+            )
+            _wait_ready(base_url, process, args.ready_timeout)
+            config.error_rate = error_rate
+
+        before = _counters(base_url)
+        results, wall = asyncio.run(
+            run_load(base_url, args.rps, args.duration, stream_ratio=args.stream_ratio, unique=not args.repeat_questions)
+        )
+        summary = summarize(results, wall)
+        after = _counters(base_url)
+        summary["answers"] = _delta(before["answers"], after["answers"])
+        summary["provider_errors"] = _delta(before["provider_errors"], after["provider_errors"])
+        # The pipeline answers provider failures with a 200 apology; count those as errors too.
+        failed = summary["requests"] - summary["ok"] + summary["answers"].get("error", 0)
+        summary["error_rate"] = failed / summary["requests"]
+        summary["settings"] = {"rps": args.rps, "duration": args.duration, "stream_ratio": args.stream_ratio,
+                               "workers": args.workers, "target": args.target or "local mock"}
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        if mock is not None:
+            mock[0].should_exit = True
+            mock[1].join(timeout=5)
+        scratch.cleanup()
+
+    print(format_report(summary))
+    if args.json:
+        Path(args.json).write_text(json.dumps(summary, indent=2))
+    p95 = summary["latency_ms"]["p95"]
+    failed = (args.max_p95_ms > 0 and (p95 is None or p95 > args.max_p95_ms)) or (
+        args.max_error_rate >= 0 and summary["error_rate"] > args.max_error_rate
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main())
@@ -0,0 +1,37 @@
+"""
+Production entry point: no file-watching reloader, WEB_CONCURRENCY worker processes.
+For local development with auto-reload use `python app.py`.
+
+With several workers, metrics go through prometheus_client's multiprocess mode: every
+worker writes to PROMETHEUS_MULTIPROC_DIR (default backend/.metrics, emptied here at each
+start) so /metrics reports the whole server, whichever worker answers the scrape.
+"""
+import os
+import shutil
+from pathlib import Path
+
+import uvicorn
+
+from src.config.settings import settings
+
+
+def _prepare_metrics_dir(workers: int) -> None:
+  # Must be set before the workers import prometheus_client; stale files would add old counts.
+  if workers <= 1 and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    return
+  path = Path(os.getenv("PROMETHEUS_MULTIPROC_DIR") or Path(__file__).resolve().parent / ".metrics")
+  shutil.rmtree(path, ignore_errors=True)
+  path.mkdir(parents=True, exist_ok=True)
+  os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(path)
+
+
+if __name__ == "__main__":
+  workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+  _prepare_metrics_dir(workers)
+  uvicorn.run(
+    "src.main:app",
+    host=settings.host,
+    port=settings.port,
+    workers=workers,
+    proxy_headers=True,
+  )
@@ -1,7 +1,10 @@
-from ..services.rag_service import answer
+from ..services.rag_service import aanswer, stream_answer
 from typing import Optional
 
 
 async def chat(message: str, session_id: Optional[str] = None):
-  return answer(message, session_id=session_id)
+  return await aanswer(message, session_id=session_id)
 
+
+def chat_stream(message: str, session_id: Optional[str] = None):
+  return stream_answer(message, session_id=session_id)
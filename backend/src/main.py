@@ -11,13 +11,59 @@ load_dotenv(dotenv_path=str(_DOTENV_PATH), override=False)
 if _DOTENV_PATH.exists():
     print("[backend] Loaded .env from:", _DOTENV_PATH)
 
+import asyncio  # noqa: E402
+import os  # noqa: E402
+import threading  # noqa: E402
+from contextlib import asynccontextmanager, suppress  # noqa: E402
+
 from fastapi import FastAPI  # noqa: E402
 
 from .config.settings import settings  # noqa: E402
 from .middlewares.cors import add_cors  # noqa: E402
+from .middlewares.server_timing import add_server_timing  # noqa: E402
 from .routes.router import build_router  # noqa: E402
+from .services import conversation_summary  # noqa: E402
+from .services.corpus_watcher import polling_needed, watch_corpus  # noqa: E402
+from .utils import metrics  # noqa: E402
+from .utils.http_client import aclose_clients  # noqa: E402
+
+
+# Seconds shutdown waits for an unfinished warmup (model loading cannot be interrupted).
+_WARMUP_SHUTDOWN_TIMEOUT = 5.0
+
+
+def _warmup(stop: threading.Event) -> None:
+    # Imported here so the port is bound before langchain / FAISS / the models load.
+    from .services.rag_pipeline import warmup
+
+    warmup(stop)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in a worker thread: /health answers right away, /ready flips once loaded.
+    stop_warmup = threading.Event()
+    warming = (
+        asyncio.create_task(asyncio.to_thread(_warmup, stop_warmup)) if os.getenv("RAG_WARMUP", "1") != "0" else None
+    )
+    # Applies reloads published by other workers (and projects.json changes with CORPUS_WATCH=1).
+    watcher = asyncio.create_task(watch_corpus()) if polling_needed() else None
+    yield
+    if warming is not None:
+        stop_warmup.set()  # ends pending retries right away
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(asyncio.shield(warming), timeout=_WARMUP_SHUTDOWN_TIMEOUT)
+    if watcher is not None:
+        watcher.cancel()
+        with suppress(asyncio.CancelledError):
+            await watcher
+    conversation_summary.shutdown()
+    await aclose_clients()
+    metrics.mark_process_dead(os.getpid())
+
 
-app = FastAPI(title=settings.app_name)
+app = FastAPI(title=settings.app_name, lifespan=lifespan)
 add_cors(app, origins=settings.cors_origins)
+add_server_timing(app)
 app.include_router(build_router())
 
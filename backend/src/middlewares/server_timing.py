@@ -0,0 +1,51 @@
+import os
+import time
+
+from starlette.datastructures import MutableHeaders
+
+from ..utils import metrics
+
+
+class ServerTimingMiddleware:
+  """
+  Records http_request_duration_seconds and adds a `Server-Timing` header listing the
+  pipeline stages (embed, search, prompt, llm) that ran before the response started.
+  Streamed responses send headers first, so theirs only carry `total` (time to headers).
+  """
+
+  def __init__(self, app, header: bool = True):
+    self.app = app
+    self.header = header
+
+  async def __call__(self, scope, receive, send):
+    if scope["type"] != "http":
+      await self.app(scope, receive, send)
+      return
+    started = time.perf_counter()
+    timings, token = metrics.track_request()
+    status = 500
+
+    async def send_with_timing(message):
+      nonlocal status
+      if message["type"] == "http.response.start":
+        status = message["status"]
+        if self.header:
+          total_ms = (time.perf_counter() - started) * 1000.0
+          MutableHeaders(scope=message).append("Server-Timing", metrics.server_timing(timings, total_ms))
+      await send(message)
+
+    try:
+      await self.app(scope, receive, send_with_timing)
+    finally:
+      metrics.untrack_request(token)
+      # Route template (e.g. /chat), not the raw path, keeps label cardinality bounded.
+      route = scope.get("route")
+      metrics.HTTP_SECONDS.labels(
+        method=scope["method"],
+        path=getattr(route, "path", "unmatched"),
+        status=status,
+      ).observe(time.perf_counter() - started)
+
+
+def add_server_timing(app):
+  app.add_middleware(ServerTimingMiddleware, header=os.getenv("SERVER_TIMING", "1").strip() != "0")
@@ -0,0 +1,269 @@
+"""
+Chat session stores: session_id -> (rolling summary, [(user, assistant), ...]).
+
+The summary condenses turns that were compacted out of the history (see
+services/conversation_summary.py); it is "" until the first compaction.
+
+- MemorySessionStore: per-process LRU + TTL, bounded by session count and stored characters.
+- SQLiteSessionStore: one SQLite file shared by every worker on the host, so any worker
+  can continue a conversation started on another.
+
+Select with SESSION_STORE=memory (default) or SESSION_STORE=sqlite.
+Tuning (env):
+- SESSION_TTL            idle seconds before a session expires (default 3600)
+- SESSION_MAX_SESSIONS   sessions kept before LRU eviction (default 1000)
+- SESSION_MAX_CHARS      memory store only: total stored characters (default 2_000_000)
+- SESSION_DB_PATH        SQLite file (default backend/sessions.db)
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+_BACKEND_DIR = Path(__file__).resolve().parents[2]  # .../backend
+_DEFAULT_DB_PATH = _BACKEND_DIR / "sessions.db"
+
+History = List[Tuple[str, str]]
+
+
+def _history_chars(history: History) -> int:
+    return sum(len(u) + len(a) for u, a in history)
+
+
+class SessionStore(ABC):
+    """Storage for per-session chat history. Implementations must be thread-safe."""
+
+    @abstractmethod
+    def load(self, session_id: str) -> Tuple[str, History]:
+        """Return (summary, history), or ("", []) for unknown / expired sessions."""
+
+    @abstractmethod
+    def set(self, session_id: str, history: History, summary: str = "") -> None:
+        """Replace the stored summary and history and mark the session as recently used."""
+
+    def get(self, session_id: str) -> History:
+        return self.load(session_id)[1]
+
+    @abstractmethod
+    def compact(self, session_id: str, summary: str, older: History, new_summary: str) -> bool:
+        """
+        Atomically replace `summary` + `older` (the leading turns) with `new_summary`, keeping
+        the turns after them. Returns False, changing nothing, if the session no longer has
+        that summary or no longer starts with those turns.
+        """
+
+    @abstractmethod
+    def stats(self) -> Dict[str, object]:
+        """Size and eviction counters."""
+
+
+class MemorySessionStore(SessionStore):
+    def __init__(self, max_sessions: int = 1000, ttl: float = 3600.0, max_chars: int = 2_000_000):
+        self.max_sessions = max(1, max_sessions)
+        self.ttl = ttl
+        self.max_chars = max_chars
+        # session_id -> (summary, history, last_used); order = recency.
+        self._sessions: "OrderedDict[str, Tuple[str, History, float]]" = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _drop(self, session_id: str) -> None:
+        summary, history, _ = self._sessions.pop(session_id)
+        self._chars -= len(summary) + _history_chars(history)
+
+    def load(self, session_id: str) -> Tuple[str, History]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return "", []
+            summary, history, last_used = entry
+            if time.monotonic() - last_used > self.ttl:
+                self._drop(session_id)
+                self.expirations += 1
+                return "", []
+            # A read is use too: keep active sessions ahead of idle ones for LRU eviction.
+            self._sessions[session_id] = (summary, history, time.monotonic())
+            self._sessions.move_to_end(session_id)
+            return summary, list(history)
+
+    def set(self, session_id: str, history: History, summary: str = "") -> None:
+        history = list(history)
+        with self._lock:
+            if session_id in self._sessions:
+                self._drop(session_id)
+            self._sessions[session_id] = (summary, history, time.monotonic())
+            self._chars += len(summary) + _history_chars(history)
+            # Least recently used sessions come first, so expired ones are found at the front.
+            now = time.monotonic()
+            oldest = next(iter(self._sessions))
+            while now - self._sessions[oldest][2] > self.ttl:
+                self._drop(oldest)
+                self.expirations += 1
+                oldest = next(iter(self._sessions))
+            while len(self._sessions) > 1 and (
+                len(self._sessions) > self.max_sessions or self._chars > self.max_chars
+            ):
+                self._drop(next(iter(self._sessions)))
+                self.evictions += 1
+
+    def compact(self, session_id: str, summary: str, older: History, new_summary: str) -> bool:
+        older = [tuple(turn) for turn in older]
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or entry[0] != summary or entry[1][: len(older)] != older:
+                return False
+            history = entry[1][len(older):]
+            self._chars += len(new_summary) + _history_chars(history) - len(summary) - _history_chars(entry[1])
+            self._sessions[session_id] = (new_summary, history, entry[2])
+            return True
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "size": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "chars": self._chars,
+                "max_chars": self.max_chars,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class SQLiteSessionStore(SessionStore):
+    # Expired/overflow rows are pruned every N writes rather than on each one.
+    _PRUNE_EVERY = 50
+
+    def __init__(self, path: Path = _DEFAULT_DB_PATH, max_sessions: int = 1000, ttl: float = 3600.0):
+        self.path = Path(path)
+        self.max_sessions = max(1, max_sessions)
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.evictions = 0
+        self.expirations = 0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY, summary TEXT NOT NULL DEFAULT '',"
+            " history TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions(updated_at)")
+        try:
+            # Databases created before rolling summaries existed.
+            conn.execute("ALTER TABLE sessions ADD COLUMN summary TEXT NOT NULL DEFAULT ''")
+        except sqlite3.OperationalError:
+            pass
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shareable across threads; keep one per thread.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id: str) -> Tuple[str, History]:
+        row = self._conn().execute(
+            "SELECT summary, history, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return "", []
+        if time.time() - row[2] > self.ttl:
+            return "", []
+        return row[0], [tuple(turn) for turn in json.loads(row[1])]
+
+    def set(self, session_id: str, history: History, summary: str = "") -> None:
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO sessions (session_id, summary, history, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET summary = excluded.summary, history = excluded.history, "
+            "updated_at = excluded.updated_at",
+            (session_id, summary, json.dumps([list(turn) for turn in history]), time.time()),
+        )
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self._PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def compact(self, session_id: str, summary: str, older: History, new_summary: str) -> bool:
+        # Compare-and-swap in one UPDATE: it only matches if no worker (in any process)
+        # rewrote the row since it was read.
+        conn = self._conn()
+        row = conn.execute("SELECT summary, history FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None or row[0] != summary:
+            return False
+        history = [tuple(turn) for turn in json.loads(row[1])]
+        if history[: len(older)] != [tuple(turn) for turn in older]:
+            return False
+        rest = json.dumps([list(turn) for turn in history[len(older):]])
+        updated = conn.execute(
+            "UPDATE sessions SET summary = ?, history = ? WHERE session_id = ? AND summary = ? AND history = ?",
+            (new_summary, rest, session_id, summary, row[1]),
+        ).rowcount
+        return updated == 1
+
+    def prune(self) -> None:
+        conn = self._conn()
+        expired = conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.ttl,)).rowcount
+        overflow = conn.execute(
+            "DELETE FROM sessions WHERE session_id IN ("
+            " SELECT session_id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,),
+        ).rowcount
+        with self._lock:
+            self.expirations += max(expired, 0)
+            self.evictions += max(overflow, 0)
+
+    def stats(self) -> Dict[str, object]:
+        size = self._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        with self._lock:
+            return {
+                "backend": "sqlite",
+                "size": size,
+                "max_sessions": self.max_sessions,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def create_session_store() -> SessionStore:
+    backend = (os.getenv("SESSION_STORE") or "memory").strip().lower()
+    ttl = float(os.getenv("SESSION_TTL", "3600"))
+    max_sessions = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+    if backend == "sqlite":
+        path = (os.getenv("SESSION_DB_PATH") or "").strip() or _DEFAULT_DB_PATH
+        return SQLiteSessionStore(Path(path), max_sessions=max_sessions, ttl=ttl)
+    if backend != "memory":
+        raise RuntimeError(f"Unknown SESSION_STORE={backend!r}. Use 'memory' or 'sqlite'.")
+    return MemorySessionStore(
+        max_sessions=max_sessions,
+        ttl=ttl,
+        max_chars=int(os.getenv("SESSION_MAX_CHARS", "2000000")),
+    )
+
+
+def get_session_store() -> SessionStore:
+    """Process-wide store, created from env on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_session_store()
+    return _store
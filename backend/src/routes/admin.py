@@ -0,0 +1,28 @@
+import os
+import secrets
+
+from fastapi import APIRouter, BackgroundTasks, Header, HTTPException
+
+from ..services.corpus_watcher import apply_reload, publish_reload
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def _require_admin(token: str) -> None:
+  expected = (os.getenv("ADMIN_TOKEN") or "").strip()
+  if not expected:
+    raise HTTPException(status_code=404, detail="Not Found")
+  if not secrets.compare_digest(token.strip(), expected):
+    raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@router.post("/reload", status_code=202)
+def reload(background_tasks: BackgroundTasks, x_admin_token: str = Header(default="")):
+  """
+  Rebuild the portfolio summary + index in the background and swap them in (needs ADMIN_TOKEN).
+  This worker reloads right away; the others pick the reload up from the generation file.
+  """
+  _require_admin(x_admin_token)
+  token = publish_reload()
+  background_tasks.add_task(apply_reload, token)
+  return {"status": "reload scheduled", "generation": token}
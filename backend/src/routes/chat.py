@@ -1,11 +1,19 @@
+import json
+
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 
 from ..controllers.chat_controller import chat as chat_handler
+from ..controllers.chat_controller import chat_stream as chat_stream_handler
 from ..validators.chat import ChatRequest, ChatResponse
 
 router = APIRouter()
 
 
+def _sse(event: str, data: dict) -> str:
+  return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
   try:
@@ -14,3 +22,28 @@ async def chat_endpoint(request: ChatRequest):
   except Exception as e:
     raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+  """
+  Server-Sent Events: `session` first, then one `token` event per chunk, then `done`,
+  or `error` instead of `done` if the answer was cut off (the turn is then not saved).
+  Each `data:` line is JSON so tokens containing newlines survive framing.
+  """
+  session_id, tokens = chat_stream_handler(request.message, session_id=request.session_id)
+
+  async def events():
+    yield _sse("session", {"session_id": session_id})
+    try:
+      async for token in tokens:
+        yield _sse("token", {"text": token})
+    except Exception as e:
+      yield _sse("error", {"detail": str(e)})
+      return
+    yield _sse("done", {"session_id": session_id, "sources": []})
+
+  return StreamingResponse(
+    events(),
+    media_type="text/event-stream",
+    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+  )
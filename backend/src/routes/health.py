@@ -1,4 +1,5 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 
 router = APIRouter()
 
@@ -12,3 +13,11 @@ def root():
 def health():
   return {"status": "ok"}
 
+
+@router.get("/ready")
+def ready():
+  """Readiness probe: 200 only once embeddings, FAISS and the LLM client are loaded and warmed up."""
+  from ..services.rag_pipeline import readiness  # deferred: the pipeline loads langchain + FAISS
+
+  state = readiness()
+  return JSONResponse(state, status_code=200 if state["ready"] else 503)
@@ -0,0 +1,34 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from ..repositories.session_store import get_session_store
+from ..utils import metrics
+
+router = APIRouter()
+
+
+def _collect_gauges():
+  from ..services.rag_pipeline import llm_stats
+  from ..services.response_cache import get_response_cache
+
+  cache = get_response_cache()
+  if cache is not None:
+    stats = cache.stats()
+    metrics.RESPONSE_CACHE_HIT_RATIO.set(stats["hit_rate"])
+    metrics.RESPONSE_CACHE_SIZE.set(stats["size"])
+  sessions = get_session_store().stats()
+  metrics.SESSION_STORE_SIZE.set(sessions["size"])
+  if "chars" in sessions:
+    metrics.SESSION_STORE_CHARS.set(sessions["chars"])
+  for backend in (llm_stats() or {}).get("backends", []):
+    metrics.LLM_BACKEND_OPEN.labels(backend=backend["name"]).set(0 if backend["circuit"] == "closed" else 1)
+
+
+@router.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+  """
+  Prometheus text exposition. Behind serve.py (multiprocess mode) counters and histograms
+  cover all workers; gauges are per worker (`pid` label).
+  """
+  _collect_gauges()
+  return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
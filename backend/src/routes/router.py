@@ -1,14 +1,20 @@
 from fastapi import APIRouter
 
+from .admin import router as admin_router
 from .chat import router as chat_router
 from .debug import router as debug_router
 from .health import router as health_router
+from .metrics import router as metrics_router
+from .stats import router as stats_router
 
 
 def build_router() -> APIRouter:
   api = APIRouter()
   api.include_router(health_router)
   api.include_router(chat_router)
+  api.include_router(stats_router)
+  api.include_router(metrics_router)
   api.include_router(debug_router)
+  api.include_router(admin_router)
   return api
 
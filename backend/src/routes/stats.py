@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+
+from ..repositories.session_store import get_session_store
+
+router = APIRouter()
+
+
+@router.get("/stats")
+def stats():
+  from ..services.rag_pipeline import llm_stats
+  from ..services.response_cache import get_response_cache
+
+  cache = get_response_cache()
+  return {
+    "response_cache": cache.stats() if cache is not None else {"enabled": False},
+    "sessions": get_session_store().stats(),
+    "llm": llm_stats() or {"initialized": False},
+  }
@@ -0,0 +1,205 @@
+"""
+Precomputed BM25 inverted index and reciprocal-rank fusion with dense results.
+
+Dense MiniLM retrieval often under-ranks exact terms ("YOLOv8", "MLflow", "Prophet").
+The index covers the same chunks as FAISS, one document per FAISS position, and is kept
+as flat numpy arrays: a sorted term array and CSR postings (term -> [positions], with the
+full BM25 weight of each posting precomputed), so scoring a query is a few vectorized
+adds. Documents are not copied; search results are resolved through the vector store's
+docstore.
+
+The arrays are saved next to the index they were built from, in `bm25-<key>/` where the
+key hashes the store's docstore IDs in position order, and memory-mapped on load. A
+worker only builds them when no saved copy matches its store (first start, or after the
+index changed).
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain.docstore.document import Document
+
+from .index_manifest import chunk_id
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_ARRAYS = ("terms", "offsets", "positions", "weights")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    def __init__(
+        self,
+        terms: np.ndarray,
+        offsets: np.ndarray,
+        positions: np.ndarray,
+        weights: np.ndarray,
+        size: int,
+        document: Callable[[int], Document],
+    ):
+        """
+        `terms` sorted; postings of terms[t] live in [offsets[t], offsets[t + 1]) of
+        `positions` / `weights`. `document(position)` resolves a result.
+        """
+        self.terms = terms
+        self.offsets = offsets
+        self.positions = positions
+        self.weights = weights
+        self.size = size
+        self.document = document
+
+    @classmethod
+    def build(
+        cls, texts: Sequence[str], document: Callable[[int], Document], k1: float = 1.5, b: float = 0.75
+    ) -> "BM25Index":
+        """Index `texts[i]` as position i."""
+        rows: List[Dict[str, int]] = []
+        for text in texts:
+            counts: Dict[str, int] = {}
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+            rows.append(counts)
+        vocab = sorted(set().union(*rows)) if rows else []
+        term_ids = {term: i for i, term in enumerate(vocab)}
+
+        n_docs = len(rows)
+        doc_len = np.asarray([sum(r.values()) for r in rows], dtype=np.float32)
+        avg_len = float(doc_len.mean()) if n_docs else 0.0
+        df = np.zeros(len(vocab), dtype=np.int32)
+        for counts in rows:
+            for term in counts:
+                df[term_ids[term]] += 1
+        idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=offsets[1:])
+        fill = offsets[:-1].copy()
+        positions = np.empty(int(offsets[-1]), dtype=np.int32)
+        weights = np.empty(int(offsets[-1]), dtype=np.float32)
+        for doc_idx, counts in enumerate(rows):
+            norm = k1 * (1.0 - b + b * (doc_len[doc_idx] / avg_len if avg_len else 0.0))
+            for token, tf in counts.items():
+                term = term_ids[token]
+                pos = fill[term]
+                positions[pos] = doc_idx
+                weights[pos] = idf[term] * tf * (k1 + 1.0) / (tf + norm)
+                fill[term] += 1
+        terms = np.array([t.encode("ascii") for t in vocab], dtype=f"S{max([len(t) for t in vocab] or [1])}")
+        return cls(terms, offsets, positions, weights, n_docs, document)
+
+    @classmethod
+    def from_documents(cls, docs: Sequence[Document]) -> "BM25Index":
+        """Build from chunks, keeping one copy per chunk ID (the splitter can emit duplicates)."""
+        unique: Dict[str, Document] = {}
+        for doc in docs:
+            unique.setdefault(chunk_id(doc), doc)
+        kept = list(unique.values())
+        return cls.build([d.page_content for d in kept], kept.__getitem__)
+
+    @classmethod
+    def from_store(cls, store) -> "BM25Index":
+        """Build over a LangChain FAISS store, FAISS position i as document i."""
+        document = _store_documents(store)
+        return cls.build([document(pos).page_content for pos in range(len(store.index_to_docstore_id))], document)
+
+    def save(self, directory: Path) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(directory / f"{name}.npy", getattr(self, name))
+        with open(directory / "bm25.json", "w", encoding="utf-8") as f:
+            json.dump({"size": self.size}, f)
+
+    @classmethod
+    def load(cls, directory: Path, document: Callable[[int], Document]) -> Optional["BM25Index"]:
+        """Map a saved index; None if there is none in `directory`."""
+        try:
+            with open(directory / "bm25.json", encoding="utf-8") as f:
+                size = int(json.load(f)["size"])
+            arrays = [np.load(directory / f"{name}.npy", mmap_mode="r") for name in _ARRAYS]
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(*arrays, size, document)
+
+    def _term(self, token: str) -> Optional[int]:
+        key = token.encode("ascii")
+        i = int(np.searchsorted(self.terms, key))
+        return i if i < len(self.terms) and self.terms[i] == key else None
+
+    def search(self, query: str, k: int, allowed: Optional[np.ndarray] = None) -> List[Tuple[Document, float]]:
+        """Top-k by BM25; `allowed` restricts results to those positions (metadata prefilter)."""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for token in set(tokenize(query)):
+            term = self._term(token)
+            if term is None:
+                continue
+            start, end = self.offsets[term], self.offsets[term + 1]
+            scores[self.positions[start:end]] += self.weights[start:end]
+        if allowed is not None:
+            mask = np.zeros(self.size, dtype=bool)
+            mask[allowed] = True
+            scores[~mask] = 0.0
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.document(int(i)), float(scores[i])) for i in top]
+
+
+def _store_documents(store) -> Callable[[int], Document]:
+    mapping, docstore = store.index_to_docstore_id, store.docstore
+    return lambda position: docstore.search(mapping[position])
+
+
+def store_key(store) -> str:
+    """Hash of the store's docstore IDs in FAISS position order (what the BM25 positions refer to)."""
+    mapping = store.index_to_docstore_id
+    ids = "\n".join(mapping[pos] for pos in range(len(mapping)))
+    return hashlib.sha256(ids.encode("utf-8")).hexdigest()[:16]
+
+
+def load_or_build_for_store(store, index_dir: Path) -> BM25Index:
+    """
+    The BM25 index saved in `index_dir` for exactly this store, else one built from the
+    store and saved there for the next worker / restart.
+    """
+    index_dir = Path(index_dir)
+    directory = index_dir / f"bm25-{store_key(store)}"
+    bm25 = BM25Index.load(directory, _store_documents(store))
+    if bm25 is not None:
+        return bm25
+    bm25 = BM25Index.from_store(store)
+    # Written whole to a temporary directory and renamed, so a reader never sees half an index.
+    tmp = index_dir / f".{directory.name}.{os.getpid()}.tmp"
+    try:
+        shutil.rmtree(tmp, ignore_errors=True)
+        bm25.save(tmp)
+        for old in index_dir.glob("bm25-*"):
+            if old != directory:
+                shutil.rmtree(old, ignore_errors=True)
+        os.replace(tmp, directory)
+    except OSError as e:
+        # Another worker saved the same index first, or the index directory was swapped away.
+        print(f"[bm25] not saved to {directory}: {e}")
+        shutil.rmtree(tmp, ignore_errors=True)
+    return bm25
+
+
+def reciprocal_rank_fusion(result_lists: Sequence[Sequence[Document]], k: int, rrf_k: int = 60) -> List[Document]:
+    """Fuse ranked lists: score(d) = sum over lists of 1 / (rrf_k + rank). Ties keep first-seen order."""
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            cid = chunk_id(doc)
+            docs.setdefault(cid, doc)
+            scores[cid] = scores.get(cid, 0.0) + 1.0 / (rrf_k + rank)
+    ranked = sorted(scores, key=lambda cid: scores[cid], reverse=True)
+    return [docs[cid] for cid in ranked[:k]]
@@ -0,0 +1,95 @@
+"""
+Rolling conversation summaries, computed off the request path.
+
+Once a session holds more than SESSION_SUMMARIZE_AFTER raw turns, a background worker
+folds all but the last SESSION_KEEP_TURNS into the session's rolling summary with one
+LLM call and stores (summary, recent turns). Requests only ever read what is stored, so
+per-session memory and prompt size stay bounded however long the conversation runs.
+
+A compaction is applied only if the session still starts with the turns it summarized
+under the same summary; if a request rewrote the session meanwhile, the result is
+dropped and the next turn schedules a fresh one. The check and the write are one atomic
+store operation (SessionStore.compact), so this holds across worker processes sharing
+the SQLite store, not just across threads.
+
+SESSION_SUMMARY=0 disables it (sessions then keep their last turns only).
+"""
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Set, Tuple
+
+from ..repositories.session_store import get_session_store
+
+History = List[Tuple[str, str]]
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# Sessions with a compaction queued or running (one at a time per session); guarded by _lock.
+_pending: Set[str] = set()
+_lock = threading.Lock()
+
+
+def summary_enabled() -> bool:
+    return os.getenv("SESSION_SUMMARY", "1").strip() != "0"
+
+
+def _keep_turns() -> int:
+    return max(1, int(os.getenv("SESSION_KEEP_TURNS", "4")))
+
+
+def _summarize_after() -> int:
+    return max(_keep_turns() + 1, int(os.getenv("SESSION_SUMMARIZE_AFTER", "8")))
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, int(os.getenv("SESSION_SUMMARY_WORKERS", "1"))),
+                    thread_name_prefix="summarizer",
+                )
+    return _executor
+
+
+def _compact(session_id: str, summary: str, history: History) -> bool:
+    """Summarize all but the last turns of `history` into `summary`. Returns True if stored."""
+    try:
+        older = history[: -_keep_turns()]
+        try:
+            from .rag_pipeline import summarize_conversation  # deferred: loads langchain
+
+            new_summary = summarize_conversation(summary, older)
+        except Exception as e:
+            print(f"[summary] {session_id[:8]}: {e}")
+            return False
+        max_chars = int(os.getenv("SESSION_SUMMARY_MAX_CHARS", "1500"))
+        new_summary = new_summary[:max_chars]
+        return get_session_store().compact(session_id, summary, older, new_summary)
+    finally:
+        with _lock:
+            _pending.discard(session_id)
+
+
+def maybe_schedule(session_id: str, summary: str, history: History) -> Optional[Future]:
+    """Queue a compaction if `history` (as just stored) has grown past the threshold."""
+    if not summary_enabled() or len(history) <= _summarize_after():
+        return None
+    with _lock:
+        if session_id in _pending:
+            return None
+        _pending.add(session_id)
+    return _get_executor().submit(_compact, session_id, summary, list(history))
+
+
+def shutdown() -> None:
+    """Drop queued compactions; the sessions just keep their raw turns a little longer."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    with _lock:
+        _pending.clear()
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
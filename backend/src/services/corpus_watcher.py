@@ -0,0 +1,117 @@
+"""
+Hot reloads that reach every worker process.
+
+A reload is published as a new token in a shared generation file (RELOAD_GENERATION_FILE,
+default backend/reload.generation). Every worker polls that file and reloads once per
+token it has not applied yet, so POST /admin/reload, which lands on one worker, reaches
+all of them. The index build is serialized by the index lock (index_manifest.py): the
+first worker to get there builds, the others load its result.
+
+With CORPUS_WATCH=1, workers also poll data/projects.json's mtime/size and publish a
+token derived from it, so a change is applied once per worker however many notice it.
+Polling keeps this dependency-free; reloads run in a worker thread so the event loop keeps
+serving requests on the old snapshot meanwhile. The poller only runs when something else
+can publish: several workers (WEB_CONCURRENCY > 1), an explicitly shared
+RELOAD_GENERATION_FILE, or CORPUS_WATCH=1. A single worker reloads straight from the
+admin request.
+"""
+import asyncio
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Optional, Tuple
+
+from .rag_service import _PROJECTS_PATH, reload_portfolio
+
+_BACKEND_DIR = Path(__file__).resolve().parents[2]  # .../backend
+_DEFAULT_GENERATION = _BACKEND_DIR / "reload.generation"
+
+# Last token this process reloaded (or started reloading) for; claimed under _lock so the
+# admin task and the poller never both reload for the same token.
+_applied: Optional[str] = None
+_lock = threading.Lock()
+
+
+def _stamp(path: Path) -> Tuple[int, int]:
+    try:
+        st = path.stat()
+    except OSError:
+        return (0, 0)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def watch_enabled() -> bool:
+    return os.getenv("CORPUS_WATCH", "").strip() == "1"
+
+
+def polling_needed() -> bool:
+    """True when reloads can be published outside this process, or projects.json is watched."""
+    return (
+        watch_enabled()
+        or int(os.getenv("WEB_CONCURRENCY", "1")) > 1
+        or bool((os.getenv("RELOAD_GENERATION_FILE") or "").strip())
+    )
+
+
+def generation_path() -> Path:
+    return Path((os.getenv("RELOAD_GENERATION_FILE") or "").strip() or _DEFAULT_GENERATION)
+
+
+def read_generation() -> str:
+    try:
+        return generation_path().read_text(encoding="utf-8").strip()
+    except OSError:
+        return ""
+
+
+def publish_reload(token: str = "") -> str:
+    """Ask every worker to reload; returns the published token."""
+    token = token or uuid.uuid4().hex
+    path = generation_path()
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(token, encoding="utf-8")
+    os.replace(tmp, path)
+    return token
+
+
+def _claim(token: str) -> bool:
+    """Mark `token` as applied in this process; False if it already was."""
+    global _applied
+    with _lock:
+        if token == _applied:
+            return False
+        _applied = token
+        return True
+
+
+def apply_reload(token: str) -> Optional[dict]:
+    """Reload this worker for `token`, unless the poller already picked it up (then None)."""
+    if not _claim(token):
+        return None
+    return reload_portfolio()
+
+
+async def watch_corpus(path: Path = _PROJECTS_PATH, interval: float = 0.0) -> None:
+    """Run until cancelled; applies each published reload once in this worker."""
+    global _applied
+    interval = interval or float(os.getenv("CORPUS_WATCH_INTERVAL", "2"))
+    last = _stamp(path)
+    with _lock:
+        if _applied is None:
+            _applied = read_generation()  # tokens published before this worker started are already live
+    while True:
+        await asyncio.sleep(interval)
+        if watch_enabled():
+            current = _stamp(path)
+            if current != last:
+                last = current
+                publish_reload(f"corpus-{current[0]}-{current[1]}")
+        token = read_generation()
+        if not token or not _claim(token):
+            continue
+        try:
+            result = await asyncio.to_thread(reload_portfolio)
+            print(f"[corpus] reload {token}: done in {result['seconds']}s")
+        except Exception as e:
+            print(f"[corpus] reload {token} failed: {e}")
@@ -0,0 +1,234 @@
+"""
+Persistent, memory-mapped embedding cache keyed on (model, text hash).
+
+One append-only file per model: `<model hash>-<dim>d.bin`, made of fixed-size records
+(16-byte text digest + `dim` float32 values). Records are self-describing, so lookups
+binary-search the key column of the mapped file: each process only keeps a sorted array
+of the keys' first 8 bytes plus their row numbers, no per-key Python objects. Readers map
+the file read-only, so every worker process shares the same page-cache pages instead of
+holding its own copy. New vectors are appended with one O_APPEND write per batch, which
+other workers pick up on their next miss.
+
+Document vectors (bounded by the corpus) and query vectors (one per distinct user
+question) live in separate files, `<model hash>-<dim>d.bin` and
+`<model hash>-query-<dim>d.bin`. Only the query file is capped, at
+EMBEDDING_CACHE_MAX_ENTRIES records: a full file is compacted to its most recent records,
+so it cannot grow without bound, and document vectors are never dropped (an index rebuild
+never re-embeds the corpus because of user traffic). Appends and compactions take an
+inter-process lock; a torn trailing record left by a crash is cut off before the next
+append, so records never shift.
+
+EMBEDDING_CACHE=0 disables it; EMBEDDING_CACHE_DIR moves it (default backend/embedding_cache).
+"""
+import hashlib
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+from ..utils.file_lock import file_lock
+from .index_manifest import embedding_model_name
+from .query_batcher import embed_queries
+
+_BACKEND_DIR = Path(__file__).resolve().parents[2]  # .../backend
+_DEFAULT_DIR = _BACKEND_DIR / "embedding_cache"
+_KEY_BYTES = 16
+
+
+def _record_dtype(dim: int) -> np.dtype:
+    return np.dtype([("key", f"V{_KEY_BYTES}"), ("vec", "<f4", (dim,))])
+
+
+def text_key(text: str, kind: str = "doc") -> bytes:
+    # Queries and documents are kept apart: some models embed them differently.
+    return hashlib.sha256(f"{kind}\0{text}".encode("utf-8")).digest()[:_KEY_BYTES]
+
+
+class EmbeddingCache:
+    def __init__(self, directory: Path, model: str, kind: str = "doc", max_entries: int = 0):
+        """`kind` "query" uses its own file; `max_entries` > 0 compacts the file when it is full."""
+        self.directory = Path(directory)
+        self.model = model
+        self.prefix = hashlib.sha1(model.encode("utf-8")).hexdigest()[:12] + ("-query" if kind == "query" else "")
+        self.max_entries = max_entries
+        self._name = re.compile(re.escape(self.prefix) + r"-(\d+)d\.bin")
+        self._lock = threading.Lock()
+        self._path: Optional[Path] = None
+        self._dtype: Optional[np.dtype] = None
+        self._records: Optional[np.ndarray] = None
+        self._inode: Optional[int] = None
+        # Sorted first 8 key bytes (big-endian) and the row each one is at.
+        self._prefixes = np.empty(0, dtype=np.uint64)
+        self._rows = np.empty(0, dtype=np.int64)
+        self.hits = 0
+        self.misses = 0
+        self._refresh()
+
+    def _discover(self) -> None:
+        if not self.directory.is_dir():
+            return
+        for path in sorted(self.directory.iterdir()):
+            match = self._name.fullmatch(path.name)
+            if match:
+                self._path = path
+                self._dtype = _record_dtype(int(match.group(1)))
+                return
+
+    def _refresh(self) -> None:
+        """Map any records appended since the last look (by this or another process)."""
+        if self._path is None:
+            self._discover()
+        if self._path is None or not self._path.exists():
+            return
+        st = self._path.stat()
+        if st.st_ino != self._inode:
+            # First look, or the file was rotated (replaced) by this or another process.
+            self._records, self._inode = None, st.st_ino
+            self._prefixes, self._rows = np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+        # A torn trailing record (crash mid-write) is ignored by the integer division.
+        count = st.st_size // self._dtype.itemsize
+        mapped = 0 if self._records is None else len(self._records)
+        if count == mapped:
+            return
+        self._records = np.memmap(self._path, dtype=self._dtype, mode="r", shape=(count,))
+        # Merge the new rows into the sorted view (only they are sorted, not the whole file).
+        prefixes = _prefixes(self._records["key"][mapped:].tobytes())
+        rows = np.arange(mapped, count, dtype=np.int64)
+        order = np.argsort(prefixes, kind="stable")
+        at = np.searchsorted(self._prefixes, prefixes[order], side="right")
+        self._prefixes = np.insert(self._prefixes, at, prefixes[order])
+        self._rows = np.insert(self._rows, at, rows[order])
+
+    def _find(self, key: bytes) -> Optional[int]:
+        prefix = np.uint64(int.from_bytes(key[:8], "big"))
+        i = int(np.searchsorted(self._prefixes, prefix))
+        while i < len(self._prefixes) and self._prefixes[i] == prefix:
+            row = int(self._rows[i])
+            if self._records["key"][row].tobytes() == key:
+                return row
+            i += 1
+        return None
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[List[float]]]:
+        with self._lock:
+            rows = [self._find(k) for k in keys]
+            if any(row is None for row in rows):
+                self._refresh()
+                rows = [row if row is not None else self._find(k) for row, k in zip(rows, keys)]
+            out: List[Optional[List[float]]] = []
+            for row in rows:
+                if row is None:
+                    self.misses += 1
+                    out.append(None)
+                else:
+                    self.hits += 1
+                    out.append(self._records["vec"][row].tolist())
+            return out
+
+    def put_many(self, keys: Sequence[bytes], vectors: Sequence[Sequence[float]]) -> None:
+        if not keys:
+            return
+        dim = len(vectors[0])
+        with self._lock:
+            if self._path is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._path = self.directory / f"{self.prefix}-{dim}d.bin"
+                self._dtype = _record_dtype(dim)
+            if self._dtype["vec"].shape != (dim,):
+                return  # model output changed shape; never mix dimensions in one file
+            fresh = [(k, v) for k, v in zip(keys, vectors) if self._find(k) is None]
+            if not fresh:
+                return
+            records = np.empty(len(fresh), dtype=self._dtype)
+            records["key"] = [np.void(k) for k, _ in fresh]
+            records["vec"] = np.asarray([v for _, v in fresh], dtype=np.float32)
+            with file_lock(self._path.with_name(self._path.name + ".lock")):
+                self._append(records)
+            self._refresh()
+
+    def _append(self, records: np.ndarray) -> None:
+        """Append whole records (caller holds the file lock), compacting first if the file is full."""
+        itemsize = self._dtype.itemsize
+        size = self._path.stat().st_size if self._path.exists() else 0
+        target = self._path
+        if self.max_entries and size // itemsize + len(records) > self.max_entries:
+            # Keep the newest records, up to half the cap so compactions stay rare, in a new
+            # file (new inode) so readers notice and remap from scratch.
+            keep = max(0, self.max_entries // 2 - len(records))
+            print(f"[embeddings] cache {self._path.name} reached {self.max_entries} entries; keeping the newest {keep}")
+            kept = np.fromfile(self._path, dtype=self._dtype, count=size // itemsize)[-keep:] if keep else records[:0]
+            records = np.concatenate([kept, records[-self.max_entries :]])
+            target, size = self._path.with_name(self._path.name + ".tmp"), 0
+        fd = os.open(target, os.O_WRONLY | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            # Cuts a torn trailing record (crash mid-write) so later records never shift.
+            os.ftruncate(fd, size - size % itemsize)
+            os.lseek(fd, 0, os.SEEK_END)
+            view = memoryview(records.tobytes())
+            while view:
+                view = view[os.write(fd, view) :]
+        finally:
+            os.close(fd)
+        if target != self._path:
+            os.replace(target, self._path)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {"model": self.model, "size": len(self._rows), "hits": self.hits, "misses": self.misses}
+
+
+def _prefixes(keys: bytes) -> np.ndarray:
+    """First 8 bytes of each of the concatenated 16-byte keys, as sortable integers."""
+    return np.frombuffer(keys, dtype=">u8")[::2].astype(np.uint64)
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only calls the provider for texts it has never seen."""
+
+    def __init__(self, inner: Embeddings, cache: EmbeddingCache, query_cache: Optional[EmbeddingCache] = None):
+        self.inner = inner
+        self.cache = cache
+        self.query_cache = query_cache or cache
+        self.model_name = embedding_model_name(inner)
+
+    def _lookup(self, texts: List[str], kind: str, embed) -> List[List[float]]:
+        cache = self.query_cache if kind == "query" else self.cache
+        keys = [text_key(t, kind) for t in texts]
+        vectors = cache.get_many(keys)
+        missing: Dict[bytes, int] = {}
+        for i, v in enumerate(vectors):
+            if v is None:
+                missing.setdefault(keys[i], i)
+        if missing:
+            computed = embed([texts[i] for i in missing.values()])
+            cache.put_many(list(missing), computed)
+            by_key = {k: list(v) for k, v in zip(missing, computed)}
+            vectors = [v if v is not None else by_key[k] for k, v in zip(keys, vectors)]
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._lookup(list(texts), "doc", self.inner.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._lookup([text], "query", lambda ts: [self.inner.embed_query(ts[0])])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Batched `embed_query` (query cache keys), used by the query batcher."""
+        return self._lookup(list(texts), "query", lambda ts: embed_queries(self.inner, ts))
+
+
+def with_embedding_cache(embeddings: Embeddings) -> Embeddings:
+    if os.getenv("EMBEDDING_CACHE", "1").strip() == "0":
+        return embeddings
+    directory = Path((os.getenv("EMBEDDING_CACHE_DIR") or "").strip() or _DEFAULT_DIR)
+    model = embedding_model_name(embeddings)
+    max_entries = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+    return CachedEmbeddings(
+        embeddings,
+        EmbeddingCache(directory, model),  # bounded by the corpus; never dropped
+        EmbeddingCache(directory, model, kind="query", max_entries=max_entries),
+    )
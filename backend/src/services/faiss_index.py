@@ -0,0 +1,180 @@
+"""
+Selectable FAISS index types for larger corpora.
+
+RAG_INDEX_TYPE picks the structure (all use L2 distance, like LangChain's default):
+- flat   exact brute force (default; best for small corpora)
+- ivf    inverted lists; RAG_INDEX_NLIST lists (0 = ~4*sqrt(n)), RAG_INDEX_NPROBE probed per query
+- hnsw   graph search; RAG_INDEX_HNSW_M links per node, RAG_INDEX_EF_SEARCH / RAG_INDEX_EF_CONSTRUCTION
+- ivfpq  IVF with product-quantized vectors; RAG_INDEX_PQ_M sub-quantizers x RAG_INDEX_PQ_BITS bits
+
+The spec is stored in the index manifest. Approximate indexes are evaluated against an
+exact flat baseline right after they are built (recall@k and per-query latency), and
+the report is stored in the manifest too.
+
+Ad-hoc benchmark on synthetic data:
+    python -m src.services.faiss_index --type hnsw --n 50000 --dim 384
+"""
+import argparse
+import json
+import math
+import os
+import time
+from typing import Dict, Optional
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+
+
+def index_spec_from_env() -> Dict[str, object]:
+    index_type = (os.getenv("RAG_INDEX_TYPE") or "flat").strip().lower()
+    if index_type not in INDEX_TYPES:
+        raise RuntimeError(f"Unknown RAG_INDEX_TYPE={index_type!r}. Use one of: {', '.join(INDEX_TYPES)}.")
+    spec: Dict[str, object] = {"type": index_type}
+    if index_type in ("ivf", "ivfpq"):
+        spec["nlist"] = int(os.getenv("RAG_INDEX_NLIST", "0"))
+        spec["nprobe"] = int(os.getenv("RAG_INDEX_NPROBE", "8"))
+    if index_type == "ivfpq":
+        spec["pq_m"] = int(os.getenv("RAG_INDEX_PQ_M", "16"))
+        spec["pq_bits"] = int(os.getenv("RAG_INDEX_PQ_BITS", "8"))
+    if index_type == "hnsw":
+        spec["m"] = int(os.getenv("RAG_INDEX_HNSW_M", "32"))
+        spec["ef_search"] = int(os.getenv("RAG_INDEX_EF_SEARCH", "64"))
+        spec["ef_construction"] = int(os.getenv("RAG_INDEX_EF_CONSTRUCTION", "80"))
+    return spec
+
+
+def supports_remove(spec: Dict[str, object]) -> bool:
+    """
+    LangChain's FAISS.delete renumbers positions after `remove_ids`, which only matches
+    what IndexFlat does; IVF keeps its original ids and HNSW cannot remove at all.
+    """
+    return spec.get("type", "flat") == "flat"
+
+
+def _nlist(spec: Dict[str, object], n: int) -> int:
+    nlist = int(spec.get("nlist") or 0) or int(4 * math.sqrt(n))
+    # FAISS wants ~39 training points per centroid; never ask for more lists than that allows.
+    return max(1, min(nlist, n // 39 or 1))
+
+
+def build_faiss_index(vectors: np.ndarray, spec: Dict[str, object]) -> faiss.Index:
+    """Return an empty, trained index for `spec`. Falls back to flat when the corpus is too small to train."""
+    n, dim = vectors.shape
+    index_type = spec.get("type", "flat")
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, int(spec.get("m", 32)))
+        index.hnsw.efConstruction = int(spec.get("ef_construction", 80))
+        apply_search_params(index, spec)
+        return index
+    if index_type in ("ivf", "ivfpq"):
+        nlist = _nlist(spec, n)
+        quantizer = faiss.IndexFlatL2(dim)
+        if index_type == "ivfpq":
+            pq_m, pq_bits = int(spec.get("pq_m", 16)), int(spec.get("pq_bits", 8))
+            if dim % pq_m or n < (1 << pq_bits):
+                print(f"[index] ivfpq needs dim % pq_m == 0 and >= {1 << pq_bits} vectors; using flat")
+                return faiss.IndexFlatL2(dim)
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_bits)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        index.train(vectors)
+        apply_search_params(index, spec)
+        return index
+    return faiss.IndexFlatL2(dim)
+
+
+def apply_search_params(index: faiss.Index, spec: Dict[str, object]) -> None:
+    """Query-time knobs are not always persisted by write_index; set them after every load."""
+    if "nprobe" in spec and hasattr(index, "nprobe"):
+        index.nprobe = int(spec["nprobe"])
+    if "ef_search" in spec and hasattr(index, "hnsw"):
+        index.hnsw.efSearch = int(spec["ef_search"])
+
+
+def search_subset(index: faiss.Index, vector, k: int, positions: np.ndarray):
+    """
+    k nearest among `positions` only (a metadata prefilter). Returns (distances, positions),
+    without the -1 padding FAISS uses when fewer than k candidates are reachable.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    query = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+    k = min(k, len(positions))
+    if hasattr(index, "hnsw"):
+        # A selective filter cuts the graph into islands a beam search cannot reach;
+        # HNSWFlat keeps raw vectors, so score the subset exactly instead.
+        distances = ((index.reconstruct_batch(positions) - query) ** 2).sum(axis=1)
+        order = np.argsort(distances)[:k]
+        return distances[order], positions[order]
+    sel = faiss.IDSelectorBatch(positions)
+    if hasattr(index, "nprobe"):
+        # Matching chunks can sit in any list; probing all of them only scores selected ids.
+        params = faiss.SearchParametersIVF(sel=sel, nprobe=int(index.nlist))
+    else:
+        params = faiss.SearchParameters(sel=sel)
+    distances, found = index.search(query, k, params=params)
+    keep = found[0] >= 0
+    return distances[0][keep], found[0][keep]
+
+
+def _timed_search(index: faiss.Index, queries: np.ndarray, k: int):
+    latencies, ids = [], []
+    for q in queries:
+        started = time.perf_counter()
+        _, found = index.search(q[None, :], k)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+        ids.append(found[0])
+    return np.asarray(ids), np.asarray(latencies)
+
+
+def evaluate_against_flat(
+    index: faiss.Index, vectors: np.ndarray, k: int = 3, sample: int = 200, seed: int = 0
+) -> Dict[str, float]:
+    """recall@k of `index` vs exact search, using corpus vectors (plus noise) as queries."""
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(vectors), size=min(sample, len(vectors)), replace=False)
+    queries = vectors[picks] + rng.normal(0, 0.01, size=(len(picks), vectors.shape[1])).astype(np.float32)
+    k = min(k, len(vectors))
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    flat.add(vectors)
+    exact, flat_ms = _timed_search(flat, queries, k)
+    approx, approx_ms = _timed_search(index, queries, k)
+    hits = sum(len(set(a) & set(e)) for a, e in zip(approx, exact))
+    return {
+        "k": k,
+        "queries": len(queries),
+        "recall_at_k": round(hits / float(len(queries) * k), 4),
+        "p50_ms": round(float(np.percentile(approx_ms, 50)), 4),
+        "p99_ms": round(float(np.percentile(approx_ms, 99)), 4),
+        "flat_p50_ms": round(float(np.percentile(flat_ms, 50)), 4),
+        "flat_p99_ms": round(float(np.percentile(flat_ms, 99)), 4),
+        "bytes": int(faiss.serialize_index(index).size),
+        "flat_bytes": int(faiss.serialize_index(flat).size),
+    }
+
+
+def _main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Recall/latency of a FAISS index type vs the flat baseline.")
+    parser.add_argument("--type", choices=INDEX_TYPES, default=None, help="defaults to RAG_INDEX_TYPE")
+    parser.add_argument("--n", type=int, default=20000, help="synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args(argv)
+    if args.type:
+        os.environ["RAG_INDEX_TYPE"] = args.type
+    spec = index_spec_from_env()
+    rng = np.random.default_rng(42)
+    # Clustered data is closer to real embeddings than uniform noise.
+    centers = rng.normal(size=(64, args.dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, 64, size=args.n)] + rng.normal(0, 0.3, size=(args.n, args.dim)).astype(np.float32)
+    started = time.perf_counter()
+    index = build_faiss_index(vectors, spec)
+    index.add(vectors)
+    report = {"spec": spec, "build_s": round(time.perf_counter() - started, 3)}
+    report.update(evaluate_against_flat(index, vectors, k=args.k))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,277 @@
+"""
+Precomputed answers for canonical portfolio questions, served without the LLM.
+
+Tech stack, focus areas, the project list, repo links and per-project facts are all
+known from projects.json. This module pre-generates an answer for each canonical
+question (a few phrasings each) and stores it with the phrasings' embeddings in
+backend/faq_index/:
+- faq.json     entries, the projects.json digest and the embedding model;
+- vectors.npy  L2-normalized phrasing embeddings (float32), one row per phrasing.
+
+At request time an exact (normalized) phrasing match costs a dict lookup; otherwise the
+query embedding is compared with every phrasing and the answer is served when cosine
+similarity reaches FAQ_THRESHOLD. The index is regenerated whenever the projects.json
+digest or the embedding model changes (at startup and on hot reload).
+
+Answers are templated from projects.json by default. To have the LLM write them once
+offline instead (the stored answers are then reused until projects.json changes):
+    python -m src.services.faq_index --use-llm
+
+FAQ_INDEX=0 disables serving.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+from .index_manifest import embedding_model_name
+
+_BACKEND_DIR = Path(__file__).resolve().parents[2]  # .../backend
+DEFAULT_DIR = _BACKEND_DIR / "faq_index"
+_PROJECTS_PATH = _BACKEND_DIR / "data" / "projects.json"
+FAQ_VERSION = 1
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_question(text: str) -> str:
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def projects_digest(projects: Sequence[dict]) -> str:
+    payload = json.dumps(list(projects), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _bullets(items: Sequence[str]) -> str:
+    return "\n".join(f"• {item}" for item in items)
+
+
+def canonical_entries(projects: Sequence[dict]) -> List[Dict[str, object]]:
+    """[{"questions": [phrasings...], "answer": templated answer}] for the current projects."""
+    projects = [p for p in projects if isinstance(p, dict) and (p.get("title") or "").strip()]
+    if not projects:
+        return []
+    entries: List[Dict[str, object]] = []
+
+    by_category: Dict[str, List[str]] = {}
+    for p in projects:
+        stack = by_category.setdefault((p.get("category") or "Other").strip(), [])
+        stack.extend(t for t in p.get("technologies") or [] if t not in stack)
+    entries.append({
+        "questions": [
+            "What is your tech stack?",
+            "What technologies do you use?",
+            "What are your technical skills?",
+            "Which programming languages and frameworks do you know?",
+        ],
+        "answer": "Here's the stack I use across my projects.\nKey Highlights:\n"
+        + _bullets(f"{category}: {', '.join(stack)}" for category, stack in by_category.items())
+        + "\nWant more details? Just ask.",
+    })
+
+    entries.append({
+        "questions": [
+            "What projects have you worked on?",
+            "List your projects",
+            "Show me your portfolio projects",
+            "What have you built?",
+        ],
+        "answer": "Here are my main projects.\nKey Highlights:\n"
+        + _bullets(f"{p['title'].strip()}: {(p.get('summary') or p.get('description') or '').strip()}" for p in projects)
+        + "\nWant more details? Just ask.",
+    })
+
+    titles_by_category: Dict[str, List[str]] = {}
+    for p in projects:
+        titles_by_category.setdefault((p.get("category") or "Other").strip(), []).append(p["title"].strip())
+    entries.append({
+        "questions": [
+            "What areas do you work in?",
+            "What are your focus areas?",
+            "What kind of projects do you do?",
+            "What domains do you specialize in?",
+        ],
+        "answer": "I work across " + ", ".join(titles_by_category) + ".\nKey Highlights:\n"
+        + _bullets(f"{category}: {', '.join(titles)}" for category, titles in titles_by_category.items()),
+    })
+
+    with_repo = [p for p in projects if (p.get("github_url") or "").strip()]
+    if with_repo:
+        entries.append({
+            "questions": [
+                "Where can I see your code?",
+                "What is your GitHub?",
+                "Can you share your GitHub repositories?",
+            ],
+            "answer": "Here's where you can find the code:\n"
+            + _bullets(f"{p['title'].strip()}: {p['github_url'].strip()}" for p in with_repo),
+        })
+
+    for p in projects:
+        title = p["title"].strip()
+        tech = ", ".join(p.get("technologies") or [])
+        highlights = []
+        if p.get("challenges"):
+            highlights.append("Challenge: " + "; ".join(p["challenges"]))
+        if tech:
+            highlights.append("Tech used: " + tech)
+        if p.get("description"):
+            highlights.append("Result: " + p["description"].strip())
+        if p.get("impact"):
+            highlights.append("Impact: " + p["impact"].strip())
+        intro = (p.get("summary") or p.get("description") or title).strip()
+        entries.append({
+            "questions": [f"Tell me about {title}", f"What is the {title} project?", f"Describe {title}"],
+            "answer": f"{intro}\nKey Highlights:\n{_bullets(highlights)}\nWant more details? Just ask.",
+        })
+        if tech:
+            entries.append({
+                "questions": [f"What technologies did you use for {title}?", f"What is the tech stack of {title}?"],
+                "answer": f"For {title} I used {tech}.",
+            })
+        if p.get("impact"):
+            entries.append({
+                "questions": [f"What was the impact of {title}?", f"What results did {title} achieve?"],
+                "answer": f"{title}: {p['impact'].strip()}",
+            })
+    return entries
+
+
+class FAQIndex:
+    def __init__(self, entries: List[Dict[str, object]], vectors: np.ndarray, rows: List[int], threshold: float = 0.92):
+        self.entries = entries
+        self.vectors = vectors
+        self.rows = rows  # phrasing row -> entry index
+        self.threshold = threshold
+        self._exact = {
+            normalize_question(q): i for i, entry in enumerate(entries) for q in entry["questions"]
+        }
+        self.hits = 0
+
+    def lookup_text(self, question: str) -> Optional[str]:
+        i = self._exact.get(normalize_question(question))
+        if i is None:
+            return None
+        self.hits += 1
+        return self.entries[i]["answer"]
+
+    def lookup(self, vector: Sequence[float]) -> Optional[str]:
+        if not len(self.vectors):
+            return None
+        q = np.asarray(vector, dtype=np.float32)
+        if q.shape[0] != self.vectors.shape[1]:
+            return None
+        sims = self.vectors @ (q / max(float(np.linalg.norm(q)), 1e-12))
+        best = int(np.argmax(sims))
+        if float(sims[best]) < self.threshold:
+            return None
+        self.hits += 1
+        return self.entries[self.rows[best]]["answer"]
+
+
+def _embed_phrasings(entries: List[Dict[str, object]], embeddings: Embeddings):
+    phrasings, rows = [], []
+    for i, entry in enumerate(entries):
+        for q in entry["questions"]:
+            phrasings.append(q)
+            rows.append(i)
+    if not phrasings:
+        return np.zeros((0, 0), dtype=np.float32), rows
+    vectors = np.asarray(embeddings.embed_documents(phrasings), dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return vectors, rows
+
+
+def build_faq_index(
+    projects: Sequence[dict],
+    embeddings: Embeddings,
+    directory: Path = DEFAULT_DIR,
+    *,
+    answer: Optional[Callable[[str], str]] = None,
+) -> dict:
+    """Generate, embed and save the FAQ index. `answer(question)` overrides the templates."""
+    entries = canonical_entries(projects)
+    if answer is not None:
+        for entry in entries:
+            entry["answer"] = answer(entry["questions"][0])
+    vectors, rows = _embed_phrasings(entries, embeddings)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    np.save(directory / "vectors.npy", vectors)
+    meta = {
+        "version": FAQ_VERSION,
+        "projects_digest": projects_digest(projects),
+        "embedding_model": embedding_model_name(embeddings),
+        "generated_by": "llm" if answer is not None else "template",
+        "rows": rows,
+        "entries": entries,
+    }
+    tmp = directory / "faq.json.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, directory / "faq.json")
+    return meta
+
+
+def load_or_build_faq(projects: Sequence[dict], embeddings: Embeddings, directory: Path = DEFAULT_DIR) -> FAQIndex:
+    """Load the stored index if it matches projects.json and the embedding model, else regenerate it."""
+    directory = Path(directory)
+    threshold = float(os.getenv("FAQ_THRESHOLD", "0.92"))
+    try:
+        with open(directory / "faq.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        vectors = np.load(directory / "vectors.npy")
+    except (OSError, ValueError):
+        meta, vectors = None, None
+    stale = (
+        meta is None
+        or meta.get("version") != FAQ_VERSION
+        or meta.get("projects_digest") != projects_digest(projects)
+        or meta.get("embedding_model") != embedding_model_name(embeddings)
+    )
+    if stale:
+        print(f"[faq] generating answers for {len(projects)} projects")
+        meta = build_faq_index(projects, embeddings, directory)
+        vectors = np.load(directory / "vectors.npy")
+    return FAQIndex(meta["entries"], vectors, meta["rows"], threshold=threshold)
+
+
+def _main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Regenerate the precomputed FAQ answer index.")
+    parser.add_argument("--use-llm", action="store_true", help="have the configured LLM write each answer")
+    parser.add_argument("--dir", default=str(DEFAULT_DIR))
+    args = parser.parse_args(argv)
+
+    # Imported here: the full pipeline (and its providers) is only needed by this command.
+    from . import rag_pipeline, rag_service
+
+    os.environ["FAQ_INDEX"] = "0"  # never answer the generator's questions from a stale index
+    rag_pipeline._init_rag_once()
+    runtime = rag_pipeline._rag_runtime
+    if runtime is None:
+        raise SystemExit(f"RAG runtime unavailable: {rag_pipeline._rag_error}")
+
+    answer = None
+    if args.use_llm:
+        def answer(question: str) -> str:
+            return rag_pipeline.query_portfolio(
+                question,
+                system_prompt=rag_service.SYSTEM_PROMPT,
+                portfolio_summary=rag_service.portfolio_context(),
+            )
+
+    with open(_PROJECTS_PATH, encoding="utf-8") as f:
+        projects = json.load(f)
+    meta = build_faq_index(projects, runtime["embeddings"], Path(args.dir), answer=answer)
+    print(f"[faq] wrote {len(meta['entries'])} answers ({len(meta['rows'])} phrasings) to {args.dir}")
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,205 @@
+"""
+Content-addressed FAISS index builds.
+
+Every chunk gets a content hash (text + metadata) that doubles as its docstore ID. A
+`manifest.json` next to the index records those hashes, the embedding model, the
+splitter settings and the FAISS index spec (see faiss_index.py). On startup:
+- same embedding model and index spec -> load the index, delete chunks that disappeared
+  and embed + upsert only new or changed ones;
+- different model or spec, no manifest or unreadable index -> full rebuild. Approximate
+  index types also rebuild when chunks are removed (they cannot delete in place) or the
+  corpus has doubled since their centroids were trained.
+
+Several worker processes may start (or hot-reload) at once. All of this runs under an
+inter-process lock on `<index_dir>.lock` and the manifest is read only once the lock is
+held, so the first worker builds and the others load its result. A build is written to
+`<index_dir>.tmp` and swapped in whole, so a crash never leaves a half-written index.
+"""
+import hashlib
+import json
+import os
+import shutil
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain.docstore.document import Document
+from langchain.docstore.in_memory import InMemoryDocstore
+from langchain.embeddings.base import Embeddings
+from langchain.vectorstores import FAISS
+
+from ..utils.file_lock import file_lock
+from .faiss_index import (
+    apply_search_params,
+    build_faiss_index,
+    evaluate_against_flat,
+    index_spec_from_env,
+    supports_remove,
+)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def chunk_hash(doc: Document) -> str:
+    metadata = {k: v for k, v in (doc.metadata or {}).items() if k != "chunk_id"}
+    payload = json.dumps({"text": doc.page_content, "metadata": metadata}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def chunk_id(doc) -> str:
+    """Stable ID for a retrieved chunk: explicit metadata ID if present, else a content hash."""
+    cid = (getattr(doc, "metadata", None) or {}).get("chunk_id")
+    if cid:
+        return str(cid)
+    return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()[:16]
+
+
+def embedding_model_name(embeddings: Embeddings) -> str:
+    for attr in ("model_name", "model"):
+        value = getattr(embeddings, attr, None)
+        if isinstance(value, str) and value:
+            return value
+    return type(embeddings).__name__
+
+
+def load_manifest(index_dir: Path) -> Optional[dict]:
+    try:
+        with open(index_dir / MANIFEST_NAME, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(index_dir: Path, manifest: dict) -> None:
+    tmp = index_dir / (MANIFEST_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, index_dir / MANIFEST_NAME)
+
+
+def _swap_in(tmp: Path, index_dir: Path) -> None:
+    """Replace `index_dir` with the fully written `tmp` (callers hold the index lock)."""
+    old = index_dir.with_name(index_dir.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if index_dir.exists():
+        os.replace(index_dir, old)
+    os.replace(tmp, index_dir)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def _recover(index_dir: Path) -> None:
+    """Finish a swap a crashed process left half done."""
+    old = index_dir.with_name(index_dir.name + ".old")
+    if not index_dir.exists() and old.exists():
+        os.replace(old, index_dir)
+    shutil.rmtree(index_dir.with_name(index_dir.name + ".tmp"), ignore_errors=True)
+
+
+def _update(store: FAISS, manifest: dict, by_hash: "OrderedDict[str, Document]", spec: dict) -> bool:
+    """Apply the chunk diff in place. Returns True if the store changed."""
+    indexed = set(manifest.get("chunks") or [])
+    stale = [h for h in indexed if h not in by_hash]
+    fresh = [h for h in by_hash if h not in indexed]
+    if stale and not supports_remove(spec):
+        raise RuntimeError(f"{spec['type']} index cannot remove {len(stale)} stale chunks in place")
+    trained_on = (manifest.get("index") or {}).get("trained_on") or 0
+    if trained_on and spec["type"] in ("ivf", "ivfpq") and len(by_hash) > 2 * trained_on:
+        raise RuntimeError(f"corpus grew from {trained_on} to {len(by_hash)} chunks; retraining centroids")
+    if stale:
+        store.delete(stale)
+    if fresh:
+        store.add_documents([by_hash[h] for h in fresh], ids=fresh)
+    if stale or fresh:
+        print(f"[index] incremental update: +{len(fresh)} / -{len(stale)} chunks")
+    return bool(stale or fresh)
+
+
+def _build_store(docs: List[Document], ids: List[str], embeddings: Embeddings, spec: dict):
+    """Embed `docs` and index them with the structure from `spec`. Returns (store, report or None)."""
+    texts = [d.page_content for d in docs]
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    index = build_faiss_index(vectors, spec)
+    store = FAISS(embeddings, index, InMemoryDocstore({}), {})
+    store.add_embeddings(list(zip(texts, vectors.tolist())), metadatas=[d.metadata for d in docs], ids=ids)
+    report = None
+    if spec["type"] != "flat" and len(vectors):
+        report = evaluate_against_flat(index, vectors)
+        print(f"[index] {spec['type']} vs flat: {json.dumps(report)}")
+    return store, report
+
+
+def load_or_build_index(
+    chunks: List[Document],
+    embeddings: Embeddings,
+    index_dir: Path,
+    *,
+    splitter: Dict[str, object],
+    spec: Optional[Dict[str, object]] = None,
+) -> FAISS:
+    """Return a FAISS store for `chunks`, re-embedding only what the manifest does not cover."""
+    index_dir = Path(index_dir)
+    with file_lock(index_dir.with_name(index_dir.name + ".lock")):
+        _recover(index_dir)
+        return _load_or_build(chunks, embeddings, index_dir, splitter, spec)
+
+
+def _load_or_build(
+    chunks: List[Document],
+    embeddings: Embeddings,
+    index_dir: Path,
+    splitter: Dict[str, object],
+    spec: Optional[Dict[str, object]],
+) -> FAISS:
+    spec = dict(spec or index_spec_from_env())
+    model = embedding_model_name(embeddings)
+    by_hash: "OrderedDict[str, Document]" = OrderedDict()
+    for chunk in chunks:
+        h = chunk_hash(chunk)
+        chunk.metadata["chunk_id"] = h
+        by_hash.setdefault(h, chunk)
+
+    manifest = load_manifest(index_dir)
+    indexed = (manifest or {}).get("index") or {"spec": {"type": "flat"}}
+    store = None
+    changed = True
+    if manifest is None:
+        reason = "no manifest"
+    elif manifest.get("embedding_model") != model:
+        reason = f"embedding model changed to {model}"
+    elif indexed.get("spec") != spec:
+        reason = f"index spec changed to {spec}"
+    else:
+        try:
+            store = FAISS.load_local(str(index_dir), embeddings)
+            apply_search_params(store.index, spec)
+            changed = _update(store, manifest, by_hash, spec) or manifest.get("splitter") != splitter
+        except Exception as e:
+            reason = f"incremental update failed: {e}"
+            store = None
+            changed = True
+    if store is None:
+        print(f"[index] full build of {len(by_hash)} chunks ({reason})")
+        store, report = _build_store(list(by_hash.values()), list(by_hash), embeddings, spec)
+        indexed = {"spec": spec, "trained_on": len(by_hash), "report": report}
+
+    if changed:
+        tmp = index_dir.with_name(index_dir.name + ".tmp")
+        tmp.mkdir(parents=True)
+        store.save_local(str(tmp))
+        save_manifest(
+            tmp,
+            {
+                "version": MANIFEST_VERSION,
+                "embedding_model": model,
+                "splitter": splitter,
+                "index": indexed,
+                "chunks": list(by_hash),
+            },
+        )
+        _swap_in(tmp, index_dir)
+    return store
@@ -0,0 +1,346 @@
+"""
+Routing of chat completions across several LLM backends.
+
+Each backend (e.g. Groq llama-3.3-70b-versatile, Groq llama-3.1-8b-instant, OpenAI) keeps:
+- an EWMA of its latency and a window of recent latencies (for p95);
+- a circuit breaker: LLM_BREAKER_FAILURES consecutive errors (429, 5xx, timeouts, ...)
+  open it for LLM_BREAKER_COOLDOWN seconds. Afterwards it is half-open: a single test
+  call is let through while other requests keep skipping the backend; its success closes
+  the circuit, its failure reopens it. While every circuit is open, calls fail right away
+  with CircuitOpenError.
+
+Calls go to the first backend in priority order whose circuit is closed. Under pressure
+(the primary's EWMA above LLM_SLOW_MS) healthy backends are tried fastest first instead.
+A failing backend falls through to the next one, so a provider outage only surfaces if
+every backend fails.
+
+With LLM_HEDGE=1, an async call that is still pending after the backend's p95 latency
+(at least LLM_HEDGE_MIN_MS) fires the same request at the next backend and keeps
+whichever answers first. A call abandoned because its hedge won still counts towards
+its backend's latency, at no less than the hedge delay, so a slow backend's p95 and EWMA
+keep reflecting it. Streams are not hedged, but fail over until the first token.
+
+The router exposes the subset of the LangChain chat-model interface the pipeline uses:
+`predict_messages`, `apredict_messages` and `astream`.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from ..utils.metrics import record_provider_error
+
+
+class CircuitOpenError(RuntimeError):
+    """No backend could take the call: every circuit is open or being probed."""
+
+
+class Backend:
+    def __init__(
+        self,
+        name: str,
+        llm: Any,
+        *,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        alpha: float = 0.2,
+        window: int = 100,
+    ):
+        self.name = name
+        self.llm = llm
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self.ewma_ms: Optional[float] = None
+        self._latencies: "deque[float]" = deque(maxlen=window)
+        self._failures = 0
+        self._open_until = 0.0
+        self._probing = False  # a half-open test call is in flight
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def available(self) -> bool:
+        """Closed circuit, or an open one whose cooldown has ended and is not being probed."""
+        with self._lock:
+            if self._failures < self.failure_threshold:
+                return True
+            return not self._probing and time.monotonic() >= self._open_until
+
+    def acquire(self) -> Optional[bool]:
+        """
+        Admit a call: always while closed; once half-open, only as the single test call.
+        Returns None if the call is turned away, else whether it is the test call. That
+        flag goes back to record_success, record_failure or release when the call ends.
+        """
+        with self._lock:
+            if self._failures < self.failure_threshold:
+                return False
+            if self._probing or time.monotonic() < self._open_until:
+                return None
+            self._probing = True
+            return True
+
+    def release(self, probe: bool) -> None:
+        """An admitted call ended without an outcome (cancelled, abandoned)."""
+        if probe:
+            with self._lock:
+                self._probing = False
+
+    def _observe(self, elapsed_ms: float) -> None:
+        self._latencies.append(elapsed_ms)
+        self.ewma_ms = elapsed_ms if self.ewma_ms is None else self.alpha * elapsed_ms + (1 - self.alpha) * self.ewma_ms
+
+    def record_latency(self, elapsed_ms: float) -> None:
+        """A latency lower bound from a call that was abandoned before it answered."""
+        with self._lock:
+            self._observe(elapsed_ms)
+
+    def record_success(self, elapsed_ms: float, probe: bool = False) -> None:
+        with self._lock:
+            self.calls += 1
+            self._failures = 0
+            if probe:
+                self._probing = False
+            self._observe(elapsed_ms)
+
+    def record_failure(self, error: Optional[BaseException] = None, probe: bool = False) -> None:
+        if error is not None:
+            record_provider_error(self.name, error)
+        with self._lock:
+            self.calls += 1
+            self.errors += 1
+            self._failures += 1
+            if probe:
+                self._probing = False
+            if self._failures >= self.failure_threshold:
+                self._open_until = time.monotonic() + self.cooldown
+
+    def p95_ms(self) -> Optional[float]:
+        with self._lock:
+            if not self._latencies:
+                return None
+            ordered = sorted(self._latencies)
+            return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def stats(self) -> Dict[str, object]:
+        p95 = self.p95_ms()
+        with self._lock:
+            if self._failures < self.failure_threshold:
+                circuit = "closed"
+            else:
+                circuit = "half-open" if time.monotonic() >= self._open_until else "open"
+            return {
+                "name": self.name,
+                "calls": self.calls,
+                "errors": self.errors,
+                "ewma_ms": round(self.ewma_ms, 1) if self.ewma_ms is not None else None,
+                "p95_ms": round(p95, 1) if p95 is not None else None,
+                "circuit": circuit,
+            }
+
+
+class LLMRouter:
+    def __init__(
+        self,
+        backends: Sequence[Backend],
+        *,
+        hedge: bool = False,
+        hedge_min_ms: float = 500.0,
+        slow_ms: float = 0.0,
+    ):
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.backends = list(backends)
+        self.hedge = hedge
+        self.hedge_min_ms = hedge_min_ms
+        self.slow_ms = slow_ms
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def prefer(self, name: str) -> "LLMRouter":
+        """
+        A router over the same backends (shared stats and circuits) that tries `name` first,
+        e.g. a fast model for simple questions. Returns self if there is no such backend.
+        """
+        preferred = [b for b in self.backends if b.name == name]
+        if not preferred or preferred[0] is self.backends[0]:
+            return self
+        rest = [b for b in self.backends if b.name != name]
+        return LLMRouter(preferred + rest, hedge=self.hedge, hedge_min_ms=self.hedge_min_ms, slow_ms=self.slow_ms)
+
+    def _order(self) -> List[Backend]:
+        """Backends to try, best first, skipping open circuits."""
+        candidates = self.backends
+        primary = self.backends[0]
+        if self.slow_ms and primary.ewma_ms is not None and primary.ewma_ms > self.slow_ms:
+            # Unmeasured backends sort as "fast" so they get a chance to report a latency.
+            candidates = sorted(self.backends, key=lambda b: b.ewma_ms or 0.0)
+        return [b for b in candidates if b.available()]
+
+    def _admitted(self) -> Iterator[Tuple[Backend, bool]]:
+        """
+        (backend, is-the-test-call) in order, for each backend its circuit admits.
+        CircuitOpenError if none does: every circuit is cooling down or being probed.
+        """
+        admitted = False
+        for backend in self._order():
+            probe = backend.acquire()
+            if probe is not None:
+                admitted = True
+                yield backend, probe
+        if not admitted:
+            raise CircuitOpenError("every LLM backend's circuit is open")
+
+    def predict_messages(self, messages: list):
+        last_error: Optional[Exception] = None
+        for backend, probe in self._admitted():
+            started = time.perf_counter()
+            try:
+                result = backend.llm.predict_messages(messages)
+            except Exception as e:
+                backend.record_failure(e, probe)
+                print(f"[llm] {backend.name} failed: {e}")
+                last_error = e
+                continue
+            except BaseException:
+                backend.release(probe)
+                raise
+            backend.record_success((time.perf_counter() - started) * 1000.0, probe)
+            return result
+        raise last_error
+
+    async def _attempt(self, backend: Backend, probe: bool, messages: list):
+        started = time.perf_counter()
+        try:
+            result = await backend.llm.apredict_messages(messages)
+        except asyncio.CancelledError:
+            backend.release(probe)
+            raise
+        except Exception as e:
+            backend.record_failure(e, probe)
+            raise
+        backend.record_success((time.perf_counter() - started) * 1000.0, probe)
+        return result
+
+    def _hedge_delay(self, backend: Backend) -> float:
+        return max(self.hedge_min_ms, backend.p95_ms() or 0.0) / 1000.0
+
+    async def apredict_messages(self, messages: list):
+        order = self._admitted()
+        last_error: Optional[Exception] = None
+        running: Dict[asyncio.Task, Backend] = {}
+        started: Dict[asyncio.Task, float] = {}
+        delays: Dict[asyncio.Task, float] = {}  # hedge delay each task was given before its backup
+        hedged: Set[asyncio.Task] = set()
+        exhausted = False
+        hedge_won = False
+
+        def launch() -> Optional[asyncio.Task]:
+            nonlocal exhausted
+            admitted = None if exhausted else next(order, None)
+            if admitted is None:
+                exhausted = True
+                return None
+            backend, probe = admitted
+            task = asyncio.ensure_future(self._attempt(backend, probe, messages))
+            running[task] = backend
+            started[task] = time.perf_counter()
+            return task
+
+        try:
+            launch()
+            while running:
+                timeout = None
+                if self.hedge and not exhausted and len(running) == 1:
+                    task, backend = next(iter(running.items()))
+                    delays[task] = timeout = self._hedge_delay(backend)
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Primary is past its p95: race the next backend against it.
+                    task = launch()
+                    if task is not None:
+                        hedged.add(task)
+                        self.hedges += 1
+                    continue
+                for task in done:
+                    backend = running.pop(task)
+                    if task.exception() is None:
+                        if task in hedged:
+                            self.hedge_wins += 1
+                            hedge_won = True
+                        return task.result()
+                    last_error = task.exception()
+                    print(f"[llm] {backend.name} failed: {last_error}")
+                if not running:
+                    launch()
+            raise last_error
+        finally:
+            now = time.perf_counter()
+            for task, backend in running.items():
+                task.cancel()
+                if hedge_won and task in delays:
+                    # Hedged away: it took at least this long, and would have taken longer.
+                    backend.record_latency(max(now - started[task], delays[task]) * 1000.0)
+            order.close()
+
+    async def astream(self, messages: list) -> AsyncIterator[Any]:
+        last_error: Optional[Exception] = None
+        for backend, probe in self._admitted():
+            started = time.perf_counter()
+            stream = backend.llm.astream(messages)
+            try:
+                try:
+                    first = await stream.__anext__()
+                except StopAsyncIteration:
+                    backend.record_success((time.perf_counter() - started) * 1000.0, probe)
+                    return
+                except Exception as e:
+                    backend.record_failure(e, probe)
+                    print(f"[llm] {backend.name} failed: {e}")
+                    last_error = e
+                    continue
+                except BaseException:
+                    backend.release(probe)  # cancelled before the first token
+                    raise
+                try:
+                    yield first
+                    async for chunk in stream:
+                        yield chunk
+                except Exception as e:
+                    # Tokens were already sent; switching backends now would garble the reply.
+                    backend.record_failure(e, probe)
+                    raise
+                except BaseException:
+                    backend.release(probe)  # the consumer went away mid-stream
+                    raise
+                backend.record_success((time.perf_counter() - started) * 1000.0, probe)
+                return
+            finally:
+                await stream.aclose()
+        raise last_error or CircuitOpenError("no LLM backend was tried")
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "backends": [b.stats() for b in self.backends],
+            "hedge": self.hedge,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+def router_settings_from_env() -> Dict[str, object]:
+    return {
+        "hedge": os.getenv("LLM_HEDGE", "0").strip() == "1",
+        "hedge_min_ms": float(os.getenv("LLM_HEDGE_MIN_MS", "500")),
+        "slow_ms": float(os.getenv("LLM_SLOW_MS", "0")),
+    }
+
+
+def backend_settings_from_env() -> Dict[str, object]:
+    return {
+        "failure_threshold": int(os.getenv("LLM_BREAKER_FAILURES", "3")),
+        "cooldown": float(os.getenv("LLM_BREAKER_COOLDOWN", "30")),
+    }
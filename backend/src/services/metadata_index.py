@@ -0,0 +1,136 @@
+"""
+Metadata prefilter over projects.json fields.
+
+Every chunk carries its project's fields as metadata (category, type, technologies, ...).
+`MetadataIndex` keeps, for each filterable field value, a bitmap over FAISS positions, so a
+question such as "computer vision projects" or "what did you build with PyTorch?" is
+answered from the matching subset only: FAISS scores just those vectors (an IDSelector,
+see faiss_index.search_subset) and BM25 ranks just those chunks. Unknown or conflicting
+filters fall back to the whole corpus.
+
+The retrieval artifact stores the bitmaps (one row per field value) for workers to map
+instead of decoding every chunk's metadata.
+
+RAG_METADATA_FILTER=0 disables inference of filters from the question.
+"""
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain.docstore.document import Document
+
+from .faiss_index import search_subset
+
+# Fields a question can narrow on. Free text (challenges, impact) stays searchable via the
+# chunk text; filtering on it would be too brittle.
+FILTER_FIELDS = ("category", "type", "technologies")
+
+_NON_WORD = re.compile(r"[^a-z0-9+#.]+")
+
+
+def _normalize(value: str) -> str:
+    return _NON_WORD.sub(" ", value.lower()).strip()
+
+
+class MetadataIndex:
+    def __init__(self, size: int, bitmaps: Dict[str, Dict[str, np.ndarray]], labels: Dict[str, Dict[str, str]]):
+        """`bitmaps[field][key]` marks the FAISS positions whose `field` has that (normalized) value."""
+        self.size = size
+        self.bitmaps = bitmaps
+        self.labels = labels
+        # Longest values first, so "generative ai" wins over a bare "ai".
+        self._patterns: List[Tuple[str, str, re.Pattern]] = sorted(
+            (
+                (field, key, re.compile(r"(?<![a-z0-9])" + re.escape(key).replace(r"\ ", r"\s?") + r"s?(?![a-z0-9])"))
+                for field in FILTER_FIELDS
+                for key in self.bitmaps[field]
+            ),
+            key=lambda item: -len(item[1]),
+        )
+
+    @classmethod
+    def from_documents(cls, docs: List[Document]) -> "MetadataIndex":
+        """`docs[i]` must be the document stored at FAISS position i."""
+        bitmaps: Dict[str, Dict[str, np.ndarray]] = {f: {} for f in FILTER_FIELDS}
+        labels: Dict[str, Dict[str, str]] = {f: {} for f in FILTER_FIELDS}
+        for pos, doc in enumerate(docs):
+            for field in FILTER_FIELDS:
+                values = doc.metadata.get(field)
+                for value in values if isinstance(values, list) else [values]:
+                    key = _normalize(value or "")
+                    if not key:
+                        continue
+                    bitmap = bitmaps[field].get(key)
+                    if bitmap is None:
+                        bitmap = bitmaps[field][key] = np.zeros(len(docs), dtype=bool)
+                        labels[field][key] = value
+                    bitmap[pos] = True
+        return cls(len(docs), bitmaps, labels)
+
+    @classmethod
+    def from_vector_store(cls, vector_store) -> "MetadataIndex":
+        """Index the documents of a LangChain FAISS store in FAISS position order."""
+        mapping = vector_store.index_to_docstore_id
+        return cls.from_documents([vector_store.docstore.search(mapping[pos]) for pos in range(len(mapping))])
+
+    def save(self, directory: Path) -> None:
+        """metadata.json (field, key, label per row) + bitmaps.npy (one row of positions per field value)."""
+        directory.mkdir(parents=True, exist_ok=True)
+        rows = [(field, key, self.labels[field][key]) for field in FILTER_FIELDS for key in self.bitmaps[field]]
+        bits = np.zeros((len(rows), self.size), dtype=bool)
+        for i, (field, key, _) in enumerate(rows):
+            bits[i] = self.bitmaps[field][key]
+        np.save(directory / "bitmaps.npy", bits)
+        with open(directory / "metadata.json", "w", encoding="utf-8") as f:
+            json.dump({"size": self.size, "rows": rows}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["MetadataIndex"]:
+        """Map saved bitmaps; None if there are none in `directory`."""
+        try:
+            with open(directory / "metadata.json", encoding="utf-8") as f:
+                saved = json.load(f)
+            bits = np.load(directory / "bitmaps.npy", mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if bits.shape != (len(saved["rows"]), saved["size"]):
+            return None
+        bitmaps: Dict[str, Dict[str, np.ndarray]] = {f: {} for f in FILTER_FIELDS}
+        labels: Dict[str, Dict[str, str]] = {f: {} for f in FILTER_FIELDS}
+        for i, (field, key, label) in enumerate(saved["rows"]):
+            bitmaps.setdefault(field, {})[key] = bits[i]
+            labels.setdefault(field, {})[key] = label
+        return cls(int(saved["size"]), bitmaps, labels)
+
+    def infer_filters(self, question: str) -> Dict[str, List[str]]:
+        """Field values mentioned in the question, e.g. {"category": ["Computer Vision"]}."""
+        text = _normalize(question)
+        filters: Dict[str, List[str]] = {}
+        for field, key, pattern in self._patterns:
+            if pattern.search(text):
+                text = pattern.sub(" ", text)
+                filters.setdefault(field, []).append(self.labels[field][key])
+        return filters
+
+    def match(self, filters: Dict[str, List[str]]) -> Optional[np.ndarray]:
+        """FAISS positions matching every field (any of its values); None if nothing narrows."""
+        mask = None
+        for field, values in filters.items():
+            field_mask = np.zeros(self.size, dtype=bool)
+            for value in values:
+                bitmap = self.bitmaps.get(field, {}).get(_normalize(value))
+                if bitmap is not None:
+                    field_mask |= bitmap
+            mask = field_mask if mask is None else mask & field_mask
+        if mask is None or not mask.any() or mask.all():
+            return None
+        return np.flatnonzero(mask)
+
+
+def filtered_search(vector_store, vector: List[float], k: int, positions: np.ndarray) -> List[Document]:
+    """Dense top-k restricted to `positions` of the store's FAISS index."""
+    _, found = search_subset(vector_store.index, vector, k, positions)
+    mapping = vector_store.index_to_docstore_id
+    return [vector_store.docstore.search(mapping[int(pos)]) for pos in found]
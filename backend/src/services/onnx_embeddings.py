@@ -0,0 +1,154 @@
+"""
+int8-quantized ONNX build of all-MiniLM-L6-v2 for CPU-only hosts (EMBEDDINGS_BACKEND=onnx).
+
+The PyTorch sentence-transformers model costs hundreds of MB per worker and seconds to
+load. This backend runs the same network as a dynamically quantized ONNX graph under
+onnxruntime, tokenizes with the Rust `tokenizers` library, and reproduces the model's
+pooling (attention-masked mean, then L2 normalization). Its vectors agree with the fp32
+model to within ONNX_MAX_COSINE_DISTANCE (checked by the export command below), but they
+are not identical, so the backend reports its own model name (ONNX_MODEL_NAME): the FAISS
+index, FAQ index, retrieval artifact and embedding cache built with one backend are
+rebuilt, never mixed, after switching to the other.
+
+Runtime needs:  pip install onnxruntime tokenizers
+One-off export (also needs optimum + torch; writes backend/onnx_model/):
+    python -m src.services.onnx_embeddings
+
+ONNX_EMBED_DIR moves the model, ONNX_EMBED_THREADS sets onnxruntime's intra-op threads per
+worker (default 1: workers are the unit of parallelism), ONNX_EMBED_BATCH_SIZE the batch.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+ONNX_MODEL_NAME = f"{MODEL_NAME}+onnx-int8"
+_BACKEND_DIR = Path(__file__).resolve().parents[2]  # .../backend
+DEFAULT_DIR = _BACKEND_DIR / "onnx_model" / "all-MiniLM-L6-v2-int8"
+MAX_LENGTH = 256  # the model's max_seq_length
+ONNX_MAX_COSINE_DISTANCE = 0.02
+
+
+def mean_pool(hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Masked mean over tokens, L2-normalized: sentence-transformers' Pooling + Normalize."""
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (hidden * mask).sum(axis=1)
+    pooled = summed / np.maximum(mask.sum(axis=1), 1e-9)
+    return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+
+class OnnxEmbeddings(Embeddings):
+    model_name = ONNX_MODEL_NAME
+
+    def __init__(
+        self,
+        model_dir: Optional[Path] = None,
+        threads: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise RuntimeError(
+                "EMBEDDINGS_BACKEND=onnx needs onnxruntime and tokenizers: pip install onnxruntime tokenizers"
+            ) from e
+        self.model_dir = Path(model_dir or (os.getenv("ONNX_EMBED_DIR") or "").strip() or DEFAULT_DIR)
+        if not (self.model_dir / "model.onnx").exists():
+            raise RuntimeError(
+                f"No ONNX model in {self.model_dir}. Export it once: python -m src.services.onnx_embeddings"
+            )
+        self.batch_size = max(1, batch_size or int(os.getenv("ONNX_EMBED_BATCH_SIZE", "32")))
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = max(1, threads or int(os.getenv("ONNX_EMBED_THREADS", "1")))
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(
+            str(self.model_dir / "model.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        self._inputs = {i.name for i in self._session.get_inputs()}
+
+        self._tokenizer = Tokenizer.from_file(str(self.model_dir / "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length=MAX_LENGTH)
+        self._tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        encodings = self._tokenizer.encode_batch(texts)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+        }
+        if "token_type_ids" in self._inputs:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        hidden = self._session.run(None, feeds)[0]
+        return mean_pool(hidden, feeds["attention_mask"])
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed(texts[start : start + self.batch_size]).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+
+def max_cosine_distance(reference: Embeddings, candidate: Embeddings, texts: List[str]) -> float:
+    a = np.asarray(reference.embed_documents(texts), dtype=np.float32)
+    b = np.asarray(candidate.embed_documents(texts), dtype=np.float32)
+    a /= np.linalg.norm(a, axis=1, keepdims=True)
+    b /= np.linalg.norm(b, axis=1, keepdims=True)
+    return float(1.0 - (a * b).sum(axis=1).min())
+
+
+def export_quantized(out_dir: Path = DEFAULT_DIR) -> Path:
+    """Export MODEL_NAME to ONNX with optimum, quantize its weights to int8, keep the tokenizer."""
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+    except ImportError as e:
+        raise SystemExit("Export needs: pip install optimum[onnxruntime] transformers torch") from e
+    out_dir = Path(out_dir)
+    with tempfile.TemporaryDirectory() as tmp:
+        ORTModelForFeatureExtraction.from_pretrained(MODEL_NAME, export=True).save_pretrained(tmp)
+        AutoTokenizer.from_pretrained(MODEL_NAME).save_pretrained(tmp)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        quantize_dynamic(str(Path(tmp) / "model.onnx"), str(out_dir / "model.onnx"), weight_type=QuantType.QInt8)
+        shutil.copy(Path(tmp) / "tokenizer.json", out_dir / "tokenizer.json")
+    return out_dir
+
+
+def _main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Export the int8 ONNX embedding model and check it.")
+    parser.add_argument("--out", default=str(DEFAULT_DIR))
+    parser.add_argument("--skip-check", action="store_true", help="do not compare with the PyTorch model")
+    args = parser.parse_args(argv)
+
+    out = export_quantized(Path(args.out))
+    print(f"[onnx] wrote {out / 'model.onnx'} ({(out / 'model.onnx').stat().st_size / 1e6:.1f} MB)")
+    if args.skip_check:
+        return
+    from langchain.embeddings import HuggingFaceEmbeddings
+
+    from .rag_pipeline import _load_projects_as_documents
+
+    texts = [d.page_content for d in _load_projects_as_documents()] + ["What is your tech stack?", "hi"]
+    distance = max_cosine_distance(HuggingFaceEmbeddings(model_name=MODEL_NAME), OnnxEmbeddings(out), texts)
+    print(f"[onnx] max cosine distance to the fp32 model: {distance:.4f} (tolerance {ONNX_MAX_COSINE_DISTANCE})")
+    if distance > ONNX_MAX_COSINE_DISTANCE:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    _main()
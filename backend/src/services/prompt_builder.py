@@ -0,0 +1,122 @@
+"""
+Token-budgeted prompt assembly.
+
+The prompt is sent as two messages:
+- a system message that only changes when the system prompt or portfolio summary does
+  (persona, portfolio summary, response style). It is assembled and counted once per
+  summary, and being a byte-identical prefix on every call lets providers reuse their
+  prompt cache for it;
+- a user message with the per-request parts, fitted into RAG_PROMPT_TOKEN_BUDGET:
+  the question always, then retrieved chunks in rank order (at most
+  RAG_CONTEXT_TOKEN_BUDGET of them; 0 = no cap of their own), then conversation turns
+  newest first, then the session's rolling summary. Turns that no longer fit are
+  dropped oldest first and replaced by a one-line recap of what the user asked.
+"""
+import os
+from typing import List, Optional, Sequence, Tuple
+
+from langchain.schema.messages import BaseMessage, HumanMessage, SystemMessage
+
+STYLE_RULES = (
+    "RESPONSE STYLE (follow strictly):\n"
+    "- 5–8 lines max. Short intro sentence, then Key Highlights (bullets), then optional 'Want more details? Just ask.'\n"
+    "- For projects: intro, then Key Highlights with • Challenge: • Tech used: • Result: • Impact:\n"
+    "- Recruiter-friendly and skimmable. No long essays unless the user asks for more.\n"
+    "- Do not repeat your identity. Keep tone professional and natural."
+)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Cheap estimate (~4 characters per token for English with Llama / GPT tokenizers).
+    Budgets only need to be roughly right, and this keeps a tokenizer off the hot path.
+    """
+    return (len(text) + 3) // 4 if text else 0
+
+
+def _recap(turns: Sequence[Tuple[str, str]], max_chars: int = 80) -> str:
+    asked = [u.strip()[:max_chars] for u, _ in turns if u.strip()]
+    return "Earlier the user asked about: " + "; ".join(asked) if asked else ""
+
+
+class PromptBuilder:
+    def __init__(self, system_prompt: str, portfolio_summary: str, budget: int, context_budget: int = 0):
+        parts = []
+        if system_prompt.strip():
+            parts.append(system_prompt.strip())
+        if portfolio_summary.strip():
+            parts.append("PORTFOLIO SUMMARY:\n" + portfolio_summary.strip())
+        parts.append(STYLE_RULES)
+        self.system_prompt = system_prompt
+        self.portfolio_summary = portfolio_summary
+        self.system = "\n\n".join(parts)
+        self.system_tokens = count_tokens(self.system)
+        self.budget = budget
+        self.context_budget = context_budget
+
+    def build(
+        self,
+        question: str,
+        docs: list,
+        history: Sequence[Tuple[str, str]] = (),
+        summary: str = "",
+    ) -> List[BaseMessage]:
+        """`summary` condenses turns older than `history` (see conversation_summary.py)."""
+        question_part = "USER QUESTION:\n" + question.strip()
+        left = self.budget - self.system_tokens - count_tokens(question_part)
+
+        context: List[str] = []
+        context_left = self.context_budget or left
+        for doc in docs:
+            cost = count_tokens(doc.page_content) + 1
+            # The top chunk always goes in; the rest only while they fit.
+            if context and (cost > left or cost > context_left):
+                break
+            context.append(doc.page_content)
+            left -= cost
+            context_left -= cost
+        context_part = "RETRIEVED CONTEXT:\n" + ("\n\n".join(context) or "(no relevant snippets retrieved)")
+
+        kept: List[str] = []
+        turns = list(history)
+        while turns:
+            u, a = turns[-1]
+            text = f"User: {u}\nAssistant: {a}"
+            cost = count_tokens(text) + 1
+            if cost > left:
+                break
+            kept.insert(0, text)
+            left -= cost
+            turns.pop()
+        # Whatever did not fit is reduced to the questions asked.
+        older = _recap(turns)
+        if older and count_tokens(older) <= left:
+            kept.insert(0, older)
+            left -= count_tokens(older) + 1
+        if summary.strip() and count_tokens(summary) <= left:
+            kept.insert(0, "Summary of the earlier conversation: " + summary.strip())
+
+        parts = []
+        if kept:
+            parts.append("CONVERSATION HISTORY:\n" + "\n".join(kept))
+        parts.extend([context_part, question_part])
+        return [SystemMessage(content=self.system), HumanMessage(content="\n\n".join(parts))]
+
+
+_builder: Optional[PromptBuilder] = None
+
+
+def get_prompt_builder(system_prompt: str, portfolio_summary: str) -> PromptBuilder:
+    """The builder for the current summary; rebuilt only when the summary (e.g. after a reload) changes."""
+    global _builder
+    builder = _builder
+    if builder is not None and builder.system_prompt == system_prompt and builder.portfolio_summary == portfolio_summary:
+        return builder
+    builder = PromptBuilder(
+        system_prompt,
+        portfolio_summary,
+        budget=int(os.getenv("RAG_PROMPT_TOKEN_BUDGET", "3000")),
+        context_budget=int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "800")),
+    )
+    _builder = builder
+    return builder
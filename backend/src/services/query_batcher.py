@@ -0,0 +1,106 @@
+"""
+Micro-batching of query embeddings across concurrent requests.
+
+Queries that arrive within a short window (QUERY_BATCH_WINDOW_MS, default 5 ms) or until
+QUERY_BATCH_MAX queries are waiting are embedded with one batched call in a worker
+thread, and each caller gets its own vector back. For local sentence-transformers this
+replaces many tiny forward passes with one batched pass.
+
+Batches stay on the query path (see `embed_queries`), so a query gets the same vector
+whether or not it was batched, and the embedding cache files it under its query key.
+"""
+import asyncio
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+from langchain.embeddings.base import Embeddings
+
+# LangChain models whose embed_query is embed_documents on a single text.
+_SYMMETRIC = frozenset({"HuggingFaceEmbeddings", "OpenAIEmbeddings"})
+
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """
+    Query embeddings for several texts: the model's own batched `embed_queries` if it has
+    one, `embed_documents` where queries and documents embed alike, else one call each.
+    """
+    batched = getattr(embeddings, "embed_queries", None)
+    if batched is not None:
+        return batched(texts)
+    if type(embeddings).__name__ in _SYMMETRIC:
+        return embeddings.embed_documents(texts)
+    return [embeddings.embed_query(t) for t in texts]
+
+
+class QueryEmbeddingBatcher:
+    def __init__(self, embeddings: Embeddings, window_ms: float = 5.0, max_batch: int = 32):
+        self.embeddings = embeddings
+        self.window = max(0.0, window_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()  # strong refs so in-flight batches are not GC'd
+        self.batches = 0
+        self.queries = 0
+
+    async def embed(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((text, fut))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        unique: Dict[str, int] = {}
+        for text, _ in batch:
+            unique.setdefault(text, len(unique))
+        texts = list(unique)
+        self.batches += 1
+        self.queries += len(batch)
+        try:
+            if len(texts) == 1:
+                vectors = [await asyncio.to_thread(self.embeddings.embed_query, texts[0])]
+            else:
+                vectors = await asyncio.to_thread(embed_queries, self.embeddings, texts)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for text, fut in batch:
+            if not fut.done():
+                fut.set_result(vectors[unique[text]])
+
+
+# Futures and timers belong to one event loop, so the batcher is rebuilt per loop / embeddings object.
+_batcher: Optional[Tuple[asyncio.AbstractEventLoop, Embeddings, QueryEmbeddingBatcher]] = None
+
+
+async def aembed_query_batched(embeddings: Embeddings, text: str) -> List[float]:
+    """Embed one query, coalesced with concurrent callers (QUERY_BATCH_WINDOW_MS=0 disables)."""
+    global _batcher
+    window_ms = float(os.getenv("QUERY_BATCH_WINDOW_MS", "5"))
+    if window_ms <= 0:
+        return await embeddings.aembed_query(text)
+    loop = asyncio.get_running_loop()
+    if _batcher is None or _batcher[0] is not loop or _batcher[1] is not embeddings:
+        batcher = QueryEmbeddingBatcher(
+            embeddings,
+            window_ms=window_ms,
+            max_batch=int(os.getenv("QUERY_BATCH_MAX", "32")),
+        )
+        _batcher = (loop, embeddings, batcher)
+    return await _batcher[2].embed(text)
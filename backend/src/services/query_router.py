@@ -0,0 +1,173 @@
+"""
+Query-complexity routing.
+
+Each question gets one of these routes before retrieval:
+- greeting / thanks / links: answered from a template over projects.json. There is no
+  retrieval and no LLM call ("hi", "what's your GitHub?"). A question only counts as a
+  links request when it asks for nothing else: every word is a link word, filler, or
+  part of a project title ("code for the e-commerce project?", but not "does the rust
+  detector's code use OpenCV?");
+- simple: short factual questions go to the fast model (GROQ_FAST_MODEL);
+- complex: open-ended questions ("why", "how did you", comparisons) go to the primary model.
+
+Cheap heuristics run first. If they are not conclusive, the query embedding (which
+retrieval needs anyway) is compared with a few labelled exemplars per route, and the
+nearest one decides when its cosine similarity reaches QUERY_ROUTER_THRESHOLD.
+
+QUERY_ROUTING=0 sends everything down the primary path.
+"""
+import re
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+EXEMPLARS: Dict[str, List[str]] = {
+    "greeting": ["hi", "hello there", "hey, how are you?", "good morning", "hi! who are you?"],
+    "thanks": ["thanks!", "thank you so much", "great, thanks", "ok bye", "that's helpful, thank you"],
+    "links": [
+        "what's your github?",
+        "where can I see the code?",
+        "link to the repository",
+        "can you share the source code of your projects?",
+    ],
+    "simple": [
+        "what is your tech stack?",
+        "which projects use python?",
+        "what areas do you work in?",
+        "do you know react?",
+        "list your projects",
+        "what was the accuracy of the rust detector?",
+    ],
+    "complex": [
+        "how did you handle dataset labeling for rust detection and what trade-offs did you make?",
+        "compare your mlops project with the chatbot architecture",
+        "why did you choose yolov8 over other detectors?",
+        "walk me through how you would deploy a rag system at scale",
+        "what would you improve in your forecasting pipeline and why?",
+    ],
+}
+
+_WORD = re.compile(r"[a-z0-9']+")
+_GREETING_WORDS = {"hi", "hello", "hey", "hiya", "yo", "greetings", "morning", "afternoon", "evening", "good"}
+_THANKS_WORDS = {"thanks", "thank", "thx", "ty", "bye", "goodbye", "cheers"}
+# Acknowledgements that may accompany a thanks ("ok thanks!") but are not one on their own ("ok what about YOLO").
+_ACK_WORDS = {"great", "cool", "ok", "okay", "awesome", "that's", "helpful", "perfect", "nice"}
+_FILLER = {"there", "you", "so", "much", "a", "lot", "again", "all", "keltoum", "see", "ya"}
+_LINK_WORDS = {"github", "repo", "repos", "repository", "repositories", "code", "source", "link", "links", "url"}
+# Words a pure "where is the code?" request may contain besides link words and project titles.
+_LINK_FILLER = {
+    "what", "what's", "whats", "where", "is", "are", "the", "a", "an", "your", "yours", "for", "of", "to", "on",
+    "in", "can", "could", "would", "i", "you", "me", "see", "share", "send", "give", "find", "show", "get",
+    "please", "have", "any", "there", "project", "projects", "its", "it", "it's", "this", "that", "and", "or",
+}
+_COMPLEX = re.compile(
+    r"\b(why|how (did|do|would|does|could)|compare|comparison|difference|trade-?offs?|explain|walk me through"
+    r"|architecture|design|approach|improve|challenges?)\b"
+)
+
+
+class Route:
+    def __init__(self, name: str, answer: Optional[str] = None):
+        self.name = name
+        self.answer = answer
+
+    @property
+    def tier(self) -> str:
+        return "fast" if self.name == "simple" else "primary"
+
+
+class QueryRouter:
+    def __init__(self, projects: Sequence[dict], embeddings: Optional[Embeddings] = None, threshold: float = 0.8):
+        self.projects = [p for p in projects if isinstance(p, dict)]
+        self.threshold = threshold
+        self._labels: List[str] = []
+        self._exemplars: Optional[np.ndarray] = None
+        if embeddings is not None:
+            texts = [t for label in EXEMPLARS for t in EXEMPLARS[label]]
+            self._labels = [label for label in EXEMPLARS for _ in EXEMPLARS[label]]
+            vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+            self._exemplars = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def with_projects(self, projects: Sequence[dict]) -> "QueryRouter":
+        """Same exemplars (no re-embedding), templates over a reloaded projects.json."""
+        router = QueryRouter(projects, threshold=self.threshold)
+        router._labels, router._exemplars = self._labels, self._exemplars
+        return router
+
+    def _heuristic(self, question: str) -> Optional[str]:
+        text = question.lower().strip()
+        words = _WORD.findall(text)
+        if not words:
+            return None  # "?", "...", emoji: nothing to template, let the normal path handle it
+        if len(words) <= 6 and set(words) <= _GREETING_WORDS | _FILLER and set(words) & _GREETING_WORDS - {"good"}:
+            return "greeting"
+        if len(words) <= 6 and set(words) <= _THANKS_WORDS | _ACK_WORDS | _FILLER and set(words) & _THANKS_WORDS:
+            return "thanks"
+        if len(words) <= 12 and self._only_links(words):
+            return "links"
+        if len(words) > 25 or _COMPLEX.search(text):
+            return "complex"
+        return None
+
+    @staticmethod
+    def _stem(word: str) -> str:
+        return word[:6]
+
+    def _title_stems(self, project: dict) -> set:
+        return {self._stem(w) for w in _WORD.findall((project.get("title") or "").lower()) if len(w) > 3}
+
+    def _only_links(self, words: List[str]) -> bool:
+        """True when the question asks for links and nothing else."""
+        if not set(words) & _LINK_WORDS:
+            return False
+        titles = set().union(*(self._title_stems(p) for p in self.projects)) if self.projects else set()
+        return all(w in _LINK_WORDS or w in _LINK_FILLER or len(w) <= 1 or self._stem(w) in titles for w in words)
+
+    def _nearest(self, vector: Sequence[float]) -> Optional[str]:
+        if self._exemplars is None:
+            return None
+        q = np.asarray(vector, dtype=np.float32)
+        q = q / max(float(np.linalg.norm(q)), 1e-12)
+        sims = self._exemplars @ q
+        best = int(np.argmax(sims))
+        return self._labels[best] if float(sims[best]) >= self.threshold else None
+
+    def classify(self, question: str, vector: Optional[Sequence[float]] = None) -> Route:
+        """Heuristics only when `vector` is None; with the query embedding, exemplars break ties."""
+        name = self._heuristic(question)
+        if name is None and vector is not None:
+            name = self._nearest(vector)
+            if name == "links" and not self._only_links(_WORD.findall(question.lower())):
+                name = None  # similar to a links exemplar, but asks something else too
+        if name is None:
+            name = "simple" if len(_WORD.findall(question.lower())) <= 12 else "complex"
+        return Route(name, self._template(name, question))
+
+    def decided(self, question: str) -> Optional[Route]:
+        """A route the heuristics alone are sure of, or None if the embedding is needed."""
+        name = self._heuristic(question)
+        return Route(name, self._template(name, question)) if name is not None else None
+
+    def _template(self, name: str, question: str) -> Optional[str]:
+        if name == "greeting":
+            titles = [p.get("title", "") for p in self.projects if p.get("title")]
+            topics = ", ".join(titles[:3]) if titles else "my projects and experience"
+            return f"Hi! I'm Keltoum. Happy to walk you through my work, for example: {topics}. What would you like to know?"
+        if name == "thanks":
+            return "You're welcome! Want more details on any project? Just ask."
+        if name == "links":
+            stems = {self._stem(w) for w in _WORD.findall(question.lower()) if len(w) > 3}
+            named = [p for p in self.projects if self._title_stems(p) & stems]
+            with_repo = [p for p in (named or self.projects) if (p.get("github_url") or "").strip()]
+            if not with_repo:
+                if not named:
+                    return None
+                titles = " / ".join(p.get("title", "").strip() for p in named)
+                return (
+                    f"The code for {titles} isn't publicly linked in my portfolio. "
+                    "Happy to walk you through how it works, just ask!"
+                )
+            lines = [f"• {p.get('title', '').strip()}: {p['github_url'].strip()}" for p in with_repo]
+            return "Here's where you can find the code:\n" + "\n".join(lines)
+        return None
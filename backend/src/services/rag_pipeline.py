@@ -3,25 +3,48 @@ RAG pipeline: uses free APIs (Hugging Face + Groq) by default, or OpenAI if you
 """
 from langchain.docstore.document import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.vectorstores import FAISS
 from langchain.embeddings.base import Embeddings
+from langchain.schema.messages import HumanMessage, SystemMessage
+import asyncio
 import json
 import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import AsyncExitStack
 from pathlib import Path
-from typing import Optional
+from typing import Any, AsyncIterator, Generator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import httpx
 
 from ..utils.groq_debug import (
     get_groq_key_stripped,
+    groq_chat_url,
     log_groq_key_safe,
-    GROQ_CHAT_URL,
     GROQ_HEADER_AUTH,
     GROQ_HEADER_BEARER,
     GROQ_USER_AGENT,
 )
+from ..utils.http_client import get_async_client, get_sync_client
+from ..utils.metrics import ANSWERS, LLM_TOKENS, STAGE_SECONDS, record_provider_error, stage
+from .bm25 import BM25Index, load_or_build_for_store, reciprocal_rank_fusion
+from .embedding_cache import with_embedding_cache
+from .faq_index import FAQIndex, load_or_build_faq
+from .index_manifest import chunk_id, load_or_build_index
+from .llm_router import Backend, LLMRouter, backend_settings_from_env, router_settings_from_env
+from .metadata_index import MetadataIndex, filtered_search
+from .prompt_builder import count_tokens, get_prompt_builder
+from .query_batcher import aembed_query_batched
+from .query_router import QueryRouter, Route
+from .rerank import Reranker
+from .response_cache import SemanticResponseCache, get_response_cache
+from .retrieval_artifact import DEFAULT_DIR as _ARTIFACT_DIR, ColumnarDocstore, load_artifact
 
 # Paths relative to backend root (…/backend)
 _BACKEND_DIR = Path(__file__).resolve().parents[2]
 _DATA_PATH = _BACKEND_DIR / "data" / "projects.json"
+_FAQ_INDEX_DIR = _BACKEND_DIR / "faq_index"
 _FAISS_INDEX_FREE = _BACKEND_DIR / "faiss_index_free"   # Hugging Face embeddings
 _FAISS_INDEX_OPENAI = _BACKEND_DIR / "faiss_index"       # OpenAI embeddings
 
@@ -46,52 +69,218 @@ def _debug_env_state() -> None:
     print("[env] HUGGINGFACEHUB_API_TOKEN/HF_TOKEN:", _mask_secret(hf))
     print("[env] OPENAI_API_KEY:", _mask_secret(openai_key))
 
-def _load_projects_as_documents():
-    """Load projects.json and convert to LangChain Documents."""
+def _index_dir(default: Path, env: str = "RAG_INDEX_DIR") -> Path:
+    """Where an index is stored; the env var relocates it (e.g. scratch indexes for benchmarks)."""
+    return Path((os.getenv(env) or "").strip() or default)
+
+
+def _load_projects() -> list:
     with open(_DATA_PATH, encoding="utf-8") as f:
         projects = json.load(f)
+    return projects if isinstance(projects, list) else []
+
+
+def _load_projects_as_documents():
+    """Load projects.json and convert to LangChain Documents."""
     documents = []
-    for p in projects:
+    for p in _load_projects():
         text = (
             f"Project: {p.get('title', '')}. "
+            f"Summary: {p.get('summary', '')}. "
             f"Description: {p.get('description', '')}. "
-            f"Technologies: {', '.join(p.get('technologies', []))}."
+            f"Technologies: {', '.join(p.get('technologies', []))}. "
+            f"Category: {p.get('category', '')}. Type: {p.get('type', '')}. "
+            f"Challenges: {'; '.join(p.get('challenges', []))}. "
+            f"Impact: {p.get('impact', '')}. "
+            f"GitHub: {p.get('github_url', '')}."
         )
-        documents.append(Document(page_content=text, metadata={"title": p.get("title", "")}))
+        metadata = {
+            "title": p.get("title", ""),
+            "category": p.get("category", ""),
+            "type": p.get("type", ""),
+            "technologies": list(p.get("technologies", [])),
+            "challenges": list(p.get("challenges", [])),
+            "impact": p.get("impact", ""),
+            "github_url": p.get("github_url", ""),
+        }
+        documents.append(Document(page_content=text, metadata=metadata))
     return documents
 
+def _splitter_settings() -> dict:
+    return {
+        "chunk_size": int(os.getenv("RAG_CHUNK_SIZE", "1000")),
+        "chunk_overlap": int(os.getenv("RAG_CHUNK_OVERLAP", "200")),
+    }
+
+
+def _split_documents():
+    """Chunk the corpus. Returns (chunks, splitter settings recorded in the index manifest)."""
+    splitter = _splitter_settings()
+    text_splitter = RecursiveCharacterTextSplitter(**splitter)
+    return text_splitter.split_documents(_load_projects_as_documents()), splitter
+
+
+def _vector_store(embeddings, index_dir: Path):
+    """
+    The prebuilt, memory-mapped artifact when it was built from the current projects.json
+    (shared by all workers; nothing is chunked), else the regular index in `index_dir`,
+    updated incrementally from freshly split chunks (RAG_ARTIFACT=0 skips the artifact).
+    """
+    if os.getenv("RAG_ARTIFACT", "1").strip() != "0":
+        try:
+            corpus = _DATA_PATH.read_bytes()
+        except OSError:
+            corpus = None
+        if corpus is not None:
+            artifact_dir = _index_dir(_ARTIFACT_DIR, "RAG_ARTIFACT_DIR")
+            store = load_artifact(embeddings, artifact_dir, corpus=corpus, splitter=_splitter_settings())
+            if store is not None:
+                return store
+    chunks, splitter = _split_documents()
+    return load_or_build_index(chunks, embeddings, index_dir, splitter=splitter)
+
+
+def _build_bm25(vector_store, index_dir: Path) -> Optional[BM25Index]:
+    """Sparse index over the FAISS positions for exact-term questions (RAG_HYBRID=0 disables)."""
+    if os.getenv("RAG_HYBRID", "1").strip() == "0":
+        return None
+    docstore = vector_store.docstore
+    if isinstance(docstore, ColumnarDocstore):
+        bm25 = BM25Index.load(docstore.directory / "bm25", docstore.document)
+        if bm25 is not None:
+            return bm25
+    return load_or_build_for_store(vector_store, index_dir)
+
+
+def _build_query_router(embeddings) -> Optional[QueryRouter]:
+    """Greeting / FAQ / simple / complex routing (QUERY_ROUTING=0 disables)."""
+    if os.getenv("QUERY_ROUTING", "1").strip() == "0":
+        return None
+    try:
+        return QueryRouter(
+            _load_projects(),
+            embeddings,
+            threshold=float(os.getenv("QUERY_ROUTER_THRESHOLD", "0.8")),
+        )
+    except Exception as e:
+        # Exemplar embedding failed (provider down): heuristics still work.
+        print(f"[router] exemplar embeddings unavailable: {e}")
+        return QueryRouter(_load_projects())
+
+
+def _build_faq(embeddings) -> Optional[FAQIndex]:
+    """Precomputed answers for canonical questions (FAQ_INDEX=0 disables)."""
+    if os.getenv("FAQ_INDEX", "1").strip() == "0":
+        return None
+    try:
+        return load_or_build_faq(_load_projects(), embeddings, _index_dir(_FAQ_INDEX_DIR, "FAQ_INDEX_DIR"))
+    except Exception as e:
+        print(f"[faq] index unavailable: {e}")
+        return None
+
+
+def _fast_llm(llm):
+    """The router preferring GROQ_FAST_MODEL, used for questions classified as simple."""
+    fast_model = os.getenv("GROQ_FAST_MODEL", "llama-3.1-8b-instant").strip()
+    if not fast_model or not isinstance(llm, LLMRouter):
+        return llm
+    return llm.prefer(f"groq:{fast_model}")
+
+
+def _build_metadata_index(vector_store) -> Optional[MetadataIndex]:
+    """Field -> FAISS-position bitmaps used to prefilter retrieval (RAG_METADATA_FILTER=0 disables)."""
+    if os.getenv("RAG_METADATA_FILTER", "1").strip() == "0":
+        return None
+    docstore = vector_store.docstore
+    if isinstance(docstore, ColumnarDocstore):
+        metadata = MetadataIndex.load(docstore.directory / "metadata")
+        if metadata is not None:
+            return metadata
+    return MetadataIndex.from_vector_store(vector_store)
+
+
+def _build_reranker(vector_store) -> Optional[Reranker]:
+    """Over-fetch + dedupe + MMR second stage (RAG_RERANK=0 disables)."""
+    if os.getenv("RAG_RERANK", "1").strip() == "0":
+        return None
+    return Reranker.from_env(vector_store)
+
+
 class _HFEmbeddingsViaAPI(Embeddings):
-    """Hugging Face embeddings via Inference API."""
+    """
+    Hugging Face embeddings via Inference API.
+
+    `embed_documents` keeps up to HF_EMBED_CONCURRENCY batches in flight. The batch size
+    adapts: it grows after clean responses (up to HF_EMBED_MAX_BATCH) and halves when the
+    API throttles. 429 / 5xx responses and transport errors (connect / read timeouts,
+    dropped connections) are retried with exponential backoff, honouring Retry-After, up
+    to HF_EMBED_MAX_RETRIES times. No single wait exceeds HF_EMBED_MAX_BACKOFF seconds.
+    """
+    API_URL = "https://api-inference.huggingface.co/models"
+    # Rate limited, or the model is loading / overloaded.
+    _RETRY_STATUS = frozenset({429, 502, 503, 504})
+
     def __init__(self, token: str, model: str = "sentence-transformers/all-MiniLM-L6-v2"):
         self.token = token
-        self.url = f"https://api-inference.huggingface.co/models/{model}"
+        self.model = model
+        base = (os.getenv("HF_INFERENCE_URL") or "").strip().rstrip("/") or self.API_URL
+        self.url = f"{base}/{model}"
+        self.concurrency = max(1, int(os.getenv("HF_EMBED_CONCURRENCY", "4")))
+        self.max_batch = max(1, int(os.getenv("HF_EMBED_MAX_BATCH", "64")))
+        self.max_retries = max(0, int(os.getenv("HF_EMBED_MAX_RETRIES", "5")))
+        self.max_backoff = max(0.0, float(os.getenv("HF_EMBED_MAX_BACKOFF", "30")))
+        self._batch_size = min(self.max_batch, max(1, int(os.getenv("HF_EMBED_BATCH_SIZE", "8"))))
+        self._batch_lock = threading.Lock()
+
+    def _adapt(self, throttled: bool) -> None:
+        with self._batch_lock:
+            if throttled:
+                self._batch_size = max(1, self._batch_size // 2)
+            else:
+                self._batch_size = min(self.max_batch, self._batch_size + max(1, self._batch_size // 4))
+
+    def _backoff(self, attempt: int, resp: Optional[httpx.Response]) -> float:
+        """Retry-After if the response has one, else jittered exponential; capped either way."""
+        retry_after = resp.headers.get("Retry-After", "") if resp is not None else ""
+        try:
+            delay = max(0.0, float(retry_after))
+        except ValueError:
+            delay = 0.5 * (2 ** attempt) * (0.5 + random.random())
+        return min(self.max_backoff, delay)
 
     def _embed(self, texts):
-        import urllib.request
-        import urllib.error
         single = isinstance(texts, str)
         if single:
             texts = [texts]
-        body = json.dumps({"inputs": texts if len(texts) > 1 else texts[0]}).encode("utf-8")
-        req = urllib.request.Request(
-            self.url,
-            data=body,
-            headers={
-                "Authorization": f"Bearer {self.token}",
-                "Content-Type": "application/json",
-            },
-            method="POST",
-        )
-        try:
-            with urllib.request.urlopen(req, timeout=60) as resp:
-                out = json.loads(resp.read().decode())
-        except urllib.error.HTTPError as e:
-            if e.code == 410:
-                raise RuntimeError(
-                    "HTTP 410: Hugging Face serverless API for this model is no longer available. "
-                    "Install local embeddings: pip install sentence-transformers then restart."
-                ) from e
-            raise
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = get_sync_client().post(
+                    self.url,
+                    json={"inputs": texts if len(texts) > 1 else texts[0]},
+                    headers={
+                        "Authorization": f"Bearer {self.token}",
+                        "Content-Type": "application/json",
+                    },
+                )
+            except httpx.TransportError as e:
+                record_provider_error("huggingface", e)
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt, None))
+                continue
+            if resp.status_code >= 400:
+                record_provider_error("huggingface", resp.status_code)
+            if resp.status_code not in self._RETRY_STATUS or attempt == self.max_retries:
+                break
+            self._adapt(throttled=True)
+            time.sleep(self._backoff(attempt, resp))
+        if resp.status_code == 410:
+            raise RuntimeError(
+                "HTTP 410: Hugging Face serverless API for this model is no longer available. "
+                "Install local embeddings: pip install sentence-transformers then restart."
+            )
+        resp.raise_for_status()
+        out = resp.json()
         if isinstance(out, list):
             if out and isinstance(out[0], (int, float)):
                 return [out]
@@ -99,18 +288,40 @@ class _HFEmbeddingsViaAPI(Embeddings):
         raise RuntimeError(f"Unexpected HF API response: {type(out)}")
 
     def embed_documents(self, texts: list) -> list:
-        result = []
-        for i in range(0, len(texts), 8):
-            chunk = texts[i : i + 8]
-            result.extend(self._embed(chunk))
+        """Embed in concurrent, adaptively sized batches; output order matches `texts`."""
+        result: list = [None] * len(texts)
+        pos = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            running = {}
+            while pos < len(texts) or running:
+                # Batch bounds are fixed at submit time, so a later resize never reorders output.
+                while pos < len(texts) and len(running) < self.concurrency:
+                    end = min(len(texts), pos + self._batch_size)
+                    running[pool.submit(self._embed, texts[pos:end])] = pos
+                    pos = end
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    start = running.pop(fut)
+                    vectors = fut.result()
+                    result[start : start + len(vectors)] = vectors
+                    self._adapt(throttled=False)
         return result
 
     def embed_query(self, text: str) -> list:
         return self._embed(text)[0]
 
+    def embed_queries(self, texts: list) -> list:
+        # The API embeds queries and documents alike.
+        return self.embed_documents(texts)
+
 
 def _get_free_embeddings(hf_token: str):
     """Return embeddings: try HF API, on 410 try local sentence-transformers."""
+    if (os.getenv("EMBEDDINGS_BACKEND") or "").strip().lower() == "onnx":
+        # Same model as below, int8 ONNX on CPU; no API and no PyTorch. Has its own model name,
+        # so indexes and cached vectors from the fp32 model are not reused (see onnx_embeddings.py).
+        from .onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings()
     hf_token = (hf_token or "").strip()
     if not hf_token:
         # No HF token set: use local sentence-transformers (no external API key needed).
@@ -160,82 +371,100 @@ class _GroqLLMFallback:
         self.temperature = temperature
         self.max_tokens = max_tokens
 
-    def __call__(self, prompt: str) -> str:
-        import urllib.request
-        import urllib.error
-        req = urllib.request.Request(
-            GROQ_CHAT_URL,
-            data=json.dumps({
-                "model": self.model,
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": self.temperature,
-                "max_tokens": self.max_tokens,
-            }).encode("utf-8"),
-            headers={
-                GROQ_HEADER_AUTH: GROQ_HEADER_BEARER + self.api_key,
-                "Content-Type": "application/json",
-                "User-Agent": GROQ_USER_AGENT,
-            },
-            method="POST",
-        )
+    def _payload(self, prompt: Union[str, List[dict]]) -> dict:
+        """`prompt` is either plain text (one user message) or OpenAI-style chat messages."""
+        messages = [{"role": "user", "content": prompt}] if isinstance(prompt, str) else prompt
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+        }
+
+    def _headers(self) -> dict:
+        return {
+            GROQ_HEADER_AUTH: GROQ_HEADER_BEARER + self.api_key,
+            "Content-Type": "application/json",
+            "User-Agent": GROQ_USER_AGENT,
+        }
+
+    @staticmethod
+    def _parse(out: dict) -> str:
         try:
-            with urllib.request.urlopen(req, timeout=60) as resp:
-                out = json.loads(resp.read().decode())
-                return out["choices"][0]["message"]["content"].strip()
-        except urllib.error.HTTPError as e:
-            body = e.read().decode() if e.fp else ""
-            raise RuntimeError(f"Groq API error {e.code}: {body}") from e
-        except (KeyError, IndexError) as e:
+            return out["choices"][0]["message"]["content"].strip()
+        except (KeyError, IndexError, TypeError) as e:
             raise RuntimeError("Unexpected Groq API response") from e
 
-def _create_rag_with_free_apis():
-    """
-    Use Groq for chat + embeddings via:
-    - Hugging Face Inference API if HUGGINGFACEHUB_API_TOKEN is set, otherwise
-    - local sentence-transformers (no API key) if installed.
-    """
-    documents = _load_projects_as_documents()
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunks = text_splitter.split_documents(documents)
+    def __call__(self, prompt: Union[str, List[dict]]) -> str:
+        try:
+            resp = get_sync_client().post(groq_chat_url(), json=self._payload(prompt), headers=self._headers())
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"Groq API request failed: {e}") from e
+        if resp.status_code >= 400:
+            raise RuntimeError(f"Groq API error {resp.status_code}: {resp.text}")
+        return self._parse(resp.json())
 
-    # Embeddings: HF API if token is set, otherwise local sentence-transformers
-    hf_token = os.getenv("HUGGINGFACEHUB_API_TOKEN") or os.getenv("HF_TOKEN")
-    embeddings = _get_free_embeddings(hf_token)
+    async def acall(self, prompt: Union[str, List[dict]]) -> str:
+        """Same request as `__call__`, but awaits the response instead of blocking a thread."""
+        try:
+            resp = await get_async_client().post(groq_chat_url(), json=self._payload(prompt), headers=self._headers())
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"Groq API request failed: {e}") from e
+        if resp.status_code >= 400:
+            raise RuntimeError(f"Groq API error {resp.status_code}: {resp.text}")
+        return self._parse(resp.json())
 
-    if os.path.exists(_FAISS_INDEX_FREE):
-        vector_store = FAISS.load_local(_FAISS_INDEX_FREE, embeddings)
-    else:
-        vector_store = FAISS.from_documents(chunks, embeddings)
-        vector_store.save_local(_FAISS_INDEX_FREE)
+    async def astream(self, prompt: Union[str, List[dict]]) -> AsyncIterator[str]:
+        """Yield completion tokens as Groq sends them (`stream: true`, server-sent events)."""
+        payload = {**self._payload(prompt), "stream": True}
+        client = get_async_client()
+        try:
+            async with client.stream("POST", groq_chat_url(), json=payload, headers=self._headers()) as resp:
+                if resp.status_code >= 400:
+                    body = (await resp.aread()).decode()
+                    raise RuntimeError(f"Groq API error {resp.status_code}: {body}")
+                async for line in resp.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        return
+                    try:
+                        delta = json.loads(data)["choices"][0].get("delta") or {}
+                    except (ValueError, KeyError, IndexError) as e:
+                        raise RuntimeError("Unexpected Groq API stream chunk") from e
+                    token = delta.get("content")
+                    if token:
+                        yield token
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"Groq API request failed: {e}") from e
 
-    groq_key = get_groq_key_stripped()
-    if not groq_key:
-        raise RuntimeError("GROQ_API_KEY is empty. Set it in backend/.env (no quotes, no spaces around =).")
-    log_groq_key_safe(groq_key)
-    model = (os.getenv("GROQ_MODEL") or "").strip() or "llama-3.3-70b-versatile"
-    temperature = float(os.getenv("GROQ_TEMPERATURE", "0.7"))
-    max_tokens = int(os.getenv("GROQ_MAX_TOKENS", "800"))
+def _groq_chat_model(api_key: str, model: str, temperature: float, max_tokens: int):
+    """ChatGroq when langchain_groq is installed, else a chat model over `_GroqLLMFallback`."""
     try:
         from langchain_groq import ChatGroq
         try:
-            llm = ChatGroq(
-                api_key=groq_key,
+            return ChatGroq(
+                api_key=api_key,
                 model=model,
                 temperature=temperature,
                 max_tokens=max_tokens,
             )
         except TypeError:
             # Older ChatGroq versions may not support max_tokens
-            llm = ChatGroq(api_key=groq_key, model=model, temperature=temperature)
+            return ChatGroq(api_key=api_key, model=model, temperature=temperature)
     except ImportError:
-        from langchain.llms.base import LLM
+        from langchain.chat_models.base import BaseChatModel
+        from langchain.schema.messages import AIMessage, AIMessageChunk, BaseMessage
+        from langchain.schema.output import ChatGeneration, ChatGenerationChunk, ChatResult
         from typing import Optional, List, Any, Mapping
 
         _gmodel = model
         _gtemp = temperature
         _gmax = max_tokens
+        _roles = {"system": "system", "human": "user", "ai": "assistant"}
 
-        class _GroqLLM(LLM):
+        class _GroqLLM(BaseChatModel):
             api_key: str
             model: str = _gmodel
             temperature: float = _gtemp
@@ -245,53 +474,148 @@ def _create_rag_with_free_apis():
             def _llm_type(self) -> str:
                 return "groq"
 
-            def _call(self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+            def _client(self) -> _GroqLLMFallback:
                 return _GroqLLMFallback(
                     api_key=self.api_key,
                     model=self.model,
                     temperature=self.temperature,
                     max_tokens=self.max_tokens,
-                )(prompt)
+                )
+
+            @staticmethod
+            def _messages(messages: List[BaseMessage]) -> List[dict]:
+                return [{"role": _roles.get(m.type, "user"), "content": m.content} for m in messages]
+
+            def _generate(
+                self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any
+            ) -> ChatResult:
+                text = self._client()(self._messages(messages))
+                return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+            async def _agenerate(
+                self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any
+            ) -> ChatResult:
+                text = await self._client().acall(self._messages(messages))
+                return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+            async def _astream(
+                self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any
+            ) -> AsyncIterator[ChatGenerationChunk]:
+                async for token in self._client().astream(self._messages(messages)):
+                    yield ChatGenerationChunk(message=AIMessageChunk(content=token))
 
             @property
             def _identifying_params(self) -> Mapping[str, Any]:
                 return {"model": self.model}
-        llm = _GroqLLM(api_key=groq_key)
+        return _GroqLLM(api_key=api_key)
 
-    return {
-        "llm": llm,
-        "retriever": vector_store.as_retriever(search_kwargs={"k": 3}),
-    }
 
-def _create_rag_with_openai():
-    """Use OpenAI (paid / quota-limited)."""
-    from langchain.embeddings import OpenAIEmbeddings
+def _openai_chat_model(model: str):
     from langchain.chat_models import ChatOpenAI
 
-    documents = _load_projects_as_documents()
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunks = text_splitter.split_documents(documents)
-
-    embeddings = OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
-
-    if os.path.exists(_FAISS_INDEX_OPENAI):
-        vector_store = FAISS.load_local(_FAISS_INDEX_OPENAI, embeddings)
-    else:
-        vector_store = FAISS.from_documents(chunks, embeddings)
-        vector_store.save_local(_FAISS_INDEX_OPENAI)
-
-    llm = ChatOpenAI(
+    return ChatOpenAI(
         openai_api_key=os.getenv("OPENAI_API_KEY"),
-        model="gpt-3.5-turbo",
+        model=model,
         temperature=0.7,
         max_tokens=800,
     )
 
+
+def _llm_backend_specs(groq_key: str) -> List[Tuple[str, str]]:
+    """
+    (provider, model) pairs in priority order. LLM_BACKENDS overrides, e.g.
+    "groq:llama-3.3-70b-versatile,groq:llama-3.1-8b-instant,openai:gpt-3.5-turbo".
+    """
+    configured = (os.getenv("LLM_BACKENDS") or "").strip()
+    if configured:
+        specs = []
+        for item in configured.split(","):
+            provider, _, model = item.strip().partition(":")
+            if provider.strip() and model.strip():
+                specs.append((provider.strip().lower(), model.strip()))
+        return specs
+    specs = []
+    if groq_key:
+        specs.append(("groq", (os.getenv("GROQ_MODEL") or "").strip() or "llama-3.3-70b-versatile"))
+        fallback = os.getenv("GROQ_FALLBACK_MODEL", "llama-3.1-8b-instant").strip()
+        if fallback and fallback != specs[0][1]:
+            specs.append(("groq", fallback))
+    if os.getenv("OPENAI_API_KEY", "").strip():
+        specs.append(("openai", "gpt-3.5-turbo"))
+    return specs
+
+
+def _build_llm(groq_key: str = "") -> LLMRouter:
+    """Router over every configured chat backend (see llm_router.py)."""
+    temperature = float(os.getenv("GROQ_TEMPERATURE", "0.7"))
+    max_tokens = int(os.getenv("GROQ_MAX_TOKENS", "800"))
+    backends = []
+    for provider, model in _llm_backend_specs(groq_key):
+        try:
+            if provider == "groq" and groq_key:
+                llm = _groq_chat_model(groq_key, model, temperature, max_tokens)
+            elif provider == "openai":
+                llm = _openai_chat_model(model)
+            else:
+                print(f"[llm] skipping backend {provider}:{model} (unknown provider or missing key)")
+                continue
+        except ImportError as e:
+            print(f"[llm] skipping backend {provider}:{model}: {e}")
+            continue
+        backends.append(Backend(f"{provider}:{model}", llm, **backend_settings_from_env()))
+    if not backends:
+        raise RuntimeError("No usable LLM backend. Check GROQ_API_KEY / OPENAI_API_KEY and LLM_BACKENDS.")
+    print(f"[llm] backends: {', '.join(b.name for b in backends)}")
+    return LLMRouter(backends, **router_settings_from_env())
+
+
+def _runtime(embeddings, llm, index_dir: Path, *, query_router=None, k: int = 3) -> dict:
+    """
+    Everything a request reads: the vector index and the retrieval structures over it, the
+    LLM (and its fast-model view), the router and the FAQ.
+    """
+    vector_store = _vector_store(embeddings, index_dir)
     return {
         "llm": llm,
-        "retriever": vector_store.as_retriever(search_kwargs={"k": 3}),
+        "fast_llm": _fast_llm(llm),
+        "query_router": query_router if query_router is not None else _build_query_router(embeddings),
+        "faq": _build_faq(embeddings),
+        "retriever": vector_store.as_retriever(search_kwargs={"k": k}),
+        "embeddings": embeddings,
+        "vector_store": vector_store,
+        "bm25": _build_bm25(vector_store, index_dir),
+        "metadata": _build_metadata_index(vector_store),
+        "reranker": _build_reranker(vector_store),
+        "k": k,
+        "index_dir": index_dir,
     }
 
+
+def _create_rag_with_free_apis():
+    """
+    Use Groq for chat + embeddings via:
+    - Hugging Face Inference API if HUGGINGFACEHUB_API_TOKEN is set, otherwise
+    - local sentence-transformers (no API key) if installed.
+    """
+    groq_key = get_groq_key_stripped()
+    if not groq_key:
+        raise RuntimeError("GROQ_API_KEY is empty. Set it in backend/.env (no quotes, no spaces around =).")
+    log_groq_key_safe(groq_key)
+    llm = _build_llm(groq_key)
+
+    # Embeddings: HF API if token is set, otherwise local sentence-transformers
+    hf_token = os.getenv("HUGGINGFACEHUB_API_TOKEN") or os.getenv("HF_TOKEN")
+    embeddings = with_embedding_cache(_get_free_embeddings(hf_token))
+    return _runtime(embeddings, llm, _index_dir(_FAISS_INDEX_FREE))
+
+def _create_rag_with_openai():
+    """Use OpenAI (paid / quota-limited)."""
+    from langchain.embeddings import OpenAIEmbeddings
+
+    embeddings = with_embedding_cache(OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY")))
+    llm = _build_llm(get_groq_key_stripped())
+    return _runtime(embeddings, llm, _index_dir(_FAISS_INDEX_OPENAI))
+
 def create_rag_system():
     """Prefer Groq if set, else OpenAI. Embeddings can be HF-token, OpenAI, or local."""
     groq = get_groq_key_stripped()
@@ -321,79 +645,488 @@ def create_rag_system():
 _rag_runtime = None
 _rag_error: Optional[str] = None
 _rag_initialized = False
+# True once a query has gone through the embedder and the index (warmup or a real request).
+_rag_warmed_up = False
+_rag_init_lock = threading.Lock()
 
 
 def _init_rag_once() -> None:
-    """Lazy-init so env vars can load before we read them."""
+    """
+    Lazy-init so env vars can load before we read them. Concurrent callers block on the
+    lock until the first one finishes, and `_rag_initialized` only flips once the runtime
+    (or the error) is in place, so nobody observes a half-built state.
+    """
     global _rag_initialized, _rag_runtime, _rag_error
     if _rag_initialized:
         return
-    _rag_initialized = True
-    _debug_env_state()
+    with _rag_init_lock:
+        if _rag_initialized:
+            return
+        _debug_env_state()
+        try:
+            _rag_runtime = create_rag_system()
+        except Exception as e:
+            _rag_error = str(e)
+        _rag_initialized = True
+
+
+def warmup(stop: Optional[threading.Event] = None) -> None:
+    """
+    Eager init for startup: load embeddings, FAISS and the LLM client, then run one
+    warmup query through the embedder and the index so the first user request does not
+    pay for model pre-faulting / lazy allocations. A failed warmup query (provider blip
+    at boot) is retried RAG_WARMUP_RETRIES times, RAG_WARMUP_RETRY_DELAY seconds apart;
+    setting `stop` (shutdown) ends the retries early.
+    """
+    _init_rag_once()
+    runtime = _rag_runtime
+    if runtime is None:
+        print(f"[rag] warmup skipped: {_rag_error}")
+        return
+    attempts = 1 + max(0, int(os.getenv("RAG_WARMUP_RETRIES", "3")))
+    delay = float(os.getenv("RAG_WARMUP_RETRY_DELAY", "5"))
+    stop = stop or threading.Event()
+    for attempt in range(1, attempts + 1):
+        try:
+            _retrieve(runtime, "What projects are in this portfolio?")
+            return
+        except Exception as e:
+            print(f"[rag] warmup query failed (attempt {attempt}/{attempts}): {e}")
+        if attempt == attempts or stop.wait(delay):
+            return
+
+
+def readiness() -> dict:
+    """
+    Component-level readiness for the /ready probe. `warmed_up` only gates readiness
+    when startup warmup is on (RAG_WARMUP); a successful real request also sets it.
+    """
+    runtime = _rag_runtime or {}
+    components = {
+        "embeddings": runtime.get("embeddings") is not None,
+        "vector_store": runtime.get("vector_store") is not None,
+        "llm": runtime.get("llm") is not None,
+        "warmed_up": _rag_warmed_up,
+    }
+    required = dict(components)
+    if os.getenv("RAG_WARMUP", "1").strip() == "0":
+        required.pop("warmed_up")
+    return {
+        "ready": all(required.values()),
+        "initialized": _rag_initialized,
+        "components": components,
+        "error": _rag_error,
+    }
+
+
+def llm_stats() -> Optional[dict]:
+    """Per-backend latency / error / circuit state of the LLM router, once initialized."""
+    llm = (_rag_runtime or {}).get("llm")
+    return llm.stats() if isinstance(llm, LLMRouter) else None
+
+
+def reload_rag_runtime() -> bool:
+    """
+    Map the artifact for the current projects.json, or re-chunk it and update the vector index next
+    to the live one, then swap it in.
+    Embeddings and the LLM client are reused, so nothing is cold-loaded again. Requests that
+    already hold the previous runtime finish on it. Returns False if RAG was never started.
+    """
+    global _rag_runtime, _rag_error
+    current = _rag_runtime
+    if current is None:
+        with _rag_init_lock:
+            if not _rag_initialized:
+                return False  # lazy init will read the current file anyway
+            _rag_runtime = create_rag_system()
+            _rag_error = None
+            return True
+    router = current.get("query_router")
+    _rag_runtime = {
+        **current,
+        **_runtime(
+            current["embeddings"],
+            current["llm"],
+            current["index_dir"],
+            query_router=router.with_projects(_load_projects()) if router is not None else None,
+            k=current["k"],
+        ),
+    }
+    return True
+
+def _unavailable_message() -> str:
+    err = _rag_error or "RAG not initialized"
+    if "quota" in err.lower() or "429" in err or "insufficient_quota" in err.lower():
+        return (
+            "The AI assistant is temporarily unavailable: your OpenAI account has exceeded its quota. "
+            "Use free APIs instead: set GROQ_API_KEY and HUGGINGFACEHUB_API_TOKEN in backend/.env (see README)."
+        )
+    if "401" in err or "invalid" in err.lower() or "authentication" in err.lower():
+        return (
+            "Invalid API key for the configured provider. "
+            "Check GROQ_API_KEY / OPENAI_API_KEY in backend/.env and restart the backend."
+        )
+    return f"The AI assistant could not start: {err}"
+
+
+def _provider_error_message(e: Exception) -> str:
+    msg = str(e)
+    if "api.groq.com" in msg.lower() or "groq" in msg.lower():
+        if "invalid" in msg.lower() or "401" in msg or "403" in msg or "invalid_api_key" in msg:
+            return (
+                "Groq says this API key is invalid. Fix: 1) In backend/.env use exactly: GROQ_API_KEY=gsk_your_key "
+                "(no quotes, no spaces around =). 2) Copy the key again from https://console.groq.com/keys "
+                "(Create API Key → copy the secret once). 3) Restart the backend."
+            )
+        return f"Groq provider error: {msg}"
+    if "openai" in msg.lower():
+        return f"OpenAI provider error: {msg}"
+    return f"The AI assistant encountered an error: {msg}"
+
+
+# Caps in-flight retrieval + LLM calls per worker; extra requests wait instead of piling onto the provider.
+_concurrency: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+
+
+def _get_concurrency_limit() -> asyncio.Semaphore:
+    """One semaphore per running event loop (asyncio primitives cannot be shared across loops)."""
+    global _concurrency
+    loop = asyncio.get_running_loop()
+    if _concurrency is None or _concurrency[0] is not loop:
+        limit = max(1, int(os.getenv("RAG_MAX_CONCURRENCY", "8")))
+        _concurrency = (loop, asyncio.Semaphore(limit))
+    return _concurrency[1]
+
+
+def _search(runtime: dict, vector: List[float], question: str) -> list:
+    """
+    Dense top-k, or dense + BM25 fused with reciprocal-rank fusion when the runtime has BM25.
+    Field values named in the question (category, type, technology) restrict both searches.
+    With a reranker, both over-fetch and the reranker picks k deduplicated, diverse chunks.
+    """
+    k = runtime.get("k", 3)
+    vector_store = runtime["vector_store"]
+    bm25 = runtime.get("bm25")
+    metadata = runtime.get("metadata")
+    reranker = runtime.get("reranker")
+    n = max(k, reranker.fetch_k) if reranker is not None else k
+    positions = metadata.match(metadata.infer_filters(question)) if metadata is not None else None
+
+    def dense(n: int) -> list:
+        if positions is None:
+            return vector_store.similarity_search_by_vector(vector, k=n)
+        return filtered_search(vector_store, vector, n, positions)
+
+    if bm25 is None:
+        candidates = dense(n)
+    else:
+        # Fuse deeper candidate lists than we return, so a doc ranked 4th in both can still win.
+        fetch_k = max(3 * k, n, int(os.getenv("RAG_HYBRID_FETCH_K", "10")))
+        sparse = [doc for doc, _ in bm25.search(question, fetch_k, allowed=positions)]
+        candidates = reciprocal_rank_fusion([dense(fetch_k), sparse], k=n)
+    if reranker is None:
+        return candidates
+    with stage("rerank"):
+        return reranker.rerank(vector, candidates, k)
+
+
+def _embed(runtime: dict, question: str) -> Optional[List[float]]:
+    """Query embedding, or None when the runtime only has a plain retriever."""
+    if runtime.get("embeddings") is None or runtime.get("vector_store") is None:
+        return None
+    return runtime["embeddings"].embed_query(question)
+
+
+async def _aembed(runtime: dict, question: str) -> Optional[List[float]]:
+    if runtime.get("embeddings") is None or runtime.get("vector_store") is None:
+        return None
+    return await aembed_query_batched(runtime["embeddings"], question)
+
+
+def _mark_warm(docs: list) -> list:
+    global _rag_warmed_up
+    _rag_warmed_up = True
+    return docs
+
+
+def _documents(runtime: dict, question: str, vector: Optional[List[float]]) -> list:
+    if vector is None:
+        return _mark_warm(runtime["retriever"].get_relevant_documents(question))
+    return _mark_warm(_search(runtime, vector, question))
+
+
+async def _adocuments(runtime: dict, question: str, vector: Optional[List[float]]) -> list:
+    if vector is None:
+        return _mark_warm(await runtime["retriever"].aget_relevant_documents(question))
+    return _mark_warm(await asyncio.to_thread(_search, runtime, vector, question))
+
+
+def _retrieve(runtime: dict, question: str) -> Tuple[Optional[List[float]], list]:
+    """Return (query embedding, docs). The embedding is computed once and reused for the cache."""
+    vector = _embed(runtime, question)
+    return vector, _documents(runtime, question, vector)
+
+
+def _route(
+    runtime: dict, question: str, vector: Optional[List[float]] = None, *, final: bool = False
+) -> Optional[Route]:
+    """
+    Heuristic route before embedding (None if undecided); with `final`, always a route,
+    using the query embedding to break ties.
+    """
+    router = runtime.get("query_router")
+    if router is None:
+        return None
+    return router.classify(question, vector) if final else router.decided(question)
+
+
+def _faq_answer(runtime: dict, question: str, vector: Optional[List[float]] = None) -> Optional[str]:
+    """Precomputed answer by exact phrasing, or by nearest canonical question once embedded."""
+    faq = runtime.get("faq")
+    if faq is None:
+        return None
+    return faq.lookup(vector) if vector is not None else faq.lookup_text(question)
+
+
+def _served(source: str, reply: str) -> str:
+    ANSWERS.labels(source=source).inc()
+    return reply
+
+
+def _count_llm_tokens(messages: list, reply: str) -> None:
+    LLM_TOKENS.labels(kind="prompt").inc(sum(count_tokens(m.content) for m in messages))
+    LLM_TOKENS.labels(kind="completion").inc(count_tokens(reply))
+
+
+def _llm_for(runtime: dict, route: Optional[Route]):
+    if route is not None and route.tier == "fast":
+        return runtime.get("fast_llm") or runtime["llm"]
+    return runtime["llm"]
+
+
+def _cache_for(
+    vector: Optional[List[float]], history: Sequence[Tuple[str, str]], summary: str = ""
+) -> Optional[SemanticResponseCache]:
+    """Only first turns are cached: a follow-up's answer depends on the conversation so far."""
+    if vector is None or history or summary:
+        return None
+    return get_response_cache()
+
+
+class _Turn(NamedTuple):
+    """A chat turn up to the LLM call: an early answer (already counted), or the call to make."""
+
+    answer: Optional[str] = None
+    llm: Any = None
+    messages: Sequence = ()
+    cache: Optional[SemanticResponseCache] = None
+    vector: Optional[List[float]] = None
+    ids: Sequence[str] = ()
+
+
+def _turn_steps(
+    runtime: dict,
+    question: str,
+    system_prompt: str,
+    portfolio_summary: str,
+    history: Sequence[Tuple[str, str]],
+    summary: str,
+) -> Generator[Tuple[str, tuple], Any, _Turn]:
+    """
+    Route -> FAQ -> embed -> route / FAQ again -> search -> response cache -> prompt, shared by
+    the sync, async and streaming entry points. Embedding and search are left to the caller
+    (blocking or awaited): the generator yields ("embed", ()) then ("search", (vector,)), is
+    sent each result, and returns the _Turn.
+    """
+    route = _route(runtime, question)
+    if route is not None and route.answer is not None:
+        return _Turn(_served("template", route.answer))
+    faq = _faq_answer(runtime, question)
+    if faq is not None:
+        return _Turn(_served("faq", faq))
+    vector = yield "embed", ()
+    route = route or _route(runtime, question, vector, final=True)
+    if route is not None and route.answer is not None:
+        return _Turn(_served("template", route.answer))
+    faq = _faq_answer(runtime, question, vector)
+    if faq is not None:
+        return _Turn(_served("faq", faq))
+    docs = yield "search", (vector,)
+    cache = _cache_for(vector, history, summary)
+    ids = [chunk_id(d) for d in docs]
+    if cache is not None:
+        cached = cache.get(vector, ids)
+        if cached is not None:
+            return _Turn(_served("cache", cached))
+    with stage("prompt"):
+        messages = get_prompt_builder(system_prompt, portfolio_summary).build(question, docs, history, summary)
+    return _Turn(None, _llm_for(runtime, route), messages, cache, vector, ids)
+
+
+def _prepare_turn(runtime: dict, question: str, **prompt) -> _Turn:
+    steps = _turn_steps(runtime, question, **prompt)
+    run = {"embed": _embed, "search": _documents}
     try:
-        _rag_runtime = create_rag_system()
-    except Exception as e:
-        _rag_error = str(e)
+        name, args = next(steps)
+        while True:
+            with stage(name):
+                result = run[name](runtime, question, *args)
+            name, args = steps.send(result)
+    except StopIteration as done:
+        return done.value
+
+
+async def _aprepare_turn(runtime: dict, question: str, slot: AsyncExitStack, **prompt) -> _Turn:
+    """
+    Async `_prepare_turn`. A concurrency slot is taken into `slot` before embedding, so
+    template and exact-FAQ answers never wait for one; the caller holds it through the LLM call.
+    """
+    steps = _turn_steps(runtime, question, **prompt)
+    run = {"embed": _aembed, "search": _adocuments}
+    try:
+        name, args = next(steps)
+        await slot.enter_async_context(_get_concurrency_limit())
+        while True:
+            with stage(name):
+                result = await run[name](runtime, question, *args)
+            name, args = steps.send(result)
+    except StopIteration as done:
+        return done.value
+
+
+def _finish_turn(turn: _Turn, reply: str) -> str:
+    _count_llm_tokens(turn.messages, reply)
+    if turn.cache is not None:
+        turn.cache.put(turn.vector, turn.ids, reply)
+    return _served("llm", reply)
+
 
 def query_portfolio(
     question: str,
     *,
     system_prompt: str = "",
     portfolio_summary: str = "",
-    chat_history: str = "",
+    history: Sequence[Tuple[str, str]] = (),
+    summary: str = "",
 ) -> str:
-    """Query the RAG system about the portfolio with optional guardrails + memory."""
+    """
+    Query the RAG system about the portfolio with optional guardrails + memory.
+    `history` is the session's (user, assistant) turns, oldest first; `summary` condenses
+    turns that were compacted out of it.
+    """
     _init_rag_once()
-    if _rag_runtime is None:
-        err = _rag_error or "RAG not initialized"
-        if "quota" in err.lower() or "429" in err or "insufficient_quota" in err.lower():
-            return (
-                "The AI assistant is temporarily unavailable: your OpenAI account has exceeded its quota. "
-                "Use free APIs instead: set GROQ_API_KEY and HUGGINGFACEHUB_API_TOKEN in backend/.env (see README)."
-            )
-        if "401" in err or "invalid" in err.lower() or "authentication" in err.lower():
-            return (
-                "Invalid API key for the configured provider. "
-                "Check GROQ_API_KEY / OPENAI_API_KEY in backend/.env and restart the backend."
-            )
-        return f"The AI assistant could not start: {err}"
+    # Pin this request to one snapshot; a hot reload may swap `_rag_runtime` mid-request.
+    runtime = _rag_runtime
+    if runtime is None:
+        return _unavailable_message()
+    prompt = dict(system_prompt=system_prompt, portfolio_summary=portfolio_summary, history=history, summary=summary)
     try:
-        retriever = _rag_runtime["retriever"]
-        llm = _rag_runtime["llm"]
-
-        docs = retriever.get_relevant_documents(question)
-        context = "\n\n".join(d.page_content for d in docs) if docs else ""
-
-        prompt_parts = []
-        if system_prompt.strip():
-            prompt_parts.append(system_prompt.strip())
-        if portfolio_summary.strip():
-            prompt_parts.append("PORTFOLIO SUMMARY:\n" + portfolio_summary.strip())
-        if chat_history.strip():
-            prompt_parts.append("CONVERSATION HISTORY:\n" + chat_history.strip())
-        prompt_parts.append("RETRIEVED CONTEXT:\n" + (context or "(no relevant snippets retrieved)"))
-        prompt_parts.append("USER QUESTION:\n" + question.strip())
-        prompt_parts.append(
-            "RESPONSE STYLE (follow strictly):\n"
-            "- 5–8 lines max. Short intro sentence, then Key Highlights (bullets), then optional 'Want more details? Just ask.'\n"
-            "- For projects: intro, then Key Highlights with • Challenge: • Tech used: • Result: • Impact:\n"
-            "- Recruiter-friendly and skimmable. No long essays unless the user asks for more.\n"
-            "- Do not repeat your identity. Keep tone professional and natural.\n"
-        )
-        full_prompt = "\n\n".join(prompt_parts).strip()
+        turn = _prepare_turn(runtime, question, **prompt)
+        if turn.answer is not None:
+            return turn.answer
+        with stage("llm"):
+            reply = turn.llm.predict_messages(turn.messages).content.strip()
+        return _finish_turn(turn, reply)
+    except Exception as e:
+        return _served("error", _provider_error_message(e))
+
 
-        # Works for both LLM and ChatModel implementations in LangChain 0.0.340
-        return llm.predict(full_prompt).strip()
+async def aquery_portfolio(
+    question: str,
+    *,
+    system_prompt: str = "",
+    portfolio_summary: str = "",
+    history: Sequence[Tuple[str, str]] = (),
+    summary: str = "",
+) -> str:
+    """Async `query_portfolio`: retrieval and the LLM call are awaited, never run on the event loop."""
+    if not _rag_initialized:
+        # Model / index loading is blocking; keep it off the loop.
+        await asyncio.to_thread(_init_rag_once)
+    # Pin this request to one snapshot; a hot reload may swap `_rag_runtime` mid-request.
+    runtime = _rag_runtime
+    if runtime is None:
+        return _unavailable_message()
+    prompt = dict(system_prompt=system_prompt, portfolio_summary=portfolio_summary, history=history, summary=summary)
+    try:
+        async with AsyncExitStack() as slot:
+            turn = await _aprepare_turn(runtime, question, slot, **prompt)
+            if turn.answer is not None:
+                return turn.answer
+            with stage("llm"):
+                reply = (await turn.llm.apredict_messages(turn.messages)).content.strip()
+        return _finish_turn(turn, reply)
     except Exception as e:
-        msg = str(e)
-        if "api.groq.com" in msg.lower() or "groq" in msg.lower():
-            if "invalid" in msg.lower() or "401" in msg or "403" in msg or "invalid_api_key" in msg:
-                return (
-                    "Groq says this API key is invalid. Fix: 1) In backend/.env use exactly: GROQ_API_KEY=gsk_your_key "
-                    "(no quotes, no spaces around =). 2) Copy the key again from https://console.groq.com/keys "
-                    "(Create API Key → copy the secret once). 3) Restart the backend."
-                )
-            return f"Groq provider error: {msg}"
-        if "openai" in msg.lower():
-            return f"OpenAI provider error: {msg}"
-        return f"The AI assistant encountered an error: {msg}"
+        return _served("error", _provider_error_message(e))
+
+
+class StreamInterrupted(RuntimeError):
+    """The provider failed after part of a streamed answer was sent; str() is the user-facing message."""
+
+
+async def astream_portfolio(
+    question: str,
+    *,
+    system_prompt: str = "",
+    portfolio_summary: str = "",
+    history: Sequence[Tuple[str, str]] = (),
+    summary: str = "",
+) -> AsyncIterator[str]:
+    """
+    Like `aquery_portfolio`, but yields the reply piece by piece as the provider streams it.
+    Raises StreamInterrupted if the provider fails after the first piece was yielded.
+    """
+    if not _rag_initialized:
+        await asyncio.to_thread(_init_rag_once)
+    runtime = _rag_runtime
+    if runtime is None:
+        yield _unavailable_message()
+        return
+    prompt = dict(system_prompt=system_prompt, portfolio_summary=portfolio_summary, history=history, summary=summary)
+    parts: List[str] = []
+    try:
+        async with AsyncExitStack() as slot:
+            turn = await _aprepare_turn(runtime, question, slot, **prompt)
+            if turn.answer is not None:
+                yield turn.answer
+                return
+            started = time.perf_counter()
+            async for chunk in turn.llm.astream(turn.messages):
+                text = chunk.content
+                if text:
+                    if not parts:
+                        STAGE_SECONDS.labels(stage="llm_first_token").observe(time.perf_counter() - started)
+                    parts.append(text)
+                    yield text
+            STAGE_SECONDS.labels(stage="llm").observe(time.perf_counter() - started)
+        _finish_turn(turn, "".join(parts).strip())
+    except Exception as e:
+        if parts:
+            # Part of the answer is already out: signal the failure instead of appending to it.
+            ANSWERS.labels(source="error").inc()
+            raise StreamInterrupted(_provider_error_message(e)) from e
+        yield _served("error", _provider_error_message(e))
+
+
+_SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a chat between a visitor and Keltoum's portfolio assistant. "
+    "Merge the previous summary with the new turns into one short paragraph (at most {words} words). "
+    "Keep what the visitor asked about, their interests or role if stated, and facts already given. "
+    "Reply with the summary only."
+)
+
+
+def summarize_conversation(summary: str, turns: Sequence[Tuple[str, str]], max_words: int = 120) -> str:
+    """
+    Fold `turns` into the rolling `summary` with the runtime's LLM. Blocking; meant for a
+    background worker. Raises if the RAG runtime is unavailable or the provider fails.
+    """
+    runtime = _rag_runtime
+    if runtime is None:
+        raise RuntimeError(_rag_error or "RAG not initialized")
+    transcript = "\n".join(f"User: {u}\nAssistant: {a}" for u, a in turns)
+    messages = [
+        SystemMessage(content=_SUMMARY_INSTRUCTIONS.format(words=max_words)),
+        HumanMessage(content=f"PREVIOUS SUMMARY:\n{summary.strip() or '(none)'}\n\nNEW TURNS:\n{transcript}"),
+    ]
+    return runtime["llm"].predict_messages(messages).content.strip()
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import threading
+import time
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import AsyncIterator, List, Optional, Tuple
 from uuid import uuid4
 
-from .rag_pipeline import query_portfolio
+from ..repositories.session_store import get_session_store
+from .conversation_summary import maybe_schedule
 
 _BACKEND_DIR = Path(__file__).resolve().parents[2]  # .../backend
 _PROJECTS_PATH = _BACKEND_DIR / "data" / "projects.json"
@@ -90,10 +94,41 @@ def _build_portfolio_context() -> str:
     return "\n".join(lines).strip()
 
 
-_PORTFOLIO_CONTEXT = _build_portfolio_context()
+_PORTFOLIO_CONTEXT: Optional[str] = None
+_reload_lock = threading.Lock()
 
-# Simple in-memory session store: session_id -> [(user, assistant), ...]
-_SESSIONS: dict = {}
+
+def portfolio_context() -> str:
+    """Portfolio summary for the system prompt, built on first use rather than at import."""
+    global _PORTFOLIO_CONTEXT
+    if _PORTFOLIO_CONTEXT is None:
+        _PORTFOLIO_CONTEXT = _build_portfolio_context()
+    return _PORTFOLIO_CONTEXT
+
+
+def _pipeline():
+    """The RAG pipeline module. Imported on first use: it pulls in langchain, FAISS and numpy."""
+    from . import rag_pipeline
+
+    return rag_pipeline
+
+
+def reload_portfolio() -> dict:
+    """
+    Rebuild the portfolio summary and the vector index from projects.json, then swap both in.
+    Each swap is a single reference assignment, so in-flight requests finish on the snapshot
+    they started with. Concurrent calls are serialized.
+    """
+    global _PORTFOLIO_CONTEXT
+    with _reload_lock:
+        started = time.perf_counter()
+        summary = _build_portfolio_context()
+        index_reloaded = _pipeline().reload_rag_runtime()
+        _PORTFOLIO_CONTEXT = summary
+        return {"index_reloaded": index_reloaded, "seconds": round(time.perf_counter() - started, 3)}
+
+# Sessions live in the configured store (SESSION_STORE). Older turns are folded into a rolling
+# summary in the background (conversation_summary.py); _MAX_TURNS caps raw turns regardless.
 _MAX_TURNS = 10
 
 
@@ -102,29 +137,68 @@ def _get_session_id(session_id: Optional[str]) -> str:
     return sid if sid else str(uuid4())
 
 
-def _format_history(history: List[Tuple[str, str]], max_turns: int = 8) -> str:
-    trimmed = history[-max_turns:] if history else []
-    parts: List[str] = []
-    for u, a in trimmed:
-        parts.append(f"User: {u}")
-        parts.append(f"Assistant: {a}")
-    return "\n".join(parts).strip()
+def _record_turn(sid: str, summary: str, history: List[Tuple[str, str]], message: str, reply: str) -> None:
+    history = (history + [(message, reply)])[-_MAX_TURNS:]
+    get_session_store().set(sid, history, summary=summary)
+    maybe_schedule(sid, summary, history)
 
 
 def answer(message: str, session_id: Optional[str] = None):
     sid = _get_session_id(session_id)
-    history: List[Tuple[str, str]] = _SESSIONS.get(sid, [])
+    summary, history = get_session_store().load(sid)
 
-    reply = query_portfolio(
+    reply = _pipeline().query_portfolio(
         message,
         system_prompt=SYSTEM_PROMPT,
-        portfolio_summary=_PORTFOLIO_CONTEXT,
-        chat_history=_format_history(history),
+        portfolio_summary=portfolio_context(),
+        history=history,
+        summary=summary,
     )
+    _record_turn(sid, summary, history, message, reply)
 
-    history = (history + [(message, reply)])[-_MAX_TURNS:]
-    _SESSIONS[sid] = history
+    sources = []
+    return reply, sid, sources
+
+
+async def aanswer(message: str, session_id: Optional[str] = None):
+    """Async `answer`. Session store reads and writes run in a thread (SQLite / file I/O)."""
+    sid = _get_session_id(session_id)
+    summary, history = await asyncio.to_thread(get_session_store().load, sid)
+
+    reply = await _pipeline().aquery_portfolio(
+        message,
+        system_prompt=SYSTEM_PROMPT,
+        portfolio_summary=portfolio_context(),
+        history=history,
+        summary=summary,
+    )
+    await asyncio.to_thread(_record_turn, sid, summary, history, message, reply)
 
     sources = []
     return reply, sid, sources
 
+
+def stream_answer(message: str, session_id: Optional[str] = None) -> Tuple[str, AsyncIterator[str]]:
+    """
+    Return (session_id, token stream). The turn is saved to the session only once the
+    stream has been fully consumed, so an aborted stream, or one the provider cut off
+    (StreamInterrupted propagates to the route), leaves history untouched. Like `aanswer`,
+    the session is loaded and saved in a thread, off the event loop.
+    """
+    sid = _get_session_id(session_id)
+
+    async def tokens() -> AsyncIterator[str]:
+        summary, history = await asyncio.to_thread(get_session_store().load, sid)
+        parts: List[str] = []
+        async for token in _pipeline().astream_portfolio(
+            message,
+            system_prompt=SYSTEM_PROMPT,
+            portfolio_summary=portfolio_context(),
+            history=history,
+            summary=summary,
+        ):
+            parts.append(token)
+            yield token
+        await asyncio.to_thread(_record_turn, sid, summary, history, message, "".join(parts).strip())
+
+    return sid, tokens()
@@ -0,0 +1,154 @@
+"""
+Second retrieval stage: over-fetched candidates -> deduplicated -> MMR order.
+
+The first stage (dense, or dense + BM25 fused) returns RAG_RERANK_FETCH_K candidates
+instead of k. Because the text splitter overlaps chunks by RAG_CHUNK_OVERLAP characters,
+neighbouring chunks of one project often come back together, and so do near-identical
+descriptions. This stage:
+- drops every candidate whose word 5-gram shingles are mostly (RAG_DEDUPE_OVERLAP)
+  contained in a better-ranked candidate, or that contain most of one;
+- picks the k results by maximal marginal relevance,
+      lambda * cos(query, d) - (1 - lambda) * max cos(d, already picked),
+  using the candidates' vectors read back from the FAISS index (no re-embedding). The
+  first-stage winner is always kept first, so an exact-term BM25 hit is not demoted.
+The whole stage runs under RAG_RERANK_BUDGET_MS: once the deadline passes, the remaining
+slots are filled in first-stage order. The prompt builder then keeps only as many of the
+chunks as RAG_CONTEXT_TOKEN_BUDGET allows.
+
+RAG_RERANK=0 disables the stage (plain top-k); RAG_RERANK_LAMBDA trades relevance (1.0)
+for diversity (0.0).
+"""
+import os
+import re
+import time
+from typing import Callable, List, Optional, Sequence, Set
+
+import faiss
+import numpy as np
+from langchain.docstore.document import Document
+
+from .index_manifest import chunk_id
+
+_WORD_RE = re.compile(r"\w+")
+SHINGLE_SIZE = 5
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """Hashed word n-grams; texts shorter than `size` words are one shingle."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {hash(tuple(words))} if words else set()
+    return {hash(tuple(words[i : i + size])) for i in range(len(words) - size + 1)}
+
+
+def containment(a: Set[int], b: Set[int]) -> float:
+    """Share of the smaller shingle set found in the other (1.0: one text is inside the other)."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def drop_overlaps(docs: Sequence[Document], threshold: float) -> List[Document]:
+    """Keep docs in order, skipping any that overlap an already kept one by >= threshold."""
+    kept: List[Document] = []
+    kept_shingles: List[Set[int]] = []
+    for doc in docs:
+        current = shingles(doc.page_content)
+        if any(containment(current, other) >= threshold for other in kept_shingles):
+            continue
+        kept.append(doc)
+        kept_shingles.append(current)
+    return kept
+
+
+def mmr(query: np.ndarray, vectors: np.ndarray, k: int, lambda_mult: float, deadline: float) -> List[int]:
+    """
+    Indices of `vectors` in maximal-marginal-relevance order, index 0 first. Once
+    time.perf_counter() passes `deadline`, the rest follow in their given order.
+    """
+    if not len(vectors):
+        return []
+    unit = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    q = query / max(float(np.linalg.norm(query)), 1e-12)
+    relevance = unit @ q
+    picked = [0]
+    redundancy = unit @ unit[0]
+    while len(picked) < min(k, len(vectors)):
+        if time.perf_counter() > deadline:
+            picked.extend(i for i in range(len(vectors)) if i not in picked)
+            break
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        scores[picked] = -np.inf
+        best = int(np.argmax(scores))
+        picked.append(best)
+        redundancy = np.maximum(redundancy, unit @ unit[best])
+    return picked[:k]
+
+
+class Reranker:
+    def __init__(
+        self,
+        vector_store,
+        fetch_k: int = 10,
+        lambda_mult: float = 0.7,
+        budget_ms: float = 15.0,
+        overlap: float = 0.5,
+    ):
+        self.index = vector_store.index
+        # A retrieval artifact's docstore already maps ids to FAISS positions (a binary search
+        # over its memory-mapped columns, shared by workers); only in-memory stores need a dict.
+        lookup = getattr(vector_store.docstore, "position", None)
+        if lookup is None:
+            mapping = vector_store.index_to_docstore_id
+            lookup = {mapping[pos]: pos for pos in range(len(mapping))}.get
+        self.position: Callable[[str], Optional[int]] = lookup
+        self.fetch_k = max(1, fetch_k)
+        self.lambda_mult = lambda_mult
+        self.budget_ms = budget_ms
+        self.overlap = overlap
+        self.can_reconstruct = self._prepare()
+
+    @classmethod
+    def from_env(cls, vector_store) -> "Reranker":
+        return cls(
+            vector_store,
+            fetch_k=int(os.getenv("RAG_RERANK_FETCH_K", "10")),
+            lambda_mult=float(os.getenv("RAG_RERANK_LAMBDA", "0.7")),
+            budget_ms=float(os.getenv("RAG_RERANK_BUDGET_MS", "15")),
+            overlap=float(os.getenv("RAG_DEDUPE_OVERLAP", "0.5")),
+        )
+
+    def _prepare(self) -> bool:
+        """Whether stored vectors can be read back; IVF indexes need their direct map first."""
+        if self.index.ntotal == 0:
+            return False
+        try:
+            self.index.reconstruct(0)
+            return True
+        except RuntimeError:
+            pass
+        try:
+            faiss.extract_index_ivf(self.index).make_direct_map()
+            self.index.reconstruct(0)
+            return True
+        except RuntimeError as e:
+            print(f"[rerank] index vectors unavailable, deduplicating only: {e}")
+            return False
+
+    def vectors(self, docs: Sequence[Document]) -> Optional[np.ndarray]:
+        positions = [self.position(chunk_id(d)) for d in docs]
+        if not self.can_reconstruct or any(p is None for p in positions):
+            return None
+        return self.index.reconstruct_batch(np.asarray(positions, dtype=np.int64))
+
+    def rerank(self, query: Sequence[float], candidates: Sequence[Document], k: int) -> List[Document]:
+        """Up to k of `candidates` (first-stage order), deduplicated and diversified."""
+        deadline = time.perf_counter() + self.budget_ms / 1000.0
+        docs = drop_overlaps(candidates, self.overlap)
+        if len(docs) <= k or time.perf_counter() > deadline:
+            return docs[:k]
+        vectors = self.vectors(docs)
+        if vectors is None:
+            return docs[:k]
+        order = mmr(np.asarray(query, dtype=np.float32), vectors, k, self.lambda_mult, deadline)
+        return [docs[i] for i in order]
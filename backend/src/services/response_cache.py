@@ -0,0 +1,140 @@
+"""
+Semantic response cache in front of the LLM step.
+
+An entry is keyed on the (normalized) query embedding plus the IDs of the chunks that
+were retrieved for it. A lookup hits when the same chunks come back and the cosine
+similarity to a cached query is at or above the threshold. Entries expire after a TTL,
+the least recently used entry is evicted when the cache is full, and everything is
+dropped when `data/projects.json` changes on disk.
+
+Tuning (env):
+- RESPONSE_CACHE_ENABLED       "0" disables the cache (default "1")
+- RESPONSE_CACHE_THRESHOLD     minimum cosine similarity for a hit (default 0.95)
+- RESPONSE_CACHE_TTL           seconds an entry stays valid (default 3600)
+- RESPONSE_CACHE_MAX_ENTRIES   LRU capacity (default 512)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+_BACKEND_DIR = Path(__file__).resolve().parents[2]  # .../backend
+_DATA_PATH = _BACKEND_DIR / "data" / "projects.json"
+
+
+def _corpus_stamp(path: Path) -> Tuple[int, int]:
+    try:
+        st = path.stat()
+    except OSError:
+        return (0, 0)
+    return (st.st_mtime_ns, st.st_size)
+
+
+class SemanticResponseCache:
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        ttl: float = 3600.0,
+        max_entries: int = 512,
+        corpus_path: Path = _DATA_PATH,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.corpus_path = corpus_path
+        # key -> (unit query vector, chunk IDs, reply, stored_at); order = recency.
+        self._entries: "OrderedDict[int, Tuple[np.ndarray, Tuple[str, ...], str, float]]" = OrderedDict()
+        self._next_key = 0
+        self._stamp = _corpus_stamp(corpus_path)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _unit(vector: Sequence[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm else v
+
+    def _check_corpus(self) -> None:
+        stamp = _corpus_stamp(self.corpus_path)
+        if stamp != self._stamp:
+            self._stamp = stamp
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+
+    def get(self, vector: Sequence[float], chunk_ids: Sequence[str]) -> Optional[str]:
+        q = self._unit(vector)
+        ids = tuple(chunk_ids)
+        now = time.monotonic()
+        with self._lock:
+            self._check_corpus()
+            best_key, best_sim = None, self.threshold
+            for key, (v, entry_ids, _, stored_at) in list(self._entries.items()):
+                if now - stored_at > self.ttl:
+                    del self._entries[key]
+                    continue
+                if entry_ids != ids or v.shape != q.shape:
+                    continue
+                sim = float(np.dot(v, q))
+                if sim >= best_sim:
+                    best_key, best_sim = key, sim
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return self._entries[best_key][2]
+
+    def put(self, vector: Sequence[float], chunk_ids: Sequence[str], reply: str) -> None:
+        with self._lock:
+            self._check_corpus()
+            self._entries[self._next_key] = (self._unit(vector), tuple(chunk_ids), reply, time.monotonic())
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+_cache: Optional[SemanticResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[SemanticResponseCache]:
+    """Process-wide cache built from env, or None when RESPONSE_CACHE_ENABLED=0."""
+    global _cache
+    if os.getenv("RESPONSE_CACHE_ENABLED", "1").strip() == "0":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticResponseCache(
+                    threshold=float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.95")),
+                    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+                    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512")),
+                )
+    return _cache
@@ -0,0 +1,273 @@
+"""
+Prebuilt, read-only retrieval artifact that worker processes map instead of copying.
+
+`FAISS.load_local` reads the index into each worker's heap and unpickles the docstore
+there too, so N workers hold N copies. The artifact directory (backend/retrieval_artifact)
+stores instead:
+- index.faiss                  the FAISS index, opened with mmap (flat codes / IVF lists);
+- text.bin + text_offsets.npy  chunk texts, UTF-8, back to back;
+- meta.bin + meta_offsets.npy  chunk metadata, one JSON object per chunk;
+- ids.npy                      docstore id per FAISS position;
+- ids_sorted.npy + ids_order.npy  the ids sorted, for binary-search lookups by id;
+- bm25/                        the BM25 term array and postings (see bm25.py);
+- metadata/                    the metadata filter bitmaps (see metadata_index.py);
+- artifact.json                embedding model, splitter, index spec and the corpus digest.
+These live in a versioned subdirectory (v<timestamp>/); the CURRENT file names the live one.
+A rebuild writes a new version and then replaces CURRENT with os.replace, so a loader
+always sees a whole version, never a gap or a mix. The previous version is kept for
+workers still mapping it.
+Every array is loaded with np.load(mmap_mode="r"), so the pages live once in the OS page
+cache for all workers and loading is near-instant: no worker decodes the chunks to
+rebuild BM25 or the metadata bitmaps. Checking that the artifact is current
+costs one hash of projects.json: the corpus digest covers the file's bytes, the embedding
+model, the splitter and the index spec, so workers never re-chunk the corpus to compare
+chunk hashes. The store is read-only: when the digest differs, the pipeline falls back
+to the regular index (see index_manifest.py) until the artifact is rebuilt.
+
+Build (after changing projects.json, or as a deploy build step):
+    python -m src.services.retrieval_artifact
+RAG_ARTIFACT=0 ignores the artifact; RAG_ARTIFACT_DIR moves it.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+import faiss
+import numpy as np
+from langchain.docstore.base import Docstore
+from langchain.docstore.document import Document
+from langchain.embeddings.base import Embeddings
+from langchain.vectorstores import FAISS
+
+from .bm25 import BM25Index
+from .faiss_index import apply_search_params, index_spec_from_env
+from ..utils.file_lock import file_lock
+from .index_manifest import embedding_model_name, load_manifest
+from .metadata_index import MetadataIndex
+
+ARTIFACT_NAME = "artifact.json"
+POINTER_NAME = "CURRENT"
+ARTIFACT_VERSION = 3
+_BACKEND_DIR = Path(__file__).resolve().parents[2]  # .../backend
+DEFAULT_DIR = _BACKEND_DIR / "retrieval_artifact"
+
+
+def _write_column(directory: Path, name: str, values: List[bytes]) -> None:
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(v) for v in values], dtype=np.int64)
+    with open(directory / f"{name}.bin", "wb") as f:
+        for value in values:
+            f.write(value)
+    np.save(directory / f"{name}_offsets.npy", offsets)
+
+
+def _map_column(directory: Path, name: str):
+    offsets = np.load(directory / f"{name}_offsets.npy", mmap_mode="r")
+    # np.memmap refuses empty files; an empty corpus has nothing to map anyway.
+    data = np.memmap(directory / f"{name}.bin", dtype=np.uint8, mode="r") if offsets[-1] else np.zeros(0, np.uint8)
+    return data, offsets
+
+
+class _IdColumn(Mapping):
+    """FAISS position -> docstore id, read from the mapped ids array (LangChain's index_to_docstore_id)."""
+
+    def __init__(self, ids: np.ndarray):
+        self._ids = ids
+
+    def __getitem__(self, position: int) -> str:
+        if not 0 <= position < len(self._ids):
+            raise KeyError(position)
+        return self._ids[position].decode("ascii")
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self._ids)))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class ColumnarDocstore(Docstore):
+    """Read-only docstore over the memory-mapped text / metadata columns."""
+
+    def __init__(self, directory: Path):
+        directory = Path(directory)
+        self.directory = directory  # the version directory, for the BM25 / metadata arrays beside it
+        self.ids = np.load(directory / "ids.npy", mmap_mode="r")
+        self._sorted = np.load(directory / "ids_sorted.npy", mmap_mode="r")
+        self._order = np.load(directory / "ids_order.npy", mmap_mode="r")
+        self._text, self._text_offsets = _map_column(directory, "text")
+        self._meta, self._meta_offsets = _map_column(directory, "meta")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def position(self, doc_id: str) -> Optional[int]:
+        key = doc_id.encode("ascii", "replace")
+        i = int(np.searchsorted(self._sorted, key))
+        if i < len(self._sorted) and self._sorted[i] == key:
+            return int(self._order[i])
+        return None
+
+    def document(self, position: int) -> Document:
+        start, end = int(self._text_offsets[position]), int(self._text_offsets[position + 1])
+        text = bytes(self._text[start:end]).decode("utf-8")
+        start, end = int(self._meta_offsets[position]), int(self._meta_offsets[position + 1])
+        metadata = json.loads(bytes(self._meta[start:end]).decode("utf-8"))
+        return Document(page_content=text, metadata=metadata)
+
+    def search(self, search: str) -> Union[str, Document]:
+        position = self.position(search)
+        if position is None:
+            return f"ID {search} not found."
+        return self.document(position)
+
+    def delete(self, ids: List) -> None:
+        raise NotImplementedError("the retrieval artifact is read-only; rebuild it instead")
+
+
+def corpus_digest(corpus: bytes, embedding_model: str, splitter: Dict[str, object], spec: Dict[str, object]) -> str:
+    """What an artifact was built from: projects.json's bytes and every setting that shapes the index."""
+    settings = {"version": ARTIFACT_VERSION, "embedding_model": embedding_model, "splitter": splitter, "spec": spec}
+    digest = hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(corpus)
+    return digest.hexdigest()
+
+
+def current_version(directory: Path) -> Path:
+    """The live version directory (`directory` itself for an artifact from before versioning)."""
+    directory = Path(directory)
+    try:
+        name = (directory / POINTER_NAME).read_text(encoding="utf-8").strip()
+    except OSError:
+        return directory
+    return directory / name if name else directory
+
+
+def export_artifact(store: FAISS, directory: Path, manifest: Dict[str, object], corpus: bytes) -> Path:
+    """
+    Write `store` (positions 0..n-1 with their documents) as a new version of the artifact
+    and point CURRENT at it. `manifest` is the index manifest the store was built from and
+    `corpus` the projects.json bytes it was chunked from. Returns the version directory.
+    """
+    directory = Path(directory)
+    with file_lock(directory / ".lock"):
+        live = current_version(directory)
+        version = directory / f"v{time.time_ns()}"
+        _write_version(store, version, manifest, corpus)
+        pointer = directory / f"{POINTER_NAME}.tmp"
+        pointer.write_text(version.name, encoding="utf-8")
+        os.replace(pointer, directory / POINTER_NAME)
+        # Keep the version just replaced (workers may still be opening it); drop older ones
+        # and the files of an unversioned artifact.
+        for path in directory.iterdir():
+            if path.is_dir() and path.name.startswith("v") and path not in (version, live):
+                shutil.rmtree(path, ignore_errors=True)
+            elif path.is_file() and path.name not in (POINTER_NAME, ".lock"):
+                path.unlink()
+    return version
+
+
+def _write_version(store: FAISS, out: Path, manifest: Dict[str, object], corpus: bytes) -> None:
+    out.mkdir(parents=True)
+    ids = [store.index_to_docstore_id[pos] for pos in range(store.index.ntotal)]
+    docs = [store.docstore.search(doc_id) for doc_id in ids]
+    faiss.write_index(store.index, str(out / "index.faiss"))
+    _write_column(out, "text", [d.page_content.encode("utf-8") for d in docs])
+    _write_column(out, "meta", [json.dumps(d.metadata, ensure_ascii=False).encode("utf-8") for d in docs])
+    id_array = np.array([i.encode("ascii") for i in ids], dtype=f"S{max([len(i) for i in ids] or [1])}")
+    order = np.argsort(id_array, kind="stable")
+    np.save(out / "ids.npy", id_array)
+    np.save(out / "ids_sorted.npy", id_array[order])
+    np.save(out / "ids_order.npy", order.astype(np.int64))
+    BM25Index.build([d.page_content for d in docs], docs.__getitem__).save(out / "bm25")
+    MetadataIndex.from_documents(docs).save(out / "metadata")
+    spec = (manifest.get("index") or {}).get("spec")
+    meta = {
+        "version": ARTIFACT_VERSION,
+        "embedding_model": manifest.get("embedding_model"),
+        "splitter": manifest.get("splitter"),
+        "index": manifest.get("index"),
+        "corpus": corpus_digest(corpus, manifest.get("embedding_model"), manifest.get("splitter"), spec),
+        "size": len(ids),
+    }
+    with open(out / ARTIFACT_NAME, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, sort_keys=True)
+
+
+def _mmap_flags(spec: Dict[str, object]) -> int:
+    # IVF maps its inverted lists; flat (and HNSW's flat storage) map their code arrays.
+    mmap = faiss.IO_FLAG_MMAP if spec.get("type") in ("ivf", "ivfpq") else faiss.IO_FLAG_MMAP_IFC
+    return mmap | faiss.IO_FLAG_READ_ONLY
+
+
+def load_artifact(
+    embeddings: Embeddings,
+    directory: Path = DEFAULT_DIR,
+    *,
+    corpus: bytes,
+    splitter: Dict[str, object],
+    spec: Optional[Dict[str, object]] = None,
+) -> Optional[FAISS]:
+    """
+    A store over the mapped artifact when it was built from this projects.json (`corpus`,
+    its raw bytes) with the same embedding model, splitter and index spec; otherwise None.
+    """
+    directory = current_version(directory)  # resolved once: every file comes from one version
+    try:
+        with open(directory / ARTIFACT_NAME, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    spec = dict(spec or index_spec_from_env())
+    model = embedding_model_name(embeddings)
+    if meta.get("version") != ARTIFACT_VERSION:
+        reason = "unknown version"
+    elif meta.get("embedding_model") != model:
+        reason = "different embedding model"
+    elif meta.get("splitter") != splitter or (meta.get("index") or {}).get("spec") != spec:
+        reason = "different splitter or index settings"
+    elif meta.get("corpus") != corpus_digest(corpus, model, splitter, spec):
+        reason = "projects.json changed since it was built"
+    else:
+        index = faiss.read_index(str(directory / "index.faiss"), _mmap_flags(spec))
+        apply_search_params(index, spec)
+        docstore = ColumnarDocstore(directory)
+        print(f"[index] mapped retrieval artifact: {len(docstore)} chunks from {directory}")
+        return FAISS(embeddings, index, docstore, _IdColumn(docstore.ids))
+    print(f"[index] ignoring retrieval artifact in {directory}: {reason}")
+    return None
+
+
+def _main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the memory-mapped retrieval artifact.")
+    parser.add_argument("--out", default="", help="artifact directory (default: RAG_ARTIFACT_DIR or backend/retrieval_artifact)")
+    args = parser.parse_args(argv)
+
+    # Imported here: building needs the full pipeline (embeddings + the regular index).
+    from . import rag_pipeline
+
+    os.environ["RAG_ARTIFACT"] = "0"  # build from the regular index, never from the old artifact
+    corpus = rag_pipeline._DATA_PATH.read_bytes()
+    rag_pipeline._init_rag_once()
+    runtime = rag_pipeline._rag_runtime
+    if runtime is None:
+        raise SystemExit(f"RAG runtime unavailable: {rag_pipeline._rag_error}")
+    if rag_pipeline._DATA_PATH.read_bytes() != corpus:
+        raise SystemExit("projects.json changed while the index was being built; run the build again")
+    manifest = load_manifest(runtime["index_dir"])
+    if manifest is None:
+        raise SystemExit(f"no index manifest in {runtime['index_dir']}")
+    out = Path(args.out or os.getenv("RAG_ARTIFACT_DIR") or DEFAULT_DIR)
+    version = export_artifact(runtime["vector_store"], out, manifest, corpus)
+    print(f"[index] wrote retrieval artifact ({runtime['vector_store'].index.ntotal} chunks) to {version}")
+
+
+if __name__ == "__main__":
+    _main()
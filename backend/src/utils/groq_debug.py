@@ -1,18 +1,26 @@
 """
 Groq key handling and safe debug helpers. Never log or return full secrets.
 """
-import json
 import os
-import urllib.error
-import urllib.request
 
-GROQ_CHAT_URL = "https://api.groq.com/openai/v1/chat/completions"
+import httpx
+
+from .http_client import get_sync_client
+
+GROQ_BASE_URL = "https://api.groq.com"
+GROQ_CHAT_URL = GROQ_BASE_URL + "/openai/v1/chat/completions"
 GROQ_HEADER_AUTH = "Authorization"
 GROQ_HEADER_BEARER = "Bearer "
 # Cloudflare (in front of Groq) can return 403/1010 for default Python User-Agent; use a standard one.
 GROQ_USER_AGENT = "Groq-API-Client/1.0 (Python; portfolio-backend)"
 
 
+def groq_chat_url() -> str:
+    """Chat-completions endpoint. GROQ_BASE_URL (same variable as the Groq SDK) points it elsewhere."""
+    base = (os.getenv("GROQ_BASE_URL") or "").strip().rstrip("/") or GROQ_BASE_URL
+    return base + "/openai/v1/chat/completions"
+
+
 def get_groq_key_stripped() -> str:
     """Read GROQ_API_KEY from env and strip whitespace/newlines."""
     return (os.getenv("GROQ_API_KEY") or "").strip()
@@ -55,44 +63,46 @@ def groq_test_request() -> dict:
         }
     log_groq_key_safe(key)
 
-    req = urllib.request.Request(
-        GROQ_CHAT_URL,
-        data=json.dumps({
-            "model": "llama-3.1-8b-instant",
-            "messages": [{"role": "user", "content": "Say OK"}],
-            "max_tokens": 10,
-        }).encode("utf-8"),
-        headers={
-            GROQ_HEADER_AUTH: GROQ_HEADER_BEARER + key,
-            "Content-Type": "application/json",
-            "User-Agent": GROQ_USER_AGENT,
-        },
-        method="POST",
-    )
     try:
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            body = resp.read().decode()
-            data = json.loads(body)
-            if data.get("choices") and len(data["choices"]) > 0:
-                return {"ok": True, "error": None, "raw_response": body[:500]}
-            return {"ok": False, "error": "Unexpected response shape", "raw_response": body[:500]}
-    except urllib.error.HTTPError as e:
-        raw = e.read().decode() if e.fp else ""
+        resp = get_sync_client().post(
+            groq_chat_url(),
+            json={
+                "model": "llama-3.1-8b-instant",
+                "messages": [{"role": "user", "content": "Say OK"}],
+                "max_tokens": 10,
+            },
+            headers={
+                GROQ_HEADER_AUTH: GROQ_HEADER_BEARER + key,
+                "Content-Type": "application/json",
+                "User-Agent": GROQ_USER_AGENT,
+            },
+            timeout=15,
+        )
+    except httpx.HTTPError as e:
+        return {
+            "ok": False,
+            "error": str(e),
+            "raw_response": None,
+        }
+    if resp.status_code >= 400:
+        raw = resp.text
         out = {
             "ok": False,
-            "error": f"HTTP {e.code}: {raw}",
+            "error": f"HTTP {resp.status_code}: {raw}",
             "raw_response": raw[:1000],
         }
-        if e.code == 403 and "1010" in raw:
+        if resp.status_code == 403 and "1010" in raw:
             out["hint"] = (
                 "Cloudflare 1010 = access denied (often region/network or blocked User-Agent). "
                 "Try: different network, disable VPN, or run from another machine. "
                 "Backend sends User-Agent: Groq-API-Client/1.0; restart and retry."
             )
         return out
-    except Exception as e:
-        return {
-            "ok": False,
-            "error": str(e),
-            "raw_response": None,
-        }
+    body = resp.text
+    try:
+        data = resp.json()
+    except ValueError as e:
+        return {"ok": False, "error": str(e), "raw_response": body[:500]}
+    if isinstance(data, dict) and data.get("choices") and len(data["choices"]) > 0:
+        return {"ok": True, "error": None, "raw_response": body[:500]}
+    return {"ok": False, "error": "Unexpected response shape", "raw_response": body[:500]}
@@ -0,0 +1,89 @@
+"""
+Shared, pooled HTTP clients for provider calls (Groq, Hugging Face).
+
+One client per process (sync) / per event loop (async) keeps TCP + TLS connections
+alive between chat turns and embedding batches instead of handshaking on every call.
+Async clients are kept per loop, so a second loop (another thread, a test) never replaces
+and strands the first one's client; aclose_clients closes them all.
+
+Tuning (env):
+- PROVIDER_HTTP_TIMEOUT            read/write timeout in seconds (default 60)
+- PROVIDER_HTTP_CONNECT_TIMEOUT    connect timeout in seconds (default 10)
+- PROVIDER_HTTP_MAX_CONNECTIONS    pool size per client (default 20)
+- PROVIDER_HTTP_MAX_KEEPALIVE      idle connections kept open (default 10)
+- PROVIDER_HTTP_KEEPALIVE_EXPIRY   seconds an idle connection is kept (default 30)
+"""
+import asyncio
+import os
+import threading
+from typing import Dict, Optional
+
+import httpx
+
+_sync_client: Optional[httpx.Client] = None
+_async_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+_lock = threading.Lock()
+# Seconds aclose_clients waits for a client owned by another (still running) loop to close.
+_FOREIGN_CLOSE_TIMEOUT = 5.0
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        float(os.getenv("PROVIDER_HTTP_TIMEOUT", "60")),
+        connect=float(os.getenv("PROVIDER_HTTP_CONNECT_TIMEOUT", "10")),
+    )
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=int(os.getenv("PROVIDER_HTTP_MAX_CONNECTIONS", "20")),
+        max_keepalive_connections=int(os.getenv("PROVIDER_HTTP_MAX_KEEPALIVE", "10")),
+        keepalive_expiry=float(os.getenv("PROVIDER_HTTP_KEEPALIVE_EXPIRY", "30")),
+    )
+
+
+def get_sync_client() -> httpx.Client:
+    """Process-wide pooled client for blocking call sites (safe to share across threads)."""
+    global _sync_client
+    if _sync_client is None:
+        with _lock:
+            if _sync_client is None:
+                _sync_client = httpx.Client(timeout=_timeout(), limits=_limits())
+    return _sync_client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Pooled async client for the running event loop (async connections cannot cross loops)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        with _lock:
+            # Loops that have been closed can no longer run their client's close; drop them.
+            for stale in [other for other in _async_clients if other.is_closed()]:
+                del _async_clients[stale]
+            client = _async_clients.get(loop)
+            if client is None:
+                client = _async_clients[loop] = httpx.AsyncClient(timeout=_timeout(), limits=_limits())
+    return client
+
+
+async def aclose_clients() -> None:
+    """Close pooled connections (call on app shutdown): the sync client and every loop's async client."""
+    global _sync_client
+    with _lock:
+        sync_client, _sync_client = _sync_client, None
+        async_clients = list(_async_clients.items())
+        _async_clients.clear()
+    if sync_client is not None:
+        sync_client.close()
+    current = asyncio.get_running_loop()
+    for loop, client in async_clients:
+        if loop is current:
+            await client.aclose()
+        elif loop.is_running():
+            # Connections belong to their loop: close them there.
+            future = asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            try:
+                await asyncio.wait_for(asyncio.wrap_future(future), _FOREIGN_CLOSE_TIMEOUT)
+            except Exception as e:
+                print(f"[http] closing a client on another event loop failed: {e}")
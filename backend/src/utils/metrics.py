@@ -0,0 +1,162 @@
+"""
+In-process metrics (prometheus_client), exported in the Prometheus text format on GET /metrics.
+
+Counters and histograms are module-level and labelled, e.g.
+- rag_stage_seconds{stage="embed"|"search"|"prompt"|"llm"}  per-stage latency of a chat turn
+  ("rerank" is timed within "search");
+- rag_answers_total{source="template"|"faq"|"cache"|"llm"|"error"};
+- rag_llm_tokens_total{kind="prompt"|"completion"}            estimated (~4 chars/token);
+- provider_errors_total{provider, status}                     429 / 5xx / timeout ... per backend;
+- http_request_duration_seconds{method, path, status}.
+Gauges (cache hit rate, session-store size, ...) are set from the live stats when /metrics
+is scraped.
+
+Several workers (serve.py, WEB_CONCURRENCY > 1): serve.py points PROMETHEUS_MULTIPROC_DIR
+at an empty directory before the workers start. Each worker then writes its values to
+memory-mapped files there, and /metrics, whichever worker answers, reports counters and
+histograms summed over all workers. Gauges describe one worker's own state (response
+cache, session store, circuit breakers) and carry a `pid` label instead, one series per
+live worker, as of that worker's last scrape. Without the variable (python app.py, tests)
+metrics are per process.
+
+`stage(name)` also records into the current request's timings, which the Server-Timing
+middleware turns into a response header.
+"""
+import asyncio
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, disable_created_metrics, generate_latest
+from prometheus_client import multiprocess
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+disable_created_metrics()
+_registry = CollectorRegistry()
+
+
+def multiprocess_dir() -> Optional[str]:
+    return os.getenv("PROMETHEUS_MULTIPROC_DIR") or None
+
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_seconds", "Time spent per stage of a chat turn.", ["stage"], buckets=DEFAULT_BUCKETS, registry=_registry
+)
+ANSWERS = Counter("rag_answers_total", "Chat answers by where they came from.", ["source"], registry=_registry)
+LLM_TOKENS = Counter("rag_llm_tokens_total", "Estimated LLM tokens (~4 chars/token).", ["kind"], registry=_registry)
+PROVIDER_ERRORS = Counter(
+    "provider_errors_total",
+    "Failed provider calls by HTTP status (or timeout / error).",
+    ["provider", "status"],
+    registry=_registry,
+)
+HTTP_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency, until the last byte is sent.",
+    ["method", "path", "status"],
+    buckets=DEFAULT_BUCKETS,
+    registry=_registry,
+)
+RESPONSE_CACHE_HIT_RATIO = Gauge(
+    "response_cache_hit_ratio", "Semantic response cache hit rate.", registry=_registry, multiprocess_mode="liveall"
+)
+RESPONSE_CACHE_SIZE = Gauge(
+    "response_cache_entries", "Entries in the semantic response cache.", registry=_registry, multiprocess_mode="liveall"
+)
+SESSION_STORE_SIZE = Gauge(
+    "session_store_sessions", "Chat sessions held by the session store.", registry=_registry, multiprocess_mode="liveall"
+)
+SESSION_STORE_CHARS = Gauge(
+    "session_store_chars", "Characters of history held (memory store only).", registry=_registry, multiprocess_mode="liveall"
+)
+LLM_BACKEND_OPEN = Gauge(
+    "llm_backend_circuit_open",
+    "1 while a backend's circuit breaker is open or half-open.",
+    ["backend"],
+    registry=_registry,
+    multiprocess_mode="liveall",
+)
+
+
+def _collecting_registry() -> CollectorRegistry:
+    """What /metrics reports: every worker's files in multiprocess mode, else this process."""
+    if multiprocess_dir() is None:
+        return _registry
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render() -> bytes:
+    return generate_latest(_collecting_registry())
+
+
+def sample(name: str, **labels) -> float:
+    """Current value of one sample as /metrics would report it (0 if absent), e.g. for tests."""
+    value = _collecting_registry().get_sample_value(name, {k: str(v) for k, v in labels.items()})
+    return value or 0.0
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop a stopped worker's live gauges (multiprocess mode only)."""
+    if multiprocess_dir() is not None:
+        multiprocess.mark_process_dead(pid)
+
+
+_STATUS_IN_MESSAGE = re.compile(r"\b([45]\d\d)\b")
+
+
+def error_status(error: BaseException) -> str:
+    """HTTP status of a provider error ("429", "503"), else "timeout" or "error"."""
+    for source in (error, getattr(error, "response", None)):
+        code = getattr(source, "status_code", None)
+        if isinstance(code, int):
+            return str(code)
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)) or "timeout" in type(error).__name__.lower():
+        return "timeout"
+    match = _STATUS_IN_MESSAGE.search(str(error))
+    return match.group(1) if match else "error"
+
+
+def record_provider_error(provider: str, error) -> None:
+    """`error` is an exception or an HTTP status code."""
+    status = str(error) if isinstance(error, int) else error_status(error)
+    PROVIDER_ERRORS.labels(provider=provider, status=status).inc()
+
+
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+def track_request() -> Tuple[Dict[str, float], object]:
+    """Start collecting stage timings for the current request: (timings in ms, reset token)."""
+    timings: Dict[str, float] = {}
+    return timings, _request_timings.set(timings)
+
+
+def untrack_request(token) -> None:
+    _request_timings.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block into rag_stage_seconds and the current request's Server-Timing."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage=name).observe(elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed * 1000.0
+
+
+def server_timing(timings: Dict[str, float], total_ms: float) -> str:
+    parts = [f"{name};dur={ms:.1f}" for name, ms in timings.items()]
+    parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
@@ -0,0 +1,36 @@
+import hashlib
+
+from langchain.embeddings.base import Embeddings
+
+
+def hash_vector(text):
+  """8 dimensions from the text's SHA-256: stable across runs and processes."""
+  digest = hashlib.sha256(text.encode("utf-8")).digest()
+  return [b / 255.0 for b in digest[:8]]
+
+
+def length_vector(text):
+  return [float(len(text)), 1.0]
+
+
+class FakeEmbeddings(Embeddings):
+  """
+  Deterministic embeddings for index and cache tests. `vector(text)` makes document vectors
+  (default: hash_vector), `query_vector(text)` query vectors (default: the same). Texts
+  embedded as documents are recorded in `embedded`, queries in `queries`.
+  """
+
+  def __init__(self, vector=hash_vector, query_vector=None, model_name="test-model"):
+    self.vector = vector
+    self.query_vector = query_vector or vector
+    self.model_name = model_name
+    self.embedded = []
+    self.queries = []
+
+  def embed_documents(self, texts):
+    self.embedded.extend(texts)
+    return [self.vector(t) for t in texts]
+
+  def embed_query(self, text):
+    self.queries.append(text)
+    return self.query_vector(text)
@@ -0,0 +1,56 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from bench.loadgen import Result, format_report, percentile, summarize
+from bench.mock_providers import MockConfig, create_mock_app
+
+
+def _client(**config):
+  return TestClient(create_mock_app(MockConfig(llm_ms=0, token_ms=0, embed_ms=0, seed=1, **config)))
+
+
+def test_mock_speaks_groq_and_hf_apis():
+  client = _client()
+  body = {"model": "llama-3.3-70b-versatile", "messages": [{"role": "user", "content": "hi"}]}
+  reply = client.post("/openai/v1/chat/completions", json=body).json()
+  assert reply["choices"][0]["message"]["content"].startswith("I built")
+
+  with client.stream("POST", "/openai/v1/chat/completions", json={**body, "stream": True}) as r:
+    lines = [line for line in r.iter_lines() if line.startswith("data:")]
+  assert lines[-1] == "data: [DONE]"
+  tokens = [json.loads(line[5:])["choices"][0]["delta"]["content"] for line in lines[:-1]]
+  assert "".join(tokens) == reply["choices"][0]["message"]["content"]
+
+  one = client.post("/models/BAAI/bge-small-en-v1.5", json={"inputs": "rust detection"}).json()
+  many = client.post("/models/BAAI/bge-small-en-v1.5", json={"inputs": ["rust detection", "forecasting"]}).json()
+  assert len(one) == 384 and many[0] == one
+
+
+def test_mock_injects_errors():
+  client = _client(error_rate=1.0, error_status=[429])
+  assert client.post("/models/m", json={"inputs": "x"}).status_code == 429
+  assert client.get("/stats").json()["errors"] == 1
+
+
+def test_summary_percentiles_and_error_rate():
+  results = [Result("chat", 200, float(ms)) for ms in range(1, 101)]
+  results.append(Result("stream", 200, 50.0, ttft_ms=10.0))
+  results.append(Result("chat", 503, 5.0))
+  summary = summarize(results, wall_seconds=2.0)
+  assert percentile([3, 1, 2], 0.5) == 2
+  assert summary["latency_ms"]["p50"] == 50 and summary["latency_ms"]["p99"] == 99
+  assert summary["ttft_ms"]["p50"] == 10.0
+  assert summary["error_rate"] == 1 / 102
+  assert summary["throughput_rps"] == 50.5
+  assert summary["statuses"] == {"200": 101, "503": 1}
+  assert "p95" in format_report(summary)
+
+
+def test_backend_env_isolates_the_launched_workers(tmp_path):
+  from bench.run import _backend_env
+
+  env = _backend_env("http://127.0.0.1:1", tmp_path)
+  assert env["RAG_ARTIFACT"] == "0"
+  assert env["RAG_INDEX_DIR"].startswith(str(tmp_path))
+  assert (tmp_path / "metrics").is_dir() and env["PROMETHEUS_MULTIPROC_DIR"] == str(tmp_path / "metrics")
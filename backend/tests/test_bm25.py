@@ -0,0 +1,58 @@
+import numpy as np
+from langchain.docstore.document import Document
+
+from conftest import FakeEmbeddings, length_vector
+from src.services.bm25 import BM25Index, load_or_build_for_store, reciprocal_rank_fusion
+from src.services.index_manifest import load_or_build_index
+
+
+def _doc(cid, text):
+  return Document(page_content=text, metadata={"chunk_id": cid})
+
+
+DOCS = [
+  _doc("rust", "Project: Rust detection. Technologies: Python, PyTorch, YOLOv8, OpenCV, Flask."),
+  _doc("mlops", "Project: Time Series Forecasting with MLOps. Technologies: Airflow, MLflow, Prophet."),
+  _doc("web", "Project: Portfolio website. Technologies: React, Vite, FastAPI."),
+]
+
+
+def test_exact_terms_rank_first():
+  index = BM25Index.from_documents(DOCS + [DOCS[0]])
+  assert index.size == 3
+  assert index.search("Which project uses MLflow?", 3)[0][0].metadata["chunk_id"] == "mlops"
+  assert index.search("yolov8 opencv", 2)[0][0].metadata["chunk_id"] == "rust"
+  assert index.search("kubernetes", 3) == []
+
+
+def test_allowed_positions_restrict_results():
+  index = BM25Index.from_documents(DOCS)
+  found = index.search("project technologies", 3, allowed=[0, 2])
+  assert sorted(d.metadata["chunk_id"] for d, _ in found) == ["rust", "web"]
+
+
+def _copies(docs):
+  # The index build overwrites metadata["chunk_id"] with the content hash.
+  return [Document(page_content=d.page_content, metadata=dict(d.metadata)) for d in docs]
+
+
+def test_saved_next_to_the_index_and_mapped_by_the_next_worker(tmp_path):
+  store = load_or_build_index(_copies(DOCS), FakeEmbeddings(length_vector), tmp_path / "index", splitter={})
+  built = load_or_build_for_store(store, tmp_path / "index")
+  [saved] = (tmp_path / "index").glob("bm25-*")
+  mapped = load_or_build_for_store(store, tmp_path / "index")
+  assert isinstance(mapped.weights, np.memmap)
+  query = "Which project uses MLflow?"
+  results = [[(d.page_content, score) for d, score in index.search(query, 3)] for index in (mapped, built)]
+  assert results[0] == results[1]
+  # A changed index gets its own copy; the stale one is dropped.
+  grown = load_or_build_index(_copies(DOCS[:2]), FakeEmbeddings(length_vector), tmp_path / "index", splitter={})
+  load_or_build_for_store(grown, tmp_path / "index")
+  assert [p.name for p in (tmp_path / "index").glob("bm25-*")] != [saved.name]
+
+
+def test_rrf_rewards_agreement_between_lists():
+  dense = [DOCS[2], DOCS[1], DOCS[0]]
+  sparse = [DOCS[1], DOCS[0]]
+  fused = reciprocal_rank_fusion([dense, sparse], k=2)
+  assert [d.metadata["chunk_id"] for d in fused] == ["mlops", "rust"]
@@ -0,0 +1,164 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from langchain.schema.messages import AIMessage, AIMessageChunk
+
+from src.main import app
+from src.repositories.session_store import get_session_store
+from src.services import rag_pipeline
+
+
+class _Doc:
+  def __init__(self, text):
+    self.page_content = text
+
+
+class _FakeRetriever:
+  def get_relevant_documents(self, query):
+    return [_Doc("Project: Rust Detector. Technologies: YOLOv8.")]
+
+  async def aget_relevant_documents(self, query):
+    return self.get_relevant_documents(query)
+
+
+class _SlowLLM:
+  def __init__(self):
+    self.in_flight = 0
+    self.peak = 0
+
+  async def apredict_messages(self, messages):
+    self.in_flight += 1
+    self.peak = max(self.peak, self.in_flight)
+    await asyncio.sleep(0.05)
+    self.in_flight -= 1
+    return AIMessage(content=" YOLOv8 rust detection. ")
+
+  async def astream(self, messages):
+    for token in ["YOLOv8", " rust", " detection."]:
+      yield AIMessageChunk(content=token)
+
+
+def _install_fake_runtime(monkeypatch, llm):
+  monkeypatch.setattr(rag_pipeline, "_rag_initialized", True)
+  monkeypatch.setattr(rag_pipeline, "_rag_runtime", {"retriever": _FakeRetriever(), "llm": llm})
+
+
+def test_chat_uses_async_pipeline(monkeypatch):
+  _install_fake_runtime(monkeypatch, _SlowLLM())
+  client = TestClient(app)
+  res = client.post("/chat", json={"message": "What uses YOLO?"})
+  assert res.status_code == 200
+  body = res.json()
+  assert body["reply"] == "YOLOv8 rust detection."
+  assert body["session_id"]
+
+
+def test_concurrent_queries_overlap_up_to_limit(monkeypatch):
+  llm = _SlowLLM()
+  _install_fake_runtime(monkeypatch, llm)
+  monkeypatch.setenv("RAG_MAX_CONCURRENCY", "3")
+  monkeypatch.setattr(rag_pipeline, "_concurrency", None)
+
+  async def run():
+    return await asyncio.gather(*(rag_pipeline.aquery_portfolio(f"q{i}") for i in range(6)))
+
+  replies = asyncio.run(run())
+  assert len(replies) == 6
+  assert llm.peak == 3
+
+
+def test_chat_stream_sends_tokens_then_saves_turn(monkeypatch):
+  _install_fake_runtime(monkeypatch, _SlowLLM())
+  client = TestClient(app)
+  res = client.post("/chat/stream", json={"message": "What uses YOLO?", "session_id": "sse-1"})
+  assert res.status_code == 200
+  assert res.headers["content-type"].startswith("text/event-stream")
+  events = [block for block in res.text.split("\n\n") if block]
+  assert events[0].startswith("event: session")
+  assert [e.split("\n")[0] for e in events[1:]] == ["event: token"] * 3 + ["event: done"]
+  assert get_session_store().get("sse-1")[-1] == ("What uses YOLO?", "YOLOv8 rust detection.")
+
+
+class _BrokenStreamLLM:
+  async def astream(self, messages):
+    yield AIMessageChunk(content="YOLOv8")
+    raise RuntimeError("Groq 503 Service Unavailable")
+
+
+def test_chat_stream_failure_midway_sends_error_and_skips_history(monkeypatch):
+  _install_fake_runtime(monkeypatch, _BrokenStreamLLM())
+  client = TestClient(app)
+  res = client.post("/chat/stream", json={"message": "What uses YOLO?", "session_id": "sse-broken"})
+  events = [block for block in res.text.split("\n\n") if block]
+  assert [e.split("\n")[0] for e in events] == ["event: session", "event: token", "event: error"]
+  assert "503" in events[-1] and "YOLOv8" not in events[-1]
+  assert get_session_store().get("sse-broken") == []
+
+
+class _EchoLLM:
+  """Answers with the retrieved context, so every entry point's prompt can be compared."""
+
+  def _reply(self, messages):
+    return "YOLOv8" if any("YOLOv8" in m.content for m in messages) else "?"
+
+  def predict_messages(self, messages):
+    return AIMessage(content=self._reply(messages))
+
+  async def apredict_messages(self, messages):
+    return self.predict_messages(messages)
+
+  async def astream(self, messages):
+    yield AIMessageChunk(content=self._reply(messages))
+
+
+def test_sync_async_and_streaming_paths_run_the_same_turn(monkeypatch):
+  from src.utils import metrics
+
+  _install_fake_runtime(monkeypatch, _EchoLLM())
+  before = metrics.sample("rag_answers_total", source="llm")
+
+  async def stream():
+    return "".join([piece async for piece in rag_pipeline.astream_portfolio("What uses YOLO?")])
+
+  replies = [
+    rag_pipeline.query_portfolio("What uses YOLO?"),
+    asyncio.run(rag_pipeline.aquery_portfolio("What uses YOLO?")),
+    asyncio.run(stream()),
+  ]
+  assert replies == ["YOLOv8"] * 3
+  assert metrics.sample("rag_answers_total", source="llm") - before == 3
+
+
+class _ThreadRecordingStore:
+  def __init__(self):
+    self.threads = []
+
+  def load(self, sid):
+    import threading
+
+    self.threads.append(threading.get_ident())
+    return "", []
+
+  def set(self, sid, history, summary=""):
+    import threading
+
+    self.threads.append(threading.get_ident())
+
+
+def test_session_store_io_stays_off_the_event_loop(monkeypatch):
+  import threading
+
+  from src.services import rag_service
+
+  store = _ThreadRecordingStore()
+  monkeypatch.setattr(rag_service, "get_session_store", lambda: store)
+  _install_fake_runtime(monkeypatch, _EchoLLM())
+
+  async def run():
+    await rag_service.aanswer("What uses YOLO?", "s-1")
+    _, tokens = rag_service.stream_answer("What uses YOLO?", "s-2")
+    return [t async for t in tokens]
+
+  assert asyncio.run(run()) == ["YOLOv8"]
+  assert len(store.threads) == 4
+  assert threading.get_ident() not in store.threads
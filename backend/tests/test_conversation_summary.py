@@ -0,0 +1,54 @@
+from langchain.schema.messages import AIMessage
+
+from src.repositories.session_store import MemorySessionStore
+from src.services import conversation_summary, rag_pipeline, rag_service
+
+
+class _SummaryLLM:
+  def __init__(self):
+    self.calls = []
+
+  def predict_messages(self, messages):
+    self.calls.append(messages[-1].content)
+    return AIMessage(content=f"summary #{len(self.calls)}")
+
+
+def _turns(n, start=0):
+  return [(f"q{i}", f"a{i}") for i in range(start, start + n)]
+
+
+def test_older_turns_are_folded_into_summary(monkeypatch):
+  store = MemorySessionStore()
+  llm = _SummaryLLM()
+  monkeypatch.setattr(conversation_summary, "get_session_store", lambda: store)
+  monkeypatch.setattr(rag_pipeline, "_rag_runtime", {"llm": llm})
+  monkeypatch.setenv("SESSION_KEEP_TURNS", "2")
+  monkeypatch.setenv("SESSION_SUMMARIZE_AFTER", "4")
+
+  store.set("s", _turns(4))
+  assert conversation_summary.maybe_schedule("s", "", _turns(4)) is None
+  store.set("s", _turns(5))
+  assert conversation_summary.maybe_schedule("s", "", _turns(5)).result()
+  assert store.load("s") == ("summary #1", _turns(2, start=3))
+  assert "q0" in llm.calls[0] and "q3" not in llm.calls[0]
+
+
+def test_compaction_is_dropped_if_session_changed(monkeypatch):
+  store = MemorySessionStore()
+  monkeypatch.setattr(conversation_summary, "get_session_store", lambda: store)
+  monkeypatch.setattr(rag_pipeline, "_rag_runtime", {"llm": _SummaryLLM()})
+  monkeypatch.setenv("SESSION_KEEP_TURNS", "2")
+  monkeypatch.setenv("SESSION_SUMMARIZE_AFTER", "4")
+
+  # Another request already rewrote the session with a newer summary.
+  store.set("s", _turns(2, start=3), summary="newer")
+  assert not conversation_summary.maybe_schedule("s", "", _turns(5)).result()
+  assert store.load("s") == ("newer", _turns(2, start=3))
+
+
+def test_record_turn_keeps_summary(monkeypatch):
+  store = MemorySessionStore()
+  monkeypatch.setattr(rag_service, "get_session_store", lambda: store)
+  monkeypatch.setenv("SESSION_SUMMARY", "0")
+  rag_service._record_turn("s", "earlier: asked about YOLO", _turns(1), "q1", "a1")
+  assert store.load("s") == ("earlier: asked about YOLO", _turns(2))
@@ -0,0 +1,71 @@
+from conftest import FakeEmbeddings
+from src.services.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+def _counting():
+  return FakeEmbeddings(lambda t: [float(len(t)), 0.5, -1.0], lambda t: [float(len(t)), 0.25, 1.0])
+
+
+def test_repeated_texts_are_served_from_disk(tmp_path):
+  inner = _counting()
+  emb = CachedEmbeddings(inner, EmbeddingCache(tmp_path, "test-model"))
+  assert emb.embed_documents(["a", "bb", "a"]) == [[1.0, 0.5, -1.0], [2.0, 0.5, -1.0], [1.0, 0.5, -1.0]]
+  assert emb.embed_documents(["bb", "ccc"])[1] == [3.0, 0.5, -1.0]
+  assert emb.embed_query("bb") == [2.0, 0.25, 1.0]
+  assert emb.embed_query("bb") == [2.0, 0.25, 1.0]
+  assert inner.embedded == ["a", "bb", "ccc"] and inner.queries == ["bb"]
+
+
+def test_second_process_maps_the_same_file(tmp_path):
+  writer = CachedEmbeddings(_counting(), EmbeddingCache(tmp_path, "test-model"))
+  reader_cache = EmbeddingCache(tmp_path, "test-model")
+  writer.embed_documents(["shared chunk"])
+  reader_inner = _counting()
+  reader = CachedEmbeddings(reader_inner, reader_cache)
+  assert reader.embed_documents(["shared chunk"]) == [[12.0, 0.5, -1.0]]
+  assert reader_inner.embedded == []
+  assert EmbeddingCache(tmp_path, "other-model").get_many([b"x" * 16]) == [None]
+
+
+def test_query_file_keeps_its_newest_records_at_the_cap(tmp_path):
+  inner = _counting()
+  emb = CachedEmbeddings(
+    inner,
+    EmbeddingCache(tmp_path, "test-model"),
+    EmbeddingCache(tmp_path, "test-model", kind="query", max_entries=4),
+  )
+  emb.embed_documents(["chunk"])
+  for q in ["q1", "q22", "q333", "q4444", "q55555"]:
+    emb.embed_query(q)
+  # Compacted to the newest half of the cap, then the new query appended.
+  assert emb.query_cache.stats()["size"] == 2
+  inner.queries.clear()
+  other = CachedEmbeddings(inner, emb.cache, EmbeddingCache(tmp_path, "test-model", kind="query"))
+  assert other.embed_query("q4444") == [5.0, 0.25, 1.0] and other.embed_query("q55555") == [6.0, 0.25, 1.0]
+  assert inner.queries == []
+  assert emb.cache.stats()["size"] == 1
+
+
+def test_a_batch_over_the_cap_is_trimmed(tmp_path):
+  cache = EmbeddingCache(tmp_path, "test-model", kind="query", max_entries=3)
+  keys = [bytes([i]) * 16 for i in range(5)]
+  cache.put_many(keys, [[float(i)] for i in range(5)])
+  assert cache._path.stat().st_size == 3 * cache._dtype.itemsize
+  assert cache.get_many(keys) == [None, None, [2.0], [3.0], [4.0]]
+
+
+def test_keys_sharing_a_prefix_are_told_apart(tmp_path):
+  cache = EmbeddingCache(tmp_path, "test-model")
+  a, b = b"p" * 8 + b"a" * 8, b"p" * 8 + b"b" * 8
+  cache.put_many([b, a], [[2.0], [1.0]])
+  assert EmbeddingCache(tmp_path, "test-model").get_many([a, b, b"p" * 16]) == [[1.0], [2.0], None]
+
+
+def test_torn_trailing_record_is_cut_before_appending(tmp_path):
+  cache = EmbeddingCache(tmp_path, "test-model")
+  cache.put_many([b"a" * 16], [[1.0, 2.0]])
+  with open(cache._path, "ab") as f:
+    f.write(b"\x00" * 5)  # crash mid-write
+  cache.put_many([b"b" * 16], [[3.0, 4.0]])
+  assert cache._path.stat().st_size == 2 * cache._dtype.itemsize
+  assert EmbeddingCache(tmp_path, "test-model").get_many([b"a" * 16, b"b" * 16]) == [[1.0, 2.0], [3.0, 4.0]]
@@ -0,0 +1,43 @@
+import numpy as np
+from langchain.docstore.document import Document
+
+from conftest import FakeEmbeddings
+from src.services.index_manifest import load_manifest, load_or_build_index
+
+SPLITTER = {"chunk_size": 1000, "chunk_overlap": 200}
+
+
+def _seeded_vector(text):
+  return np.random.default_rng(abs(hash(text)) % (2**32)).normal(size=16).astype("float32").tolist()
+
+
+def _seeded():
+  return FakeEmbeddings(_seeded_vector, model_name="seeded")
+
+
+def _docs(n):
+  return [Document(page_content=f"chunk {i}", metadata={}) for i in range(n)]
+
+
+def test_hnsw_index_is_recorded_and_reported(tmp_path):
+  spec = {"type": "hnsw", "m": 16, "ef_search": 64, "ef_construction": 80}
+  emb = _seeded()
+  store = load_or_build_index(_docs(500), emb, tmp_path, splitter=SPLITTER, spec=spec)
+  index_info = load_manifest(tmp_path)["index"]
+  assert index_info["spec"] == spec
+  assert index_info["report"]["recall_at_k"] >= 0.9
+  assert store.similarity_search_by_vector(emb.embed_query("chunk 7"), k=1)[0].page_content == "chunk 7"
+
+  # HNSW cannot delete in place, so a removed chunk forces a rebuild.
+  emb = _seeded()
+  load_or_build_index(_docs(499), emb, tmp_path, splitter=SPLITTER, spec=spec)
+  assert len(emb.embedded) == 499
+
+
+def test_ivf_adds_in_place_and_restores_nprobe(tmp_path):
+  spec = {"type": "ivf", "nlist": 8, "nprobe": 4}
+  load_or_build_index(_docs(400), _seeded(), tmp_path, splitter=SPLITTER, spec=spec)
+  emb = _seeded()
+  store = load_or_build_index(_docs(410), emb, tmp_path, splitter=SPLITTER, spec=spec)
+  assert len(emb.embedded) == 10
+  assert store.index.nprobe == 4
@@ -0,0 +1,69 @@
+from src.services.faq_index import canonical_entries, load_or_build_faq
+
+PROJECTS = [
+  {
+    "title": "Computer Vision Pipeline for Rust Detection",
+    "summary": "YOLOv8 rust detector for industrial inspection.",
+    "category": "Computer Vision",
+    "technologies": ["Python", "YOLOv8"],
+    "impact": "Cut manual inspection time by 60%.",
+    "github_url": "https://github.com/you/rust-detector",
+  },
+  {
+    "title": "Time Series Forecasting with MLOps",
+    "summary": "Demand forecasting with automated retraining.",
+    "category": "MLOps",
+    "technologies": ["Python", "MLflow"],
+  },
+]
+
+
+class _WordEmbeddings:
+  """Bag-of-words over a tiny vocabulary; counts calls to check regeneration."""
+
+  model_name = "test-words"
+  vocab = ["stack", "technologies", "projects", "rust", "impact", "github", "forecasting", "weather"]
+
+  def __init__(self):
+    self.calls = 0
+
+  def _vec(self, text):
+    words = text.lower().replace("?", "").split()
+    return [float(words.count(w)) for w in self.vocab]
+
+  def embed_documents(self, texts):
+    self.calls += 1
+    return [self._vec(t) for t in texts]
+
+
+def test_canonical_entries_cover_stack_projects_and_per_project_facts():
+  entries = canonical_entries(PROJECTS)
+  answers = {e["questions"][0]: e["answer"] for e in entries}
+  assert "Computer Vision: Python, YOLOv8" in answers["What is your tech stack?"]
+  assert "MLOps: Python, MLflow" in answers["What is your tech stack?"]
+  assert "Time Series Forecasting with MLOps" in answers["What projects have you worked on?"]
+  assert "https://github.com/you/rust-detector" in answers["Where can I see your code?"]
+  assert "60%" in answers["What was the impact of Computer Vision Pipeline for Rust Detection?"]
+  assert "What was the impact of Time Series Forecasting with MLOps?" not in answers
+
+
+def test_lookup_by_phrasing_and_by_embedding(tmp_path):
+  embeddings = _WordEmbeddings()
+  faq = load_or_build_faq(PROJECTS, embeddings, tmp_path)
+  assert "YOLOv8" in faq.lookup_text("what is your TECH stack")
+  assert faq.lookup_text("What is your favourite colour?") is None
+  assert "Time Series" in faq.lookup(embeddings._vec("projects"))
+  assert faq.lookup(embeddings._vec("weather")) is None
+  assert faq.lookup([1.0, 0.0]) is None  # other embedding dimension
+  assert faq.hits == 2
+
+
+def test_index_is_reused_until_projects_change(tmp_path):
+  embeddings = _WordEmbeddings()
+  load_or_build_faq(PROJECTS, embeddings, tmp_path)
+  load_or_build_faq(PROJECTS, embeddings, tmp_path)
+  assert embeddings.calls == 1
+  changed = PROJECTS + [{"title": "Weather Chatbot", "technologies": ["LangChain"]}]
+  faq = load_or_build_faq(changed, embeddings, tmp_path)
+  assert embeddings.calls == 2
+  assert "Weather Chatbot" in faq.lookup_text("List your projects")
@@ -0,0 +1,56 @@
+import json
+import threading
+
+import httpx
+
+from src.services.rag_pipeline import _HFEmbeddingsViaAPI
+from src.utils import http_client
+
+
+def test_batches_run_concurrently_retry_429_and_keep_order(monkeypatch):
+  lock = threading.Lock()
+  state = {"calls": 0, "throttled": 0}
+
+  def handler(request):
+    inputs = json.loads(request.content)["inputs"]
+    inputs = inputs if isinstance(inputs, list) else [inputs]
+    with lock:
+      state["calls"] += 1
+      if state["calls"] == 2:
+        state["throttled"] += 1
+        return httpx.Response(429, headers={"Retry-After": "0"}, json={"error": "rate limited"})
+    return httpx.Response(200, json=[[float(t[1:]), 1.0] for t in inputs])
+
+  monkeypatch.setattr(http_client, "_sync_client", httpx.Client(transport=httpx.MockTransport(handler)))
+  monkeypatch.setenv("HF_EMBED_CONCURRENCY", "3")
+  monkeypatch.setenv("HF_EMBED_BATCH_SIZE", "4")
+  emb = _HFEmbeddingsViaAPI(token="hf_test")
+  texts = [f"t{i}" for i in range(50)]
+  vectors = emb.embed_documents(texts)
+  assert [v[0] for v in vectors] == [float(i) for i in range(50)]
+  assert state["throttled"] == 1
+  # Fewer round trips than fixed batches of 4 thanks to the adaptive batch size.
+  assert state["calls"] < 50 / 4
+
+
+def test_retry_after_is_capped_and_transport_errors_are_retried(monkeypatch):
+  from src.services import rag_pipeline
+
+  state = {"calls": 0}
+
+  def handler(request):
+    state["calls"] += 1
+    if state["calls"] == 1:
+      raise httpx.ConnectError("connection reset", request=request)
+    if state["calls"] == 2:
+      return httpx.Response(503, headers={"Retry-After": "3600"}, json={"error": "loading"})
+    return httpx.Response(200, json=[0.5, 1.0])
+
+  sleeps = []
+  monkeypatch.setattr(rag_pipeline.time, "sleep", sleeps.append)
+  monkeypatch.setattr(http_client, "_sync_client", httpx.Client(transport=httpx.MockTransport(handler)))
+  monkeypatch.setenv("HF_EMBED_MAX_BACKOFF", "2")
+  emb = _HFEmbeddingsViaAPI(token="hf_test")
+  assert emb.embed_query("hi") == [0.5, 1.0]
+  assert state["calls"] == 3
+  assert len(sleeps) == 2 and all(s <= 2.0 for s in sleeps)
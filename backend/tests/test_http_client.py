@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+import httpx
+
+from src.services.rag_pipeline import _GroqLLMFallback
+from src.utils import groq_debug, http_client
+
+
+def test_sync_client_is_shared():
+  assert http_client.get_sync_client() is http_client.get_sync_client()
+
+
+def test_groq_fallback_reuses_pooled_client(monkeypatch):
+  seen = []
+
+  def handler(request):
+    seen.append(json.loads(request.content)["messages"][0]["content"])
+    return httpx.Response(200, json={"choices": [{"message": {"content": " OK "}}]})
+
+  monkeypatch.setattr(http_client, "_sync_client", httpx.Client(transport=httpx.MockTransport(handler)))
+  llm = _GroqLLMFallback(api_key="gsk_test")
+  assert llm("one") == "OK"
+  assert llm("two") == "OK"
+  assert seen == ["one", "two"]
+
+
+def test_groq_debug_request_reports_unexpected_json(monkeypatch):
+  transport = httpx.MockTransport(lambda request: httpx.Response(200, json=["not", "a", "completion"]))
+  monkeypatch.setattr(http_client, "_sync_client", httpx.Client(transport=transport))
+  monkeypatch.setenv("GROQ_API_KEY", "gsk_test")
+  result = groq_debug.groq_test_request()
+  assert result["ok"] is False and result["error"] == "Unexpected response shape"
+
+
+def test_groq_fallback_streams_sse_deltas(monkeypatch):
+  chunks = [{"choices": [{"delta": {"content": t}}]} for t in ["Hel", "lo"]]
+  body = "".join(f"data: {json.dumps(c)}\n\n" for c in chunks) + "data: [DONE]\n\n"
+
+  def handler(request):
+    assert json.loads(request.content)["stream"] is True
+    return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+  async def run():
+    monkeypatch.setitem(
+      http_client._async_clients, asyncio.get_running_loop(), httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    return [t async for t in _GroqLLMFallback(api_key="gsk_test").astream("hi")]
+
+  assert asyncio.run(run()) == ["Hel", "lo"]
+
+
+def test_async_clients_are_kept_per_loop_and_all_closed(monkeypatch):
+  import threading
+
+  monkeypatch.setattr(http_client, "_async_clients", {})
+  other_loop = asyncio.new_event_loop()
+  thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+  thread.start()
+
+  async def on_other_loop():
+    return http_client.get_async_client()
+
+  try:
+    foreign = asyncio.run_coroutine_threadsafe(on_other_loop(), other_loop).result(timeout=5)
+
+    async def run():
+      own = http_client.get_async_client()
+      assert own is http_client.get_async_client() and own is not foreign
+      assert http_client._async_clients[other_loop] is foreign  # not replaced by this loop's client
+      await http_client.aclose_clients()
+      return own
+
+    own = asyncio.run(run())
+    assert own.is_closed and foreign.is_closed
+    assert http_client._async_clients == {}
+  finally:
+    other_loop.call_soon_threadsafe(other_loop.stop)
+    thread.join(timeout=5)
+    other_loop.close()
@@ -0,0 +1,6 @@
+from bench.import_profile import loaded_modules
+
+
+def test_heavy_dependencies_load_on_first_use():
+  # The wall-clock budget is machine-dependent: `python -m bench.import_profile --check`.
+  assert loaded_modules("src.main") == []
@@ -0,0 +1,52 @@
+from langchain.docstore.document import Document
+
+from conftest import FakeEmbeddings
+from src.services.index_manifest import load_manifest, load_or_build_index
+
+SPLITTER = {"chunk_size": 1000, "chunk_overlap": 200}
+
+
+def _docs(*texts):
+  return [Document(page_content=t, metadata={"title": t}) for t in texts]
+
+
+def test_only_new_or_changed_chunks_are_embedded(tmp_path):
+  emb = FakeEmbeddings()
+  load_or_build_index(_docs("a", "b", "c"), emb, tmp_path, splitter=SPLITTER)
+  assert sorted(emb.embedded) == ["a", "b", "c"]
+
+  emb = FakeEmbeddings()
+  store = load_or_build_index(_docs("a", "b", "c2"), emb, tmp_path, splitter=SPLITTER)
+  assert emb.embedded == ["c2"]
+  assert sorted(d.page_content for d in store.docstore._dict.values()) == ["a", "b", "c2"]
+  assert len(load_manifest(tmp_path)["chunks"]) == 3
+
+  emb = FakeEmbeddings()
+  load_or_build_index(_docs("a", "b", "c2"), emb, tmp_path, splitter=SPLITTER)
+  assert emb.embedded == []
+
+
+def test_model_change_rebuilds(tmp_path):
+  load_or_build_index(_docs("a", "b"), FakeEmbeddings(), tmp_path, splitter=SPLITTER)
+  emb = FakeEmbeddings(model_name="other-model")
+  load_or_build_index(_docs("a", "b"), emb, tmp_path, splitter=SPLITTER)
+  assert sorted(emb.embedded) == ["a", "b"]
+  assert load_manifest(tmp_path)["embedding_model"] == "other-model"
+
+
+def test_concurrent_builders_build_once_and_swap_in_whole(tmp_path):
+  import threading
+
+  index_dir = tmp_path / "index"
+  embeddings = [FakeEmbeddings() for _ in range(4)]
+  threads = [
+    threading.Thread(target=load_or_build_index, args=(_docs("a", "b"), emb, index_dir), kwargs={"splitter": SPLITTER})
+    for emb in embeddings
+  ]
+  for t in threads:
+    t.start()
+  for t in threads:
+    t.join()
+  assert sum(len(e.embedded) for e in embeddings) == 2
+  assert load_manifest(index_dir)["chunks"]
+  assert sorted(p.name for p in tmp_path.iterdir()) == ["index", "index.lock"]
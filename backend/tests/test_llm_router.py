@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+from langchain.schema.messages import AIMessage, AIMessageChunk
+
+from src.services.llm_router import Backend, CircuitOpenError, LLMRouter
+
+
+class _FakeLLM:
+  def __init__(self, reply, delay=0.0, fail=False):
+    self.reply = reply
+    self.delay = delay
+    self.fail = fail
+    self.calls = 0
+
+  def predict_messages(self, messages):
+    self.calls += 1
+    if self.fail:
+      raise RuntimeError("Groq API error 503: overloaded")
+    return AIMessage(content=self.reply)
+
+  async def apredict_messages(self, messages):
+    self.calls += 1
+    await asyncio.sleep(self.delay)
+    if self.fail:
+      raise RuntimeError("Groq API error 429: rate limited")
+    return AIMessage(content=self.reply)
+
+  async def astream(self, messages):
+    self.calls += 1
+    if self.fail:
+      raise RuntimeError("Groq API error 500")
+    for token in self.reply.split():
+      yield AIMessageChunk(content=token)
+
+
+def test_falls_back_and_opens_circuit():
+  big, small = _FakeLLM("big", fail=True), _FakeLLM("small")
+  router = LLMRouter([Backend("big", big, failure_threshold=2, cooldown=60), Backend("small", small)])
+  assert [router.predict_messages([]).content for _ in range(3)] == ["small"] * 3
+  # The circuit opened after two failures, so the third call skipped the failing backend.
+  assert big.calls == 2
+  assert router.stats()["backends"][0]["circuit"] == "open"
+
+
+def test_raises_when_every_backend_fails():
+  router = LLMRouter([Backend("a", _FakeLLM("a", fail=True)), Backend("b", _FakeLLM("b", fail=True))])
+  with pytest.raises(RuntimeError):
+    router.predict_messages([])
+
+
+def test_hedged_request_returns_faster_backend():
+  slow, fast = _FakeLLM("slow", delay=1.0), _FakeLLM("fast", delay=0.01)
+  router = LLMRouter([Backend("slow", slow), Backend("fast", fast)], hedge=True, hedge_min_ms=50)
+  reply = asyncio.run(router.apredict_messages([]))
+  assert reply.content == "fast"
+  assert router.stats()["hedges"] == 1 and router.stats()["hedge_wins"] == 1
+
+
+def test_hedged_away_primary_counts_at_least_the_hedge_delay():
+  slow, fast = _FakeLLM("slow", delay=1.0), _FakeLLM("fast", delay=0.01)
+  primary = Backend("slow", slow)
+  router = LLMRouter([primary, Backend("fast", fast)], hedge=True, hedge_min_ms=50)
+  assert asyncio.run(router.apredict_messages([])).content == "fast"
+  # The abandoned call never answered, but its backend is not left looking unmeasured (fast).
+  assert primary.ewma_ms >= 50 and primary.p95_ms() >= 50
+  assert primary.calls == 0 and primary.errors == 0
+
+
+def test_half_open_circuit_lets_one_test_call_through():
+  flaky = _FakeLLM("flaky", delay=0.05, fail=True)
+  backend = Backend("flaky", flaky, failure_threshold=1, cooldown=0)
+  router = LLMRouter([backend])
+  with pytest.raises(RuntimeError):
+    router.predict_messages([])
+  assert backend.stats()["circuit"] == "half-open"
+  flaky.fail = False
+
+  async def run():
+    return await asyncio.gather(*(router.apredict_messages([]) for _ in range(3)), return_exceptions=True)
+
+  results = asyncio.run(run())
+  # One call probed the backend; the others were turned away instead of piling onto it.
+  assert flaky.calls == 2
+  assert [r.content for r in results if not isinstance(r, Exception)] == ["flaky"]
+  assert sum(isinstance(r, CircuitOpenError) for r in results) == 2
+  assert backend.stats()["circuit"] == "closed"
+  assert router.predict_messages([]).content == "flaky"
+
+
+def test_cooling_circuits_fail_fast_without_a_call():
+  down = _FakeLLM("down", fail=True)
+  router = LLMRouter([Backend("down", down, failure_threshold=1, cooldown=60)])
+  with pytest.raises(RuntimeError):
+    router.predict_messages([])
+  for _ in range(3):
+    with pytest.raises(CircuitOpenError):
+      router.predict_messages([])
+  assert down.calls == 1
+
+
+def test_calls_admitted_before_the_circuit_opened_do_not_end_the_probe():
+  backend = Backend("flaky", _FakeLLM("flaky"), failure_threshold=1, cooldown=0)
+  earlier = backend.acquire()  # admitted while closed
+  assert earlier is False
+  backend.record_failure(RuntimeError("503"), backend.acquire())
+  assert backend.acquire() is True  # the test call
+  backend.record_failure(RuntimeError("timeout"), earlier)
+  assert backend.acquire() is None  # still one probe in flight
+  backend.release(True)
+  assert backend.acquire() is True
+
+
+def test_stream_fails_over_before_first_token():
+  router = LLMRouter([Backend("a", _FakeLLM("a", fail=True)), Backend("b", _FakeLLM("hello world"))])
+
+  async def run():
+    return [c.content async for c in router.astream([])]
+
+  assert asyncio.run(run()) == ["hello", "world"]
+
+
+def test_stream_closes_a_failed_backend_stream():
+  closed = []
+
+  class _BrokenStream:
+    def __init__(self, name):
+      self.name = name
+
+    def __aiter__(self):
+      return self
+
+    async def __anext__(self):
+      raise RuntimeError("Groq API error 500")
+
+    async def aclose(self):
+      closed.append(self.name)
+
+  class _BrokenLLM(_FakeLLM):
+    def astream(self, messages):
+      return _BrokenStream(self.reply)
+
+  router = LLMRouter([Backend("a", _BrokenLLM("a")), Backend("b", _FakeLLM("ok"))])
+
+  async def run():
+    return [c.content async for c in router.astream([])]
+
+  assert asyncio.run(run()) == ["ok"]
+  assert closed == ["a"]
+
+
+def test_prefer_shares_backends():
+  big, small = Backend("groq:big", _FakeLLM("big")), Backend("groq:small", _FakeLLM("small"))
+  router = LLMRouter([big, small])
+  fast = router.prefer("groq:small")
+  assert fast.predict_messages([]).content == "small"
+  assert fast.backends[1] is big and router.prefer("missing") is router
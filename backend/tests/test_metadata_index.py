@@ -0,0 +1,58 @@
+import numpy as np
+from langchain.docstore.document import Document
+
+from conftest import FakeEmbeddings, length_vector
+from src.services.faiss_index import build_faiss_index, search_subset
+from src.services.index_manifest import load_or_build_index
+from src.services.metadata_index import MetadataIndex, filtered_search
+
+SPLITTER = {"chunk_size": 1000, "chunk_overlap": 200}
+
+
+def _project(title, category, technologies):
+  return Document(
+    page_content=f"Project: {title}.",
+    metadata={"title": title, "category": category, "type": "AI Project", "technologies": technologies},
+  )
+
+
+def _store(tmp_path):
+  docs = [
+    _project("Rust detector", "Computer Vision", ["PyTorch", "YOLOv8"]),
+    _project("Forecasting", "MLOps", ["Prophet", "MLflow"]),
+    _project("Portfolio site", "Full-Stack", ["React", "FastAPI"]),
+    _project("Doc chatbot", "Generative AI", ["LangChain", "FastAPI"]),
+  ]
+  return load_or_build_index(docs, FakeEmbeddings(length_vector), tmp_path, splitter=SPLITTER)
+
+
+def test_infers_filters_from_question(tmp_path):
+  meta = MetadataIndex.from_vector_store(_store(tmp_path))
+  assert meta.infer_filters("Show me your computer vision projects") == {"category": ["Computer Vision"]}
+  assert meta.infer_filters("Any fullstack work with FastAPI?") == {
+    "category": ["Full-Stack"],
+    "technologies": ["FastAPI"],
+  }
+  assert meta.infer_filters("Tell me about yourself") == {}
+  # Matching every chunk narrows nothing.
+  assert meta.match(meta.infer_filters("Which AI projects?")) is None
+
+
+def test_filtered_search_only_returns_matching_chunks(tmp_path):
+  store = _store(tmp_path)
+  meta = MetadataIndex.from_vector_store(store)
+  positions = meta.match(meta.infer_filters("projects built with FastAPI"))
+  assert len(positions) == 2
+  titles = {d.metadata["title"] for d in filtered_search(store, [0.0, 1.0], 3, positions)}
+  assert titles == {"Portfolio site", "Doc chatbot"}
+
+
+def test_search_subset_on_approximate_indexes():
+  rng = np.random.default_rng(0)
+  vectors = rng.normal(size=(2000, 16)).astype(np.float32)
+  subset = np.array([5, 500, 1500])
+  for spec in ({"type": "ivf", "nprobe": 1}, {"type": "hnsw", "ef_search": 16}):
+    index = build_faiss_index(vectors, spec)
+    index.add(vectors)
+    _, found = search_subset(index, vectors[0], 3, subset)
+    assert sorted(found.tolist()) == subset.tolist()
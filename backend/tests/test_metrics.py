@@ -0,0 +1,87 @@
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from langchain.schema.messages import AIMessage
+
+from src.main import app
+from src.services import rag_pipeline
+from src.services.llm_router import Backend, LLMRouter
+from src.utils import metrics
+
+
+class _Doc:
+  def __init__(self, text):
+    self.page_content = text
+
+
+class _FakeRetriever:
+  async def aget_relevant_documents(self, query):
+    return [_Doc("Project: Rust Detector. Technologies: YOLOv8.")]
+
+
+class _LLM:
+  async def apredict_messages(self, messages):
+    return AIMessage(content="The rust detector uses YOLOv8.")
+
+
+class _Failing:
+  def __init__(self, error):
+    self.error = error
+
+  def predict_messages(self, messages):
+    raise self.error
+
+
+def test_chat_reports_stage_timings_and_metrics(monkeypatch):
+  monkeypatch.setattr(rag_pipeline, "_rag_initialized", True)
+  monkeypatch.setattr(rag_pipeline, "_rag_runtime", {"retriever": _FakeRetriever(), "llm": _LLM()})
+  llm_calls = metrics.sample("rag_stage_seconds_count", stage="llm")
+  prompt_tokens = metrics.sample("rag_llm_tokens_total", kind="prompt")
+  client = TestClient(app)
+
+  r = client.post("/chat", json={"message": "Which model does the rust detector use?"})
+  assert r.status_code == 200
+  stages = [part.split(";")[0] for part in r.headers["Server-Timing"].split(", ")]
+  assert stages == ["embed", "search", "prompt", "llm", "total"]
+  assert metrics.sample("rag_stage_seconds_count", stage="llm") == llm_calls + 1
+  assert metrics.sample("rag_llm_tokens_total", kind="prompt") > prompt_tokens
+
+  body = client.get("/metrics").text
+  assert 'rag_answers_total{source="llm"}' in body
+  assert 'http_request_duration_seconds_count{method="POST",path="/chat",status="200"}' in body
+  assert "session_store_sessions" in body
+
+
+def test_provider_errors_are_counted_by_status():
+  request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+  rate_limited = httpx.HTTPStatusError("429", request=request, response=httpx.Response(429, request=request))
+  assert metrics.error_status(rate_limited) == "429"
+  assert metrics.error_status(RuntimeError("Groq API error 503: overloaded")) == "503"
+  assert metrics.error_status(httpx.ReadTimeout("slow")) == "timeout"
+
+  before = metrics.sample("provider_errors_total", provider="groq:test", status="429")
+  router = LLMRouter([Backend("groq:test", _Failing(rate_limited)), Backend("groq:ok", _Failing(ValueError("boom")))])
+  with pytest.raises(ValueError):
+    router.predict_messages([])
+  assert metrics.sample("provider_errors_total", provider="groq:test", status="429") == before + 1
+  assert metrics.sample("provider_errors_total", provider="groq:ok", status="error") >= 1
+
+
+_WORKER = """
+import sys
+from src.utils import metrics
+metrics.ANSWERS.labels(source="llm").inc(int(sys.argv[1]))
+"""
+
+
+def test_metrics_add_up_across_worker_processes(tmp_path):
+  import os
+  import subprocess
+  import sys
+
+  env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+  for n in (2, 3):
+    subprocess.run([sys.executable, "-c", _WORKER, str(n)], env=env, check=True)
+  script = "from src.utils import metrics; print(metrics.sample('rag_answers_total', source='llm'))"
+  out = subprocess.run([sys.executable, "-c", script], env=env, check=True, capture_output=True, text=True)
+  assert float(out.stdout) == 5.0
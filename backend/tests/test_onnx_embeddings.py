@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.services import onnx_embeddings
+from src.services.onnx_embeddings import ONNX_MAX_COSINE_DISTANCE, max_cosine_distance, mean_pool
+
+
+def test_mean_pool_ignores_padding_and_normalizes():
+  hidden = np.array([[[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]]], dtype=np.float32)
+  mask = np.array([[1, 1, 0]])
+  pooled = mean_pool(hidden, mask)
+  assert np.allclose(pooled, [[1.0, 0.0]])
+  assert np.allclose(np.linalg.norm(mean_pool(np.random.rand(4, 5, 8), np.ones((4, 5))), axis=1), 1.0)
+
+
+def test_onnx_backend_selected_by_env(monkeypatch):
+  from src.services import rag_pipeline
+
+  class Fake:
+    model_name = onnx_embeddings.ONNX_MODEL_NAME
+
+  monkeypatch.setattr(onnx_embeddings, "OnnxEmbeddings", Fake)
+  monkeypatch.setenv("EMBEDDINGS_BACKEND", "onnx")
+  assert isinstance(rag_pipeline._get_free_embeddings("hf_unused"), Fake)
+
+
+def test_onnx_vectors_never_share_an_index_or_cache_with_the_pytorch_model(tmp_path):
+  from src.services.embedding_cache import EmbeddingCache
+  from src.services.index_manifest import embedding_model_name
+
+  onnx = object.__new__(onnx_embeddings.OnnxEmbeddings)  # no onnxruntime needed for the name
+  assert embedding_model_name(onnx) == onnx_embeddings.ONNX_MODEL_NAME != onnx_embeddings.MODEL_NAME
+  assert EmbeddingCache(tmp_path, embedding_model_name(onnx)).prefix != EmbeddingCache(tmp_path, onnx_embeddings.MODEL_NAME).prefix
+
+
+TEXTS = [
+  "Portfolio chatbot built with FastAPI, LangChain and FAISS retrieval.",
+  "A React dashboard that visualizes sensor data in real time.",
+  "What is your tech stack?",
+  "Which projects use machine learning?",
+  "hi",
+]
+
+
+def test_onnx_vectors_match_the_pytorch_model():
+  pytest.importorskip("onnxruntime")
+  pytest.importorskip("tokenizers")
+  pytest.importorskip("sentence_transformers")
+  model_dir = os.getenv("ONNX_EMBED_DIR") or onnx_embeddings.DEFAULT_DIR
+  if not os.path.exists(os.path.join(model_dir, "model.onnx")):
+    pytest.skip("no exported ONNX model (python -m src.services.onnx_embeddings)")
+  from langchain.embeddings import HuggingFaceEmbeddings
+
+  reference = HuggingFaceEmbeddings(model_name=onnx_embeddings.MODEL_NAME)
+  candidate = onnx_embeddings.OnnxEmbeddings(model_dir)
+  assert max_cosine_distance(reference, candidate, TEXTS) <= ONNX_MAX_COSINE_DISTANCE
+
+  # Same nearest neighbours for a query against the same documents.
+  ref_docs = np.array(reference.embed_documents(TEXTS[:2] + TEXTS[3:]))
+  onnx_docs = np.array(candidate.embed_documents(TEXTS[:2] + TEXTS[3:]))
+  for query in ("stack", "machine learning projects"):
+    ref_rank = np.argsort(-ref_docs @ np.array(reference.embed_query(query)))[:2]
+    onnx_rank = np.argsort(-onnx_docs @ np.array(candidate.embed_query(query)))[:2]
+    assert list(ref_rank) == list(onnx_rank)
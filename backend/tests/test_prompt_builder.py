@@ -0,0 +1,40 @@
+from langchain.docstore.document import Document
+
+from src.services.prompt_builder import PromptBuilder, count_tokens, get_prompt_builder
+
+
+def _docs(*texts):
+  return [Document(page_content=t) for t in texts]
+
+
+def test_system_message_is_stable_across_requests():
+  builder = get_prompt_builder("You are Keltoum.", "PROFILE\n- Name: Keltoum")
+  assert get_prompt_builder("You are Keltoum.", "PROFILE\n- Name: Keltoum") is builder
+  first = builder.build("What is YOLOv8 used for?", _docs("Rust detector"))
+  second = builder.build("Tell me about MLflow", _docs("Forecasting"), [("hi", "hello")])
+  assert first[0].type == "system" and first[0].content == second[0].content
+  assert "PORTFOLIO SUMMARY" in first[0].content
+  assert "Tell me about MLflow" in second[1].content and "MLflow" not in second[0].content
+
+
+def test_oldest_turns_are_dropped_to_fit_budget():
+  builder = PromptBuilder("system", "", budget=400)
+  history = [(f"question {i}", "x" * 400) for i in range(10)]
+  messages = builder.build("latest?", _docs("chunk one", "chunk two"), history)
+  user = messages[1].content
+  assert count_tokens(messages[0].content) + count_tokens(user) <= 400
+  assert "chunk one" in user and "chunk two" in user
+  assert "User: question 9" in user and "User: question 0" not in user
+  assert "Earlier the user asked about: question 0;" in user
+
+
+def test_top_chunk_is_kept_even_when_over_budget():
+  builder = PromptBuilder("system", "", budget=50)
+  user = builder.build("q", _docs("a" * 400, "b" * 40))[1].content
+  assert "a" * 400 in user and "b" * 40 not in user
+
+
+def test_context_budget_caps_retrieved_chunks():
+  builder = PromptBuilder("system", "", budget=3000, context_budget=60)
+  user = builder.build("q", _docs("a" * 200, "b" * 200, "c" * 40))[1].content
+  assert "a" * 200 in user and "b" * 200 not in user and "c" * 40 not in user
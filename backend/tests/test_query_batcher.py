@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+from langchain.embeddings.base import Embeddings
+
+from src.services.query_batcher import QueryEmbeddingBatcher
+
+
+class _RecordingEmbeddings(Embeddings):
+  def __init__(self):
+    self.calls = []
+    self.lock = threading.Lock()
+
+  def embed_documents(self, texts):
+    with self.lock:
+      self.calls.append(list(texts))
+    return [[float(len(t))] for t in texts]
+
+  def embed_query(self, text):
+    return [float(len(text))]
+
+  def embed_queries(self, texts):
+    with self.lock:
+      self.calls.append(list(texts))
+    return [self.embed_query(t) for t in texts]
+
+
+def test_concurrent_queries_share_one_batched_call():
+  emb = _RecordingEmbeddings()
+
+  async def run():
+    batcher = QueryEmbeddingBatcher(emb, window_ms=20, max_batch=32)
+    texts = ["a", "bb", "ccc", "bb"]
+    return await asyncio.gather(*(batcher.embed(t) for t in texts))
+
+  assert asyncio.run(run()) == [[1.0], [2.0], [3.0], [2.0]]
+  assert emb.calls == [["a", "bb", "ccc"]]
+
+
+def test_full_batch_flushes_before_window():
+  emb = _RecordingEmbeddings()
+
+  async def run():
+    batcher = QueryEmbeddingBatcher(emb, window_ms=10_000, max_batch=2)
+    return await asyncio.wait_for(asyncio.gather(batcher.embed("x"), batcher.embed("yy")), timeout=1)
+
+  assert asyncio.run(run()) == [[1.0], [2.0]]
+  assert emb.calls == [["x", "yy"]]
+
+
+class _AsymmetricEmbeddings(Embeddings):
+  """Queries and documents embed differently (instruction-prefixed models)."""
+
+  def embed_documents(self, texts):
+    return [[0.0] for _ in texts]
+
+  def embed_query(self, text):
+    return [1.0]
+
+
+def test_batched_queries_use_the_query_path_and_query_cache_keys(tmp_path):
+  from src.services.embedding_cache import CachedEmbeddings, EmbeddingCache, text_key
+
+  async def run(emb):
+    batcher = QueryEmbeddingBatcher(emb, window_ms=20, max_batch=32)
+    return await asyncio.gather(batcher.embed("a"), batcher.embed("b"))
+
+  assert asyncio.run(run(_AsymmetricEmbeddings())) == [[1.0], [1.0]]
+  cached = CachedEmbeddings(_AsymmetricEmbeddings(), EmbeddingCache(tmp_path, "m"), EmbeddingCache(tmp_path, "m", kind="query"))
+  assert asyncio.run(run(cached)) == [[1.0], [1.0]]
+  assert cached.query_cache.get_many([text_key("a", "query")]) == [[1.0]]
+  assert cached.cache.stats()["size"] == 0
@@ -0,0 +1,112 @@
+import asyncio
+
+from langchain.schema.messages import AIMessage
+
+from src.services import rag_pipeline
+from src.services.query_router import EXEMPLARS, QueryRouter
+
+PROJECTS = [
+  {"title": "Computer Vision Pipeline for Rust Detection", "github_url": "https://github.com/you/rust-detector"},
+  {"title": "Time Series Forecasting with MLOps", "github_url": "https://github.com/you/forecasting"},
+]
+
+
+class _KeywordEmbeddings:
+  """One axis per exemplar label, so similarity is exact for the exemplars themselves."""
+
+  labels = list(EXEMPLARS)
+
+  def _vec(self, text):
+    for i, label in enumerate(self.labels):
+      if text in EXEMPLARS[label]:
+        return [1.0 if j == i else 0.0 for j in range(len(self.labels))]
+    return [0.2] * len(self.labels)
+
+  def embed_documents(self, texts):
+    return [self._vec(t) for t in texts]
+
+
+def test_heuristics_and_templates():
+  router = QueryRouter(PROJECTS)
+  assert router.decided("Hi!").name == "greeting"
+  assert "Rust Detection" in router.decided("hello there").answer
+  assert router.decided("thanks a lot").name == "thanks"
+  assert router.decided("ok great, thanks!").name == "thanks"
+  for question in ("?", "...", "🙂", "ok cool", "ok what about YOLO"):
+    assert router.decided(question) is None, question
+  links = router.decided("What's the GitHub for the forecasting project?")
+  assert links.answer.endswith("Time Series Forecasting with MLOps: https://github.com/you/forecasting")
+  assert router.decided("Why did you pick YOLOv8 for rust detection?").name == "complex"
+  assert router.decided("What is your tech stack?") is None
+  assert router.classify("What is your tech stack?").tier == "fast"
+
+
+def test_exemplar_similarity_breaks_ties():
+  emb = _KeywordEmbeddings()
+  router = QueryRouter(PROJECTS, emb)
+  vector = emb.embed_documents(["list your projects"])[0]
+  assert router.classify("list your projects", vector).name == "simple"
+  assert router.with_projects([])._exemplars is router._exemplars
+
+
+class _FailingRetriever:
+  async def aget_relevant_documents(self, query):
+    raise AssertionError("templated answers must skip retrieval")
+
+
+class _NamedLLM:
+  def __init__(self, name):
+    self.name = name
+
+  async def apredict_messages(self, messages):
+    return AIMessage(content=self.name)
+
+
+def test_pipeline_routes_templates_and_simple_questions(monkeypatch):
+  monkeypatch.setattr(rag_pipeline, "_rag_initialized", True)
+  runtime = {
+    "retriever": _FailingRetriever(),
+    "llm": _NamedLLM("primary"),
+    "fast_llm": _NamedLLM("fast"),
+    "query_router": QueryRouter(PROJECTS),
+  }
+  monkeypatch.setattr(rag_pipeline, "_rag_runtime", runtime)
+  assert asyncio.run(rag_pipeline.aquery_portfolio("hey")).startswith("Hi!")
+
+  class _Retriever:
+    async def aget_relevant_documents(self, query):
+      return []
+
+  runtime["retriever"] = _Retriever()
+  assert asyncio.run(rag_pipeline.aquery_portfolio("What is your tech stack?")) == "fast"
+  assert asyncio.run(rag_pipeline.aquery_portfolio("How did you design the forecasting pipeline?")) == "primary"
+
+
+REAL_PROJECTS = PROJECTS + [
+  {"title": "Collaborative E-Vote Web Application", "github_url": ""},
+  {"title": "Full-Stack E-Commerce Platform", "github_url": ""},
+]
+
+
+def test_links_template_only_for_pure_link_requests():
+  router = QueryRouter(REAL_PROJECTS)
+  # Names a project without a repo: say so instead of listing the others.
+  answer = router.decided("Can I see the code for the e-commerce project?").answer
+  assert "E-Commerce" in answer and "github.com" not in answer
+  assert "rust-detector" in router.decided("Where is the code for the rust detector?").answer
+  assert router.decided("Can you share your GitHub?").answer.count("github.com") == 2
+  # Anything beyond "where is the code" goes to the model.
+  for question in (
+    "Does the rust detector source code use OpenCV?",
+    "Is the e-vote app open source?",
+    "What is the URL of your portfolio site?",
+  ):
+    route = router.classify(question)
+    assert route.answer is None and route.name in ("simple", "complex"), question
+
+
+def test_links_exemplar_match_does_not_bypass_the_model():
+  emb = _KeywordEmbeddings()
+  router = QueryRouter(REAL_PROJECTS, emb)
+  vector = emb.embed_documents(["where can I see the code?"])[0]
+  assert router.classify("Is the e-vote app open source?", vector).answer is None
@@ -0,0 +1,75 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.services import rag_pipeline
+
+
+def test_ready_is_503_until_warmed_up(monkeypatch):
+  monkeypatch.setattr(rag_pipeline, "_rag_runtime", None)
+  monkeypatch.setattr(rag_pipeline, "_rag_warmed_up", False)
+  client = TestClient(app)
+  assert client.get("/health").status_code == 200
+  res = client.get("/ready")
+  assert res.status_code == 503
+  assert res.json()["components"]["embeddings"] is False
+
+  runtime = {"embeddings": object(), "vector_store": object(), "llm": object()}
+  monkeypatch.setattr(rag_pipeline, "_rag_runtime", runtime)
+  monkeypatch.setattr(rag_pipeline, "_rag_warmed_up", True)
+  assert client.get("/ready").status_code == 200
+
+
+def test_concurrent_first_requests_share_one_init(monkeypatch):
+  calls = []
+  runtime = {"llm": object()}
+
+  def slow_create():
+    calls.append(1)
+    time.sleep(0.05)
+    return runtime
+
+  monkeypatch.setattr(rag_pipeline, "create_rag_system", slow_create)
+  monkeypatch.setattr(rag_pipeline, "_rag_initialized", False)
+  monkeypatch.setattr(rag_pipeline, "_rag_runtime", None)
+  seen = []
+
+  def first_request():
+    rag_pipeline._init_rag_once()
+    seen.append(rag_pipeline._rag_runtime)
+
+  threads = [threading.Thread(target=first_request) for _ in range(5)]
+  for t in threads:
+    t.start()
+  for t in threads:
+    t.join()
+  assert calls == [1]
+  assert seen == [runtime] * 5
+
+
+def test_ready_without_startup_warmup_once_initialized(monkeypatch):
+  monkeypatch.setenv("RAG_WARMUP", "0")
+  monkeypatch.setattr(rag_pipeline, "_rag_warmed_up", False)
+  runtime = {"embeddings": object(), "vector_store": object(), "llm": object()}
+  monkeypatch.setattr(rag_pipeline, "_rag_runtime", runtime)
+  assert TestClient(app).get("/ready").status_code == 200
+
+
+def test_failed_warmup_query_is_retried(monkeypatch):
+  attempts = []
+
+  def flaky_retrieve(runtime, question):
+    attempts.append(1)
+    if len(attempts) < 3:
+      raise RuntimeError("503 model loading")
+    return rag_pipeline._mark_warm([])
+
+  monkeypatch.setattr(rag_pipeline, "_rag_initialized", True)
+  monkeypatch.setattr(rag_pipeline, "_rag_runtime", {"llm": object()})
+  monkeypatch.setattr(rag_pipeline, "_rag_warmed_up", False)
+  monkeypatch.setattr(rag_pipeline, "_retrieve", flaky_retrieve)
+  monkeypatch.setenv("RAG_WARMUP_RETRY_DELAY", "0")
+  rag_pipeline.warmup()
+  assert len(attempts) == 3 and rag_pipeline._rag_warmed_up
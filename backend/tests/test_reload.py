@@ -0,0 +1,95 @@
+from fastapi.testclient import TestClient
+from langchain.docstore.document import Document
+
+from conftest import FakeEmbeddings, length_vector
+from src.main import app
+from src.services import corpus_watcher
+from src.services import rag_pipeline
+
+SPLITTER = {"chunk_size": 1000, "chunk_overlap": 200}
+
+
+def _corpus(*texts):
+  return lambda: ([Document(page_content=t, metadata={"title": t}) for t in texts], SPLITTER)
+
+
+def test_reload_swaps_index_and_keeps_old_snapshot(monkeypatch, tmp_path):
+  emb = FakeEmbeddings(length_vector)
+  monkeypatch.setattr(rag_pipeline, "_split_documents", _corpus("YOLOv8 rust detector"))
+  monkeypatch.setattr(rag_pipeline, "_rag_initialized", True)
+  monkeypatch.setattr(rag_pipeline, "_rag_runtime", {"llm": object(), "embeddings": emb, "k": 3, "index_dir": tmp_path})
+  assert rag_pipeline.reload_rag_runtime()
+  before = rag_pipeline._rag_runtime
+
+  monkeypatch.setattr(rag_pipeline, "_split_documents", _corpus("YOLOv8 rust detector", "Prophet forecasting"))
+  emb.embedded.clear()
+  assert rag_pipeline.reload_rag_runtime()
+  after = rag_pipeline._rag_runtime
+
+  assert emb.embedded == ["Prophet forecasting"]
+  assert after is not before
+  assert len(before["vector_store"].docstore._dict) == 1
+  assert len(after["vector_store"].docstore._dict) == 2
+
+
+def test_admin_reload_requires_token(monkeypatch, tmp_path):
+  calls = []
+  monkeypatch.setenv("RELOAD_GENERATION_FILE", str(tmp_path / "reload.generation"))
+  monkeypatch.setattr(corpus_watcher, "reload_portfolio", lambda: calls.append(1))
+  client = TestClient(app)
+  monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+  assert client.post("/admin/reload").status_code == 404
+  monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+  assert client.post("/admin/reload", headers={"X-Admin-Token": "nope"}).status_code == 401
+  res = client.post("/admin/reload", headers={"X-Admin-Token": "s3cret"})
+  assert res.status_code == 202
+  assert calls == [1]
+
+
+def test_published_reload_reaches_every_worker_once(monkeypatch, tmp_path):
+  import asyncio
+
+  monkeypatch.setenv("RELOAD_GENERATION_FILE", str(tmp_path / "reload.generation"))
+  monkeypatch.delenv("CORPUS_WATCH", raising=False)
+  reloads = []
+  monkeypatch.setattr(corpus_watcher, "reload_portfolio", lambda: reloads.append(1) or {"seconds": 0})
+  monkeypatch.setattr(corpus_watcher, "_applied", None)
+
+  async def other_worker():
+    watcher = asyncio.create_task(corpus_watcher.watch_corpus(tmp_path / "projects.json", interval=0.01))
+    await asyncio.sleep(0.03)
+    corpus_watcher.publish_reload("gen-1")  # e.g. POST /admin/reload on another worker
+    await asyncio.sleep(0.05)
+    watcher.cancel()
+
+  asyncio.run(other_worker())
+  assert reloads == [1]
+  assert corpus_watcher._applied == "gen-1"
+
+
+def test_admin_reload_and_poller_apply_a_token_once(monkeypatch, tmp_path):
+  import asyncio
+
+  monkeypatch.setenv("RELOAD_GENERATION_FILE", str(tmp_path / "reload.generation"))
+  reloads = []
+  monkeypatch.setattr(corpus_watcher, "reload_portfolio", lambda: reloads.append(1) or {"seconds": 0})
+  monkeypatch.setattr(corpus_watcher, "_applied", "gen-0")
+
+  async def poller_first():
+    token = corpus_watcher.publish_reload()  # POST /admin/reload, before its background task runs
+    watcher = asyncio.create_task(corpus_watcher.watch_corpus(tmp_path / "projects.json", interval=0.01))
+    await asyncio.sleep(0.05)
+    watcher.cancel()
+    return token
+
+  token = asyncio.run(poller_first())
+  assert corpus_watcher.apply_reload(token) is None
+  assert reloads == [1]
+
+
+def test_poller_only_runs_when_reloads_can_come_from_elsewhere(monkeypatch):
+  for name in ("CORPUS_WATCH", "WEB_CONCURRENCY", "RELOAD_GENERATION_FILE"):
+    monkeypatch.delenv(name, raising=False)
+  assert not corpus_watcher.polling_needed()
+  monkeypatch.setenv("WEB_CONCURRENCY", "4")
+  assert corpus_watcher.polling_needed()
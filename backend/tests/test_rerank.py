@@ -0,0 +1,86 @@
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from langchain.docstore.document import Document
+
+from conftest import FakeEmbeddings
+from src.services.faiss_index import build_faiss_index
+from src.services.index_manifest import load_or_build_index
+from src.services.rerank import Reranker, drop_overlaps, mmr
+
+SPLITTER = {"chunk_size": 1000, "chunk_overlap": 200}
+BASE = "the rust detector finds corrosion on steel beams using a yolov8 model trained on drone images"
+
+
+def _doc(cid, text):
+  return Document(page_content=text, metadata={"chunk_id": cid})
+
+
+def test_overlapping_chunks_are_dropped():
+  docs = [
+    _doc("a", BASE + " and flags them for the maintenance team"),
+    _doc("b", "drone images and flags them for the maintenance team"),  # splitter overlap
+    _doc("c", "forecasting sales with prophet and tracking runs in mlflow"),
+    _doc("d", BASE),
+  ]
+  assert [d.metadata["chunk_id"] for d in drop_overlaps(docs, 0.5)] == ["a", "c"]
+
+
+def test_mmr_prefers_diverse_results_until_the_deadline():
+  query = np.array([1.0, 0.0, 0.0])
+  vectors = np.array([[1.0, 0.1, 0.0], [1.0, 0.12, 0.0], [0.7, 0.0, 0.7]])
+  assert mmr(query, vectors, 2, 0.5, time.perf_counter() + 1) == [0, 2]
+  assert mmr(query, vectors, 2, 1.0, time.perf_counter() + 1) == [0, 1]
+  assert mmr(query, vectors, 2, 0.5, time.perf_counter() - 1) == [0, 1]
+
+
+def _keyword_vector(text):
+  v = np.array([text.lower().count(w) for w in ("rust", "forecast", "chatbot")], dtype=np.float32) + 0.01
+  return (v / np.linalg.norm(v)).tolist()
+
+
+def test_reranker_reads_vectors_back_from_the_index(tmp_path):
+  docs = [
+    _doc("r1", "Rust detector: rust rust spotting."),
+    _doc("r2", "Rust detector: rust rust spotting with drones."),
+    _doc("f", "Forecast demand; rust-free forecast."),
+    _doc("c", "Chatbot over the portfolio."),
+  ]
+  for doc in docs:
+    doc.metadata.pop("chunk_id")
+  store = load_or_build_index(docs, FakeEmbeddings(_keyword_vector), tmp_path, splitter=SPLITTER)
+  reranker = Reranker(store, fetch_k=4)
+  assert reranker.can_reconstruct
+  query = _keyword_vector("rust")
+  candidates = store.similarity_search_by_vector(query, k=4)
+  picked = [d.page_content for d in reranker.rerank(query, candidates, 2)]
+  # The near-duplicate second Rust chunk is dropped; the next most relevant one takes its slot.
+  assert picked == ["Rust detector: rust rust spotting.", "Forecast demand; rust-free forecast."]
+
+
+def test_reranker_reconstructs_from_ivf():
+  vectors = np.random.default_rng(0).normal(size=(500, 8)).astype(np.float32)
+  index = build_faiss_index(vectors, {"type": "ivf", "nlist": 4})
+  index.add(vectors)
+  store = SimpleNamespace(index=index, docstore=None, index_to_docstore_id={i: str(i) for i in range(500)})
+  reranker = Reranker(store)
+  assert reranker.can_reconstruct
+  found = reranker.vectors([_doc("7", "x"), _doc("42", "y")])
+  assert np.allclose(found, vectors[[7, 42]])
+
+
+def test_reranker_uses_the_artifact_docstore_positions(tmp_path):
+  from src.services.index_manifest import load_manifest
+  from src.services.retrieval_artifact import export_artifact, load_artifact
+
+  docs = [Document(page_content=t) for t in ("Rust detector: rust rust spotting.", "Forecast demand.", "Chatbot.")]
+  store = load_or_build_index(docs, FakeEmbeddings(_keyword_vector), tmp_path / "index", splitter=SPLITTER)
+  export_artifact(store, tmp_path / "artifact", load_manifest(tmp_path / "index"), b"corpus")
+  mapped = load_artifact(FakeEmbeddings(_keyword_vector), tmp_path / "artifact", corpus=b"corpus", splitter=SPLITTER)
+
+  reranker = Reranker(mapped)
+  assert reranker.position == mapped.docstore.position  # no per-worker id -> position dict
+  query = _keyword_vector("forecast")
+  candidates = mapped.similarity_search_by_vector(query, k=3)
+  assert np.allclose(reranker.vectors(candidates), Reranker(store).vectors(candidates))
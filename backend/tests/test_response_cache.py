@@ -0,0 +1,47 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.services.response_cache import SemanticResponseCache
+
+
+def _cache(tmp_path, **kwargs):
+  corpus = tmp_path / "projects.json"
+  corpus.write_text("[]", encoding="utf-8")
+  return SemanticResponseCache(corpus_path=corpus, **kwargs), corpus
+
+
+def test_hit_on_similar_query_with_same_chunks(tmp_path):
+  cache, _ = _cache(tmp_path, threshold=0.9)
+  cache.put([1.0, 0.0, 0.0], ["a", "b"], "YOLO projects")
+  assert cache.get([0.99, 0.05, 0.0], ["a", "b"]) == "YOLO projects"
+  assert cache.get([0.99, 0.05, 0.0], ["a", "c"]) is None
+  assert cache.get([0.0, 1.0, 0.0], ["a", "b"]) is None
+  assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_ttl_and_lru_eviction(tmp_path):
+  cache, _ = _cache(tmp_path, ttl=0.05, max_entries=2)
+  cache.put([1.0, 0.0], ["a"], "one")
+  cache.put([0.0, 1.0], ["b"], "two")
+  cache.put([1.0, 1.0], ["c"], "three")
+  assert cache.evictions == 1
+  assert cache.get([1.0, 0.0], ["a"]) is None
+  time.sleep(0.06)
+  assert cache.get([0.0, 1.0], ["b"]) is None
+  assert cache.stats()["size"] == 0
+
+
+def test_invalidated_when_corpus_changes(tmp_path):
+  cache, corpus = _cache(tmp_path)
+  cache.put([1.0, 0.0], ["a"], "old answer")
+  corpus.write_text('[{"title": "New"}]', encoding="utf-8")
+  assert cache.get([1.0, 0.0], ["a"]) is None
+  assert cache.invalidations == 1
+
+
+def test_stats_endpoint():
+  res = TestClient(app).get("/stats")
+  assert res.status_code == 200
+  assert "hits" in res.json()["response_cache"]
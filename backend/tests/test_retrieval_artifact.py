@@ -0,0 +1,107 @@
+import numpy as np
+from langchain.docstore.document import Document
+
+from conftest import FakeEmbeddings
+from src.services.bm25 import BM25Index
+from src.services.index_manifest import load_manifest, load_or_build_index
+from src.services.metadata_index import MetadataIndex
+from src.services.retrieval_artifact import ColumnarDocstore, current_version, export_artifact, load_artifact
+
+SPLITTER = {"chunk_size": 1000, "chunk_overlap": 200}
+FLAT = {"type": "flat"}
+
+
+def _docs(*texts):
+  return [Document(page_content=t, metadata={"title": t.upper(), "technologies": ["Python", "é"]}) for t in texts]
+
+
+def _corpus(*texts):
+  return "\n".join(texts).encode("utf-8")  # stands in for the projects.json bytes
+
+
+def _build(tmp_path, texts):
+  store = load_or_build_index(_docs(*texts), FakeEmbeddings(), tmp_path / "index", splitter=SPLITTER, spec=FLAT)
+  export_artifact(store, tmp_path / "artifact", load_manifest(tmp_path / "index"), _corpus(*texts))
+  return store
+
+
+def _load(tmp_path, *texts, directory="artifact", splitter=SPLITTER):
+  return load_artifact(FakeEmbeddings(), tmp_path / directory, corpus=_corpus(*texts), splitter=splitter, spec=FLAT)
+
+
+def test_artifact_serves_the_same_results(tmp_path):
+  texts = ["rust detector", "forecasting", "chatbot", "Café ☕ menu"]
+  store = _build(tmp_path, texts)
+  mapped = _load(tmp_path, *texts)
+  assert isinstance(mapped.docstore, ColumnarDocstore)
+
+  for query in texts:
+    expected = store.similarity_search(query, k=3)
+    got = mapped.similarity_search(query, k=3)
+    assert [(d.page_content, d.metadata) for d in got] == [(d.page_content, d.metadata) for d in expected]
+  doc_id = mapped.index_to_docstore_id[0]
+  assert mapped.docstore.search(doc_id).metadata["chunk_id"] == doc_id
+  assert mapped.docstore.search("missing").startswith("ID missing")
+  assert MetadataIndex.from_vector_store(mapped).infer_filters("What uses Python?")
+
+
+def test_artifact_is_checked_by_corpus_digest_without_chunking(tmp_path, monkeypatch):
+  from src.services import rag_pipeline
+
+  _build(tmp_path, ["a", "b"])
+  projects = tmp_path / "projects.json"
+  projects.write_bytes(_corpus("a", "b"))
+  monkeypatch.setattr(rag_pipeline, "_DATA_PATH", projects)
+  monkeypatch.setenv("RAG_ARTIFACT_DIR", str(tmp_path / "artifact"))
+  for name in ("RAG_ARTIFACT", "RAG_INDEX_TYPE", "RAG_CHUNK_SIZE", "RAG_CHUNK_OVERLAP"):
+    monkeypatch.delenv(name, raising=False)
+
+  def no_chunking():
+    raise AssertionError("a current artifact must be mapped without re-chunking projects.json")
+
+  monkeypatch.setattr(rag_pipeline, "_split_documents", no_chunking)
+  assert isinstance(rag_pipeline._vector_store(FakeEmbeddings(), tmp_path / "unused").docstore, ColumnarDocstore)
+  assert _load(tmp_path, "a", "b", "c") is None
+  assert _load(tmp_path, "a", "b", splitter={"chunk_size": 10}) is None
+  assert _load(tmp_path, "a", directory="missing") is None
+
+
+def test_bm25_and_metadata_bitmaps_are_mapped_from_the_artifact(tmp_path, monkeypatch):
+  from src.services import rag_pipeline
+
+  texts = ["rust detector", "forecasting with prophet", "chatbot", "Café ☕ menu"]
+  store = _build(tmp_path, texts)
+  mapped = _load(tmp_path, *texts)
+  for name in ("RAG_HYBRID", "RAG_METADATA_FILTER"):
+    monkeypatch.delenv(name, raising=False)
+  monkeypatch.setattr(MetadataIndex, "from_vector_store", None)  # must not decode the chunks
+
+  bm25 = rag_pipeline._build_bm25(mapped, tmp_path / "unused")
+  assert isinstance(bm25.positions, np.memmap)
+  built = BM25Index.from_store(store)
+  for query in ("prophet forecasting", "chatbot", "café"):
+    assert [(d.page_content, s) for d, s in bm25.search(query, k=3)] == [
+      (d.page_content, s) for d, s in built.search(query, k=3)
+    ]
+
+  meta = rag_pipeline._build_metadata_index(mapped)
+  assert isinstance(meta.bitmaps["technologies"]["python"], np.memmap)
+  assert meta.infer_filters("What uses Python?") == {"technologies": ["Python"]}
+  assert meta.match({"technologies": ["Python"]}) is None  # every chunk matches: nothing narrows
+  assert not (tmp_path / "unused").exists()
+
+
+def test_rebuild_swaps_the_current_version(tmp_path):
+  _build(tmp_path, ["a", "b"])
+  first = _load(tmp_path, "a", "b")
+  _build(tmp_path, ["a", "b", "c"])
+  mapped = _load(tmp_path, "a", "b", "c")
+  assert mapped.index.ntotal == 3
+  # A worker still on the previous version keeps reading it.
+  assert sorted(d.page_content for d in first.similarity_search("a", k=2)) == ["a", "b"]
+  _build(tmp_path, ["a"])
+  assert sorted(p.name for p in tmp_path.iterdir()) == ["artifact", "index", "index.lock"]
+  artifact = tmp_path / "artifact"
+  versions = sorted(p.name for p in artifact.iterdir() if p.is_dir())
+  assert len(versions) == 2 and current_version(artifact).name == versions[-1]
+  assert sorted(p.name for p in artifact.iterdir() if p.is_file()) == [".lock", "CURRENT"]
@@ -0,0 +1,87 @@
+import sqlite3
+import time
+
+from src.repositories.session_store import MemorySessionStore, SQLiteSessionStore
+
+
+def test_memory_store_evicts_lru_and_expires():
+  store = MemorySessionStore(max_sessions=2, ttl=0.05)
+  store.set("a", [("hi", "hello")])
+  store.set("b", [("hi", "hello")])
+  store.get("a")
+  store.set("a", [("hi", "hello"), ("more", "sure")])
+  store.set("c", [("hi", "hello")])
+  assert store.get("b") == []
+  assert store.get("a")[-1] == ("more", "sure")
+  assert store.stats()["evictions"] == 1
+  time.sleep(0.06)
+  assert store.get("a") == []
+  assert store.stats()["expirations"] == 1
+
+
+def test_memory_store_reads_refresh_recency():
+  store = MemorySessionStore(max_sessions=2)
+  store.set("active", [("hi", "hello")])
+  store.set("idle", [("hi", "hello")])
+  assert store.load("active")[1]  # only read, never rewritten
+  store.set("new", [("hi", "hello")])
+  assert store.get("idle") == []
+  assert store.get("active") == [("hi", "hello")]
+
+
+def test_memory_store_bounded_by_chars():
+  store = MemorySessionStore(max_sessions=100, max_chars=10)
+  store.set("a", [("12345", "")])
+  store.set("b", [("123456", "")])
+  assert store.get("a") == []
+  assert store.stats()["chars"] == 6
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+  db = tmp_path / "sessions.db"
+  first = SQLiteSessionStore(db, max_sessions=2)
+  second = SQLiteSessionStore(db, max_sessions=2)
+  first.set("s1", [("What uses YOLO?", "The rust detector.")])
+  assert second.get("s1") == [("What uses YOLO?", "The rust detector.")]
+  second.set("s2", [("q", "a")])
+  second.set("s3", [("q", "a")])
+  second.prune()
+  assert second.stats()["size"] == 2
+  assert first.get("s1") == []
+
+
+def test_sqlite_store_keeps_summary_and_migrates_old_tables(tmp_path):
+  db = tmp_path / "sessions.db"
+  conn = sqlite3.connect(str(db))
+  conn.execute("CREATE TABLE sessions (session_id TEXT PRIMARY KEY, history TEXT NOT NULL, updated_at REAL NOT NULL)")
+  conn.execute("INSERT INTO sessions VALUES ('old', '[[\"q\", \"a\"]]', ?)", (time.time(),))
+  conn.commit()
+  conn.close()
+  store = SQLiteSessionStore(db)
+  assert store.load("old") == ("", [("q", "a")])
+  store.set("old", [("q2", "a2")], summary="asked about YOLO")
+  assert store.load("old") == ("asked about YOLO", [("q2", "a2")])
+
+
+def test_sqlite_compaction_is_a_compare_and_swap_across_instances(tmp_path):
+  db = tmp_path / "sessions.db"
+  summarizer = SQLiteSessionStore(db)  # e.g. the worker running the compaction
+  requests = SQLiteSessionStore(db)  # e.g. another worker serving the session
+  requests.set("s", [("q0", "a0"), ("q1", "a1"), ("q2", "a2")])
+  assert summarizer.compact("s", "", [("q0", "a0")], "asked q0")
+  assert requests.load("s") == ("asked q0", [("q1", "a1"), ("q2", "a2")])
+
+  # The session moved on (new summary) before this compaction landed: nothing changes.
+  assert not summarizer.compact("s", "", [("q1", "a1")], "stale")
+  requests.set("s", [("x", "y")], summary="asked q0")
+  assert not summarizer.compact("s", "asked q0", [("q1", "a1")], "stale")
+  assert requests.load("s") == ("asked q0", [("x", "y")])
+
+
+def test_memory_compaction_keeps_char_accounting():
+  store = MemorySessionStore()
+  store.set("s", [("q0", "a0"), ("q1", "a1")])
+  assert store.compact("s", "", [("q0", "a0")], "sum")
+  assert store.load("s") == ("sum", [("q1", "a1")])
+  assert store.stats()["chars"] == len("sum") + 4
+  assert not store.compact("s", "", [("q1", "a1")], "stale")
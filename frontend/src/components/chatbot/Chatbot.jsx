@@ -1,5 +1,4 @@
 import React, { useState, useRef, useEffect } from 'react';
-import axios from 'axios';
 import styled, { keyframes } from 'styled-components';
 
 const Chatbot = ({ isOpen, onClose, onOpen }) => {
@@ -9,6 +8,8 @@ const Chatbot = ({ isOpen, onClose, onOpen }) => {
   const [input, setInput] = useState('');
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  const [streaming, setStreaming] = useState(false);
+  const sessionIdRef = useRef(null);
   const messagesEndRef = useRef(null);
   const inputRef = useRef(null);
 
@@ -38,10 +39,53 @@ const Chatbot = ({ isOpen, onClose, onOpen }) => {
     setInput('');
     setLoading(true);
     try {
-      const response = await axios.post(`${API_URL}/chat`, { message: trimmed });
-      setMessages(prev => [...prev, { text: response.data.reply, isBot: true, ts: Date.now() }]);
+      // Server-Sent Events over POST: render tokens as soon as they arrive.
+      const response = await fetch(`${API_URL}/chat/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ message: trimmed, session_id: sessionIdRef.current }),
+      });
+      if (!response.ok || !response.body) {
+        throw new Error(`Request failed with status ${response.status}`);
+      }
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let started = false;
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let sep;
+        while ((sep = buffer.indexOf('\n\n')) !== -1) {
+          const block = buffer.slice(0, sep);
+          buffer = buffer.slice(sep + 2);
+          const event = (block.match(/^event: (.*)$/m) || [])[1];
+          const raw = (block.match(/^data: (.*)$/m) || [])[1];
+          if (!event || !raw) continue;
+          const data = JSON.parse(raw);
+          if (event === 'session') {
+            sessionIdRef.current = data.session_id;
+          } else if (event === 'token') {
+            if (!started) {
+              started = true;
+              setStreaming(true);
+              setMessages(prev => [...prev, { text: data.text, isBot: true, ts: Date.now() }]);
+            } else {
+              setMessages(prev => {
+                const next = [...prev];
+                const last = next[next.length - 1];
+                next[next.length - 1] = { ...last, text: last.text + data.text };
+                return next;
+              });
+            }
+          } else if (event === 'error') {
+            throw new Error(data.detail || 'Stream failed.');
+          }
+        }
+      }
     } catch (err) {
-      setError(err?.response?.data?.detail || err?.message || 'Connection failed.');
+      setError(err?.message || 'Connection failed.');
       setMessages(prev => [...prev, {
         text: "Something went wrong. Please check your connection and try again.",
         isBot: true,
@@ -50,6 +94,7 @@ const Chatbot = ({ isOpen, onClose, onOpen }) => {
       }]);
     } finally {
       setLoading(false);
+      setStreaming(false);
     }
   };
 
@@ -103,7 +148,7 @@ const Chatbot = ({ isOpen, onClose, onOpen }) => {
             <span className="bubble-time">{formatTime(msg.ts)}</span>
           </MessageBubble>
         ))}
-        {loading && (
+        {loading && !streaming && (
           <MessageBubble isBot>
             <TypingIndicator>
               <span>AI is thinking...</span>